@@ -1,20 +1,37 @@
-import google.auth
+import threading
+from typing import Optional
+
 from google.oauth2 import service_account
 from google.cloud import firestore
 
+_shared_client: Optional[firestore.Client] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> firestore.Client:
+    """Return the Firestore client shared by every `FirestoreClient`, created on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            #credentials, _ = google.auth.default()
+            credentials = service_account.Credentials.from_service_account_file(
+                'TP2and3/careful-maxim-443609-j6-bbedea89fd10.json'  # Remplacez par le chemin réel vers votre fichier de clé
+            )
+            _shared_client = firestore.Client(credentials=credentials)
+        return _shared_client
+
 
 class FirestoreClient:
     """Wrapper around a database"""
 
     client: firestore.Client
 
-    def __init__(self) -> None:
-        """Init the client."""
-        #credentials, _ = google.auth.default()
-        credentials = service_account.Credentials.from_service_account_file(
-            'TP2and3/careful-maxim-443609-j6-bbedea89fd10.json'  # Remplacez par le chemin réel vers votre fichier de clé
-        )
-        self.client = firestore.Client(credentials=credentials)
+    def __init__(self, client: Optional[firestore.Client] = None) -> None:
+        """Init the client.
+        Args:
+            client: The Firestore client to use, the shared client by default.
+        """
+        self.client = client or get_shared_client()
 
     def get(self, collection_name: str, document_id: str) -> dict:
         """Find one document by ID.
@@ -0,0 +1,99 @@
+"""
+Synthetic Iris-shaped datasets of any size.
+
+Each species is drawn around the mean and standard deviation of its measurements in the
+real Iris dataset, rounded to one decimal like the original, so the files go through the
+same cleaning, scaling and training code and the models reach a realistic accuracy.
+
+Usage (from the service directory):
+
+    python -m benchmarks.datasets --rows 1000000 --output /tmp/iris-1000000.csv
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Id", "SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm", "Species"]
+FEATURES = COLUMNS[1:-1]
+SPECIES = np.array(["Iris-setosa", "Iris-versicolor", "Iris-virginica"])
+
+# Per species: mean and standard deviation of each feature in the real dataset
+MEANS = np.array([
+    [5.006, 3.428, 1.462, 0.246],
+    [5.936, 2.770, 4.260, 1.326],
+    [6.588, 2.974, 5.552, 2.026],
+])
+STDS = np.array([
+    [0.352, 0.379, 0.174, 0.105],
+    [0.516, 0.314, 0.470, 0.198],
+    [0.636, 0.322, 0.552, 0.275],
+])
+
+CHUNK_ROWS = 1_000_000
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "epf-flower-benchmarks")
+
+
+def iris_frame(rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """
+    Return `rows` synthetic Iris rows, with ids from `start + 1`.
+
+    Args:
+        rows: The number of rows.
+        seed: The seed of the generator.
+        start: The number of rows generated before (the ids continue from there).
+
+    Returns:
+        A DataFrame with the columns of `iris.csv`.
+    """
+    rng = np.random.default_rng([seed, start])
+    labels = rng.integers(len(SPECIES), size=rows)
+    features = np.round(np.clip(rng.normal(MEANS[labels], STDS[labels]), 0.1, None), 1)
+    frame = pd.DataFrame(features, columns=FEATURES)
+    frame.insert(0, "Id", np.arange(start + 1, start + rows + 1))
+    frame["Species"] = SPECIES[labels]
+    return frame
+
+
+def write_iris_csv(path: str, rows: int, seed: int = 0) -> str:
+    """
+    Write a synthetic Iris CSV file chunk by chunk, so its size is not bounded by memory.
+
+    Args:
+        path: The CSV file.
+        rows: The number of rows.
+        seed: The seed of the generator.
+
+    Returns:
+        The path of the file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    for start in range(0, rows, CHUNK_ROWS):
+        chunk = iris_frame(min(CHUNK_ROWS, rows - start), seed, start)
+        chunk.to_csv(tmp_path, mode="w" if start == 0 else "a", header=start == 0, index=False, float_format="%.1f")
+    os.replace(tmp_path, path)
+    return path
+
+
+def iris_csv(rows: int, seed: int = 0, directory: str = DEFAULT_DIR) -> str:
+    """Return the path of a synthetic Iris CSV file, generating it on first use."""
+    path = os.path.join(directory, f"iris-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        write_iris_csv(path, rows, seed)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    print(write_iris_csv(args.output, args.rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
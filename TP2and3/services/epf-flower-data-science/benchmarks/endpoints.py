@@ -0,0 +1,370 @@
+"""
+Latency, throughput and peak RSS of the main routes on synthetic datasets of growing size.
+
+The whole application (middlewares included) runs in a worker process, against a
+synthetic Iris-shaped CSV file of each size (see `benchmarks.datasets`) and an in-memory
+Firestore. For every size, each route is requested once cold (caches empty, snapshot not
+built), then repeatedly until `--repeat` requests or `--max-seconds` are reached:
+
+    /load-iris-dataset, /process-data, /split-data, /train-model, /predict, /parameters
+
+The results are printed and can be written as JSON (`--output`). `--save-baseline` stores
+them as the reference of later runs; `--baseline` compares a run to it and exits with
+status 1 when a route got slower or bigger than the tolerance allows. Baselines are only
+comparable on the same machine.
+
+Each size runs in its own process, so the peak RSS of a size does not include the caches
+of the previous one, and a route killed for lack of memory (10^7 rows need about 10 GB to
+serve `/load-iris-dataset`) is reported as an error; the next routes run in a new worker.
+
+Usage (from the service directory):
+
+    python -m benchmarks.endpoints --rows 150 10000 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.endpoints --rows 150 10000 --baseline benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import queue
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import src
+from benchmarks.datasets import DEFAULT_DIR, iris_csv
+from benchmarks.event_loop import DelayedFirestore
+from src.app import get_application
+from src.services import data, models, preprocessing, snapshot, training
+from src.services.firebase import get_async_firestore_client
+
+SIZES = (150, 10_000, 1_000_000, 10_000_000)
+BASELINE_VERSION = 1
+MODEL_PARAMETERS_PATH = os.path.join(os.path.dirname(src.__file__), "config", "model_parameters.json")
+
+# A regression smaller than this is noise, whatever the tolerance
+MIN_LATENCY_DELTA_MS = 1.0
+MIN_RSS_DELTA_MB = 16.0
+
+
+@dataclass(frozen=True)
+class Case:
+    """One benchmarked request."""
+    route: str
+    method: str
+    url: str
+    json: Optional[Dict[str, Any]] = None
+
+
+def cases(model_name: str) -> List[Case]:
+    """Return the benchmarked requests, in the order a client would send them."""
+    features = {"SepalLengthCm": 6.1, "SepalWidthCm": 2.8, "PetalLengthCm": 4.7, "PetalWidthCm": 1.2}
+    return [
+        Case("load", "GET", "/load-iris-dataset"),
+        Case("process", "GET", "/process-data"),
+        Case("split", "GET", "/split-data"),
+        Case("train", "GET", f"/train-model?model_name={model_name}"),
+        Case("predict", "POST", f"/predict?model_name={model_name}", features),
+        Case("parameters", "GET", "/parameters"),
+    ]
+
+
+def rss_bytes() -> Optional[int]:
+    """Return the resident set size of this process, None where `/proc` is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PeakRss:
+    """Track the peak resident set size of the process during a `with` block."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.start = self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "PeakRss":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._update()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def _update(self) -> None:
+        rss = rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+@contextmanager
+def dataset_state(csv_path: str, workdir: str) -> Iterator[None]:
+    """
+    Serve `csv_path` as the Iris dataset, with empty caches and fresh model and
+    preprocessing directories, and restore the previous state afterwards.
+    """
+    saved = (data.IRIS_PATH, models._registry, preprocessing._store, training.MODEL_PARAMETERS_PATH)
+    shutil.rmtree(snapshot.snapshot_dir(os.path.abspath(csv_path)), ignore_errors=True)
+    data._caches.clear()
+    snapshot._snapshots.clear()
+    data.IRIS_PATH = csv_path
+    models._registry = models.ModelRegistry(os.path.join(workdir, "models"))
+    preprocessing._store = preprocessing.PreprocessingStore(os.path.join(workdir, "preprocessing"))
+    training.MODEL_PARAMETERS_PATH = MODEL_PARAMETERS_PATH
+    try:
+        yield
+    finally:
+        data.IRIS_PATH, models._registry, preprocessing._store, training.MODEL_PARAMETERS_PATH = saved
+        data._caches.clear()
+        snapshot._snapshots.clear()
+        shutil.rmtree(snapshot.snapshot_dir(os.path.abspath(csv_path)), ignore_errors=True)
+        gc.collect()
+
+
+def build_client() -> TestClient:
+    """Return a client of the application, its Firestore replaced by an in-memory one."""
+    app = get_application()
+    db = DelayedFirestore(delay=0.0, blocking=False)
+    app.dependency_overrides[get_async_firestore_client] = lambda: db
+    return TestClient(app)
+
+
+def run_case(client: TestClient, case: Case, repeat: int, max_seconds: float) -> Dict[str, Any]:
+    """
+    Request a route once cold, then until `repeat` requests or `max_seconds` are reached.
+
+    Returns:
+        The cold and warm latencies (ms), the throughput of the warm requests, the peak RSS
+        and the response size; or the error of a failing request.
+    """
+    gc.collect()
+    latencies: List[float] = []
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        response = client.request(case.method, case.url, json=case.json)
+        cold_ms = (time.perf_counter() - start) * 1000
+        failed = response.status_code != 200 or response.content.startswith(b'{"error"')
+        if not failed:
+            budget_start = time.perf_counter()
+            while len(latencies) < repeat and time.perf_counter() - budget_start < max_seconds:
+                start = time.perf_counter()
+                client.request(case.method, case.url, json=case.json)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    result: Dict[str, Any] = {"route": case.route, "url": case.url, "status": response.status_code, "cold_ms": cold_ms}
+    if failed:
+        result["error"] = response.text[:500]
+        return result
+    result.update(
+        requests=len(latencies),
+        p50_ms=float(np.percentile(latencies, 50)) if latencies else cold_ms,
+        p95_ms=float(np.percentile(latencies, 95)) if latencies else cold_ms,
+        mean_ms=float(np.mean(latencies)) if latencies else cold_ms,
+        throughput_rps=len(latencies) / (sum(latencies) / 1000) if latencies else 1000 / cold_ms,
+        response_bytes=len(response.content),
+    )
+    if rss.peak is not None:
+        result["peak_rss_mb"] = rss.peak / 2**20
+        result["rss_growth_mb"] = (rss.peak - rss.start) / 2**20
+    return result
+
+
+def _worker(rows: int, csv_path: str, workdir: str, routes: List[str], options: Dict[str, Any], results: Any) -> None:
+    # Runs in a spawned process: benchmark the routes of one size, one result at a time
+    client = build_client()
+    with dataset_state(csv_path, workdir):
+        for case in cases(options["model_name"]):
+            if case.route in routes:
+                results.put({"rows": rows, **run_case(client, case, options["repeat"], options["max_seconds"])})
+
+
+def run_size(
+    rows: int,
+    csv_path: str,
+    routes: List[str],
+    options: Dict[str, Any],
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Benchmark the routes on one dataset in a worker process.
+
+    When the worker dies (e.g. killed for lack of memory), the route it was running is
+    reported as an error and the remaining routes run in a new worker.
+    """
+    context = multiprocessing.get_context("spawn")
+    pending = list(routes)
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        while pending:
+            channel = context.Queue()
+            worker = context.Process(target=_worker, args=(rows, csv_path, workdir, pending, options, channel), daemon=True)
+            worker.start()
+            while pending:
+                try:
+                    result = channel.get(timeout=1.0 if worker.is_alive() else 5.0)
+                except queue.Empty:
+                    if worker.is_alive():
+                        continue
+                    result = {
+                        "rows": rows,
+                        "route": pending[0],
+                        "status": None,
+                        "error": f"The benchmark worker died (exit code {worker.exitcode}).",
+                    }
+                pending.remove(result["route"])
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+                if result["status"] is None:
+                    break
+            worker.join()
+    return results
+
+
+def run(
+    sizes: List[int],
+    routes: Optional[List[str]] = None,
+    repeat: int = 20,
+    max_seconds: float = 5.0,
+    model_name: str = "DecisionTreeClassifier",
+    data_dir: str = DEFAULT_DIR,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the benchmark on each dataset size.
+
+    Args:
+        sizes: The numbers of rows of the synthetic datasets.
+        routes: The routes to benchmark (see `cases`), all by default.
+        repeat: The number of warm requests per route.
+        max_seconds: The time budget of the warm requests of one route.
+        model_name: The model trained by `/train-model` and used by `/predict`.
+        data_dir: Where the synthetic datasets are generated (and kept between runs).
+        on_result: Called with each result as soon as it is measured.
+
+    Returns:
+        The machine-readable report: environment, configuration and one result per route
+        and size.
+    """
+    routes = [case.route for case in cases(model_name) if not routes or case.route in routes]
+    options = {"repeat": repeat, "max_seconds": max_seconds, "model_name": model_name}
+    results = []
+    for rows in sizes:
+        results += run_size(rows, iris_csv(rows, directory=data_dir), routes, options, on_result)
+    return {
+        "version": BASELINE_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {"sizes": sizes, "routes": routes, **options},
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare a report to a baseline, route by route and size by size.
+
+    A result regresses when its median latency or its peak RSS exceeds the baseline by
+    more than `tolerance` (and by more than the noise floor), or when it fails while the
+    baseline did not.
+
+    Returns:
+        The comparison of every result present in both, with its `regressions`.
+    """
+    reference = {(r["route"], r["rows"]): r for r in baseline.get("results", [])}
+    comparisons = []
+    for result in report["results"]:
+        base = reference.get((result["route"], result["rows"]))
+        if base is None:
+            continue
+        regressions = []
+        if "error" in result and "error" not in base:
+            regressions.append("error")
+        for key, floor in (("p50_ms", MIN_LATENCY_DELTA_MS), ("peak_rss_mb", MIN_RSS_DELTA_MB)):
+            if key in result and key in base:
+                if result[key] > base[key] * (1 + tolerance) and result[key] - base[key] > floor:
+                    regressions.append(key)
+        comparisons.append({
+            "route": result["route"],
+            "rows": result["rows"],
+            "p50_ratio": result["p50_ms"] / base["p50_ms"] if "p50_ms" in result and base.get("p50_ms") else None,
+            "rss_ratio": (
+                result["peak_rss_mb"] / base["peak_rss_mb"] if "peak_rss_mb" in result and base.get("peak_rss_mb") else None
+            ),
+            "regressions": regressions,
+        })
+    return comparisons
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    if "error" in result:
+        print(f"{result['route']:<12}{result['rows']:>10}  error ({result['status']}): {result['error'][:80]}", flush=True)
+        return
+    print(
+        f"{result['route']:<12}{result['rows']:>10}{result['cold_ms']:>11.1f}{result['p50_ms']:>10.2f}"
+        f"{result['p95_ms']:>10.2f}{result['throughput_rps']:>10.1f}{result.get('peak_rss_mb', float('nan')):>10.0f}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=list(SIZES), help="Dataset sizes.")
+    parser.add_argument("--routes", nargs="+", choices=[case.route for case in cases("")], help="Routes (all by default).")
+    parser.add_argument("--repeat", type=int, default=20, help="Warm requests per route.")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="Time budget of the warm requests of a route.")
+    parser.add_argument("--model", default="DecisionTreeClassifier", help="Model trained and used for predictions.")
+    parser.add_argument("--data-dir", default=DEFAULT_DIR, help="Directory of the synthetic datasets.")
+    parser.add_argument("--output", help="Write the report to this JSON file.")
+    parser.add_argument("--save-baseline", help="Write the report as the baseline to this JSON file.")
+    parser.add_argument("--baseline", help="Compare the run to this baseline; exit with status 1 on regression.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown / growth over the baseline.")
+    args = parser.parse_args()
+
+    print(f"{'route':<12}{'rows':>10}{'cold ms':>11}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}{'RSS MB':>10}")
+    report = run(args.rows, args.routes, args.repeat, args.max_seconds, args.model, args.data_dir, print_result)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparisons = compare(report, json.load(f), args.tolerance)
+        print(f"\n{'route':<12}{'rows':>10}{'p50 x':>10}{'RSS x':>10}  regressions")
+        for c in comparisons:
+            p50 = f"{c['p50_ratio']:.2f}" if c["p50_ratio"] is not None else "-"
+            rss = f"{c['rss_ratio']:.2f}" if c["rss_ratio"] is not None else "-"
+            print(f"{c['route']:<12}{c['rows']:>10}{p50:>10}{rss:>10}  {', '.join(c['regressions'])}")
+        if any(c["regressions"] for c in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Latency of `/hello` while slow Firestore calls are in flight.
+
+The app runs in-process against an in-memory Firestore fake whose queries take `--delay`
+seconds, in two modes:
+
+- `blocking`: the fake sleeps synchronously inside the coroutine, like a synchronous
+  `firestore.Client` called from an `async def` route;
+- `async`: the fake awaits, like `firestore.AsyncClient`.
+
+For each mode, `/hello` is requested at a steady rate while `--slow-requests` listings of
+`/parameters/page` are started over the run, and its p50/p99 latency is compared to an idle baseline.
+
+Usage (from the service directory):
+
+    python -m benchmarks.event_loop --delay 0.1 --slow-requests 20 --hello-requests 200
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from src.api.routes import firestore_parameters, hello
+from src.services.firebase import get_async_firestore_client
+
+
+class DelayedDocument:
+    def __init__(self, id: str, data: Dict) -> None:
+        self.id, self._data = id, data
+
+    def to_dict(self) -> Dict:
+        return dict(self._data)
+
+
+class DelayedCollection:
+    """In-memory collection whose queries take `delay` seconds, blocking or not."""
+
+    def __init__(self, delay: float, blocking: bool, size: int = 10) -> None:
+        self.delay = delay
+        self.blocking = blocking
+        self.documents = {f"param_{i:04d}": {"n_estimators": i, "criterion": "gini"} for i in range(size)}
+
+    def where(self, *args, **kwargs) -> "DelayedCollection":
+        return self
+
+    select = order_by = start_after = limit = where
+
+    async def stream(self):
+        if self.blocking:
+            time.sleep(self.delay)
+        else:
+            await asyncio.sleep(self.delay)
+        for id, data in self.documents.items():
+            yield DelayedDocument(id, data)
+
+
+class DelayedFirestore:
+    def __init__(self, delay: float, blocking: bool) -> None:
+        self._collection = DelayedCollection(delay, blocking)
+
+    def collection(self, name: str) -> DelayedCollection:
+        return self._collection
+
+
+def build_app(delay: float, blocking: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(hello.router)
+    app.include_router(firestore_parameters.router)
+    db = DelayedFirestore(delay, blocking)
+    app.dependency_overrides[get_async_firestore_client] = lambda: db
+    return app
+
+
+async def measure(app: FastAPI, slow_requests: int, hello_requests: int, interval: float) -> List[float]:
+    """Return the latencies (ms) of `/hello` requested every `interval` seconds during the slow requests."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def timed_hello() -> float:
+            start = time.perf_counter()
+            response = await client.get("/hello/bench")
+            response.raise_for_status()
+            return (time.perf_counter() - start) * 1000
+
+        # The slow requests are spread over the run, so some are always in flight
+        every = max(hello_requests // slow_requests, 1) if slow_requests else None
+        slow, latencies = [], []
+        for i in range(hello_requests):
+            if every and i % every == 0 and len(slow) < slow_requests:
+                slow.append(asyncio.create_task(client.get("/parameters/page")))
+            latencies.append(asyncio.create_task(timed_hello()))
+            await asyncio.sleep(interval)
+        results = await asyncio.gather(*latencies)
+        await asyncio.gather(*slow)
+        return list(results)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(np.max(latencies)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds per Firestore query.")
+    parser.add_argument("--slow-requests", type=int, default=20)
+    parser.add_argument("--hello-requests", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005, help="Seconds between /hello requests.")
+    args = parser.parse_args()
+
+    runs = {
+        "idle": (False, 0),
+        "blocking": (True, args.slow_requests),
+        "async": (False, args.slow_requests),
+    }
+    print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode, (blocking, slow_requests) in runs.items():
+        app = build_app(args.delay, blocking)
+        latencies = asyncio.run(measure(app, slow_requests, args.hello_requests, args.interval))
+        stats = summarize(latencies)
+        print(f"{mode:<10}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Throughput of the production server (`serve.py`) as the number of workers grows.
+
+For each worker count, the server is started on a free local port, warmed up, then
+loaded for `--seconds` by `--clients` client processes keeping `--concurrency`
+requests in flight each. The requests per second, p50/p99 latency and the speedup over
+the first worker count are printed, and can be written as JSON (`--output`).
+
+The client processes need CPU too: on a machine with N CPUs, the speedup flattens before
+N workers. Leave some CPUs to the clients, or run them from another machine with `--url`.
+
+Usage (from the service directory):
+
+    python -m benchmarks.load --workers 1 2 4 --route predict --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The data and model paths of the service are relative to the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(SERVICE_DIR)))
+
+ROUTES = {
+    "hello": ("GET", "/hello/benchmark", None),
+    "predict": (
+        "POST",
+        "/predict?model_name=RandomForestClassifier",
+        {"SepalLengthCm": 6.1, "SepalWidthCm": 2.8, "PetalLengthCm": 4.7, "PetalWidthCm": 1.2},
+    ),
+    "load": ("GET", "/load-iris-dataset", None),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """Start `serve.py` with `workers` workers and wait until it answers."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(SERVICE_DIR, "serve.py"), "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PROFILING_ENABLED": "false"},
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with code {server.returncode}.")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/hello/ready", timeout=1.0)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("The server did not start within 60 s.")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+async def _load(url: str, route: str, concurrency: int, seconds: float) -> Dict[str, Any]:
+    method, path, body = ROUTES[route]
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        await asyncio.gather(*(loop(client) for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}
+
+
+def _client(args: tuple) -> Dict[str, Any]:
+    # Runs in a client process
+    return asyncio.run(_load(*args))
+
+
+def load(url: str, route: str, clients: int, concurrency: int, seconds: float) -> Dict[str, Any]:
+    """
+    Load a server from `clients` processes and return its throughput and latencies.
+
+    Returns:
+        The successful requests per second, the p50/p99 latency (ms) and the error count.
+    """
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        start = time.perf_counter()
+        parts = pool.map(_client, [(url, route, concurrency, seconds)] * clients)
+        elapsed = time.perf_counter() - start
+    latencies = np.array([latency for part in parts for latency in part["latencies"]]) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": sum(part["errors"] for part in parts),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+    }
+
+
+def run(
+    worker_counts: List[int],
+    route: str = "predict",
+    clients: int = 2,
+    concurrency: int = 32,
+    seconds: float = 10.0,
+    warmup_seconds: float = 2.0,
+    url: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Measure the throughput of the server for each worker count.
+
+    Args:
+        worker_counts: The numbers of workers to start the server with.
+        route: The route to load (see `ROUTES`).
+        clients: The number of client processes.
+        concurrency: The requests in flight per client process.
+        seconds: The duration of each measure.
+        warmup_seconds: The duration of the load before each measure (not measured).
+        url: Load an already running server instead of starting one (one measure).
+
+    Returns:
+        One result per worker count, with its speedup over the first one.
+    """
+    results = []
+    for workers in ([None] if url else worker_counts):
+        server = None
+        if url is None:
+            port = free_port()
+            server = start_server(workers, port)
+        try:
+            target = url or f"http://127.0.0.1:{port}"
+            load(target, route, clients, concurrency, warmup_seconds)
+            result = {"workers": workers, "route": route, **load(target, route, clients, concurrency, seconds)}
+        finally:
+            if server is not None:
+                stop_server(server)
+        result["speedup"] = result["throughput_rps"] / results[0]["throughput_rps"] if results else 1.0
+        results.append(result)
+        print(
+            f"{str(workers or '-'):>8}{result['throughput_rps']:>12.1f}{result['p50_ms'] or float('nan'):>10.2f}"
+            f"{result['p99_ms'] or float('nan'):>10.2f}{result['errors']:>8}{result['speedup']:>9.2f}x",
+            flush=True,
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare.")
+    parser.add_argument("--route", choices=list(ROUTES), default="predict", help="Route to load.")
+    parser.add_argument("--clients", type=int, default=2, help="Client processes.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight per client process.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each measure.")
+    parser.add_argument("--warmup-seconds", type=float, default=2.0, help="Load before each measure.")
+    parser.add_argument("--url", help="Load this running server instead of starting one.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'speedup':>10}")
+    results = run(args.workers, args.route, args.clients, args.concurrency, args.seconds, args.warmup_seconds, args.url)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Encode time and peak memory of the dataset and prediction responses.
+
+Each payload is encoded the way the routes used to (`.tolist()` / `to_dict` followed by
+`JSONResponse`, i.e. the standard library `json`) and with `FastJSONResponse` (orjson,
+NumPy arrays encoded directly), on a synthetic Iris-like dataset of `--rows` rows.
+
+Usage (from the service directory):
+
+    python -m benchmarks.serialization --rows 100000 --repeat 5
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from src.api.responses import FastJSONResponse
+
+FEATURES = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+SPECIES = np.array(["Iris-setosa", "Iris-versicolor", "Iris-virginica"])
+
+
+def synthetic_dataset(rows: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(rows, len(FEATURES))), SPECIES[rng.integers(len(SPECIES), size=rows)]
+
+
+def payloads(rows: int) -> Dict[str, Tuple[Callable[[], Any], Callable[[], Any]]]:
+    """Return, per route, the builders of the old content and of the new content."""
+    X, y = synthetic_dataset(rows)
+    frame = pd.DataFrame(X, columns=FEATURES)
+    frame["Species"] = y
+    split = int(rows * 0.8)
+    probabilities = np.random.default_rng(1).dirichlet(np.ones(3), size=rows)
+
+    return {
+        "process": (
+            lambda: {"data": frame.to_dict(orient="records")},
+            lambda: {"data": frame},
+        ),
+        "split": (
+            lambda: {
+                "train_data": {"X_train": X[:split].tolist(), "y_train": y[:split].tolist()},
+                "test_data": {"X_test": X[split:].tolist(), "y_test": y[split:].tolist()},
+            },
+            lambda: {
+                "train_data": {"X_train": X[:split], "y_train": y[:split]},
+                "test_data": {"X_test": X[split:], "y_test": y[split:]},
+            },
+        ),
+        "predict": (
+            lambda: {"predictions": y.tolist(), "probabilities": probabilities.tolist()},
+            lambda: {"predictions": y, "probabilities": probabilities},
+        ),
+    }
+
+
+def measure(encode: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    """Return the best encode time (ms), the peak traced memory (MB) and the body size (MB)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    encode()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": min(times) * 1000, "peak_mb": peak / 2**20, "body_mb": len(body) / 2**20}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'payload':<10}{'encoder':<10}{'ms':>10}{'peak MB':>10}{'body MB':>10}")
+    for name, (old_content, new_content) in payloads(args.rows).items():
+        runs = {
+            "json": lambda: JSONResponse(content=old_content()).body,
+            "orjson": lambda: FastJSONResponse(content=new_content()).body,
+        }
+        for encoder, encode in runs.items():
+            stats = measure(encode, args.repeat)
+            print(f"{name:<10}{encoder:<10}{stats['ms']:>10.1f}{stats['peak_mb']:>10.1f}{stats['body_mb']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Production entry point: a gunicorn master forking uvicorn workers.
+
+`main.py` runs a single process with the dev reloader. This launcher instead:
+
+- runs one worker per available CPU (`WEB_CONCURRENCY` or `--workers` to override),
+  but a single one while the training job API is enabled (`TRAIN_JOBS_ENABLED`, on by
+  default): the jobs are kept in the memory of the worker that received them, so a poll
+  answered by another worker would get a 404, and every worker would start its own pool
+  of training processes. Set `TRAIN_JOBS_ENABLED=false` to scale out;
+- preloads the application, the dataset cache, the feature snapshot and the model
+  registry in the master before forking, then freezes them out of the garbage collector,
+  so the workers share those pages copy-on-write instead of each loading them;
+- uses uvloop and httptools when they are installed, asyncio and h11 otherwise;
+- recycles each worker gracefully after `--max-requests` requests (with jitter, so they
+  do not all restart at once); in-flight requests get `--graceful-timeout` seconds to
+  finish. `kill -HUP <master>` replaces all workers the same way.
+
+Metrics are kept per process: `/metrics` returns the ones of the worker that answered,
+labelled with its `worker` process id, and a recycled worker starts from zero under a
+new id. Sum the series over `worker` (e.g. `sum without (worker) (rate(...))`).
+
+The Firebase clients are not preloaded: gRPC channels do not survive a fork, each worker
+creates its own at startup.
+
+Usage (from the repository root, where the data and model paths resolve):
+
+    python TP2and3/services/epf-flower-data-science/serve.py --bind 0.0.0.0:8080
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from src.app import get_application
+from src.services import data, jobs, models, snapshot
+
+logger = logging.getLogger("gunicorn.error")
+
+DEFAULT_BIND = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8080')}"
+DEFAULT_MAX_REQUESTS = int(os.environ.get("MAX_REQUESTS", "10000"))
+DEFAULT_GRACEFUL_TIMEOUT = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+
+
+def available_cpus() -> int:
+    """
+    Return the number of CPUs this process may use.
+
+    Takes the CPU affinity mask and the cgroup v2 quota (containers) into account, which
+    `os.cpu_count()` ignores.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def default_workers() -> int:
+    """Return the number of workers: `WEB_CONCURRENCY`, or one per available CPU."""
+    return int(os.environ.get("WEB_CONCURRENCY", available_cpus()))
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class Worker(UvicornWorker):
+    """Uvicorn worker on uvloop and httptools when they are installed."""
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+    }
+
+
+def preload() -> None:
+    """
+    Warm the process-wide caches before the workers are forked.
+
+    A cache that cannot be warmed (e.g. no dataset yet) is logged and left to fill on
+    the first request of each worker.
+    """
+    for name, warm in (
+        ("dataset", lambda: data.get_dataset_cache().get()),
+        ("snapshot", snapshot.get_snapshot),
+        ("models", lambda: models.get_model_registry().preload()),
+    ):
+        try:
+            warm()
+        except Exception as e:
+            logger.warning(f"Preload of the {name} cache skipped: {e}")
+    logger.info(f"Preloaded models: {models.get_model_registry().stats()['cached_models']}")
+
+
+class Server(BaseApplication):
+    """Gunicorn application serving `get_application()`, preloaded in the master."""
+
+    def __init__(self, options: Dict[str, Any]) -> None:
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        app = get_application()
+        preload()
+        # Keep the collector from touching (and so copying) the preloaded objects in the workers
+        gc.collect()
+        gc.freeze()
+        return app
+
+
+def options(
+    bind: str = DEFAULT_BIND,
+    workers: Optional[int] = None,
+    max_requests: int = DEFAULT_MAX_REQUESTS,
+    graceful_timeout: int = DEFAULT_GRACEFUL_TIMEOUT,
+    timeout: int = 120,
+) -> Dict[str, Any]:
+    """
+    Return the gunicorn settings of the server.
+
+    Args:
+        bind: The address to listen on.
+        workers: The number of workers, `default_workers()` if not set. Forced to 1 while
+            the training job API is enabled.
+        max_requests: The requests a worker serves before being recycled, 0 to never recycle.
+        graceful_timeout: The seconds a stopping worker gets to finish its requests.
+        timeout: The seconds a silent worker is given before being killed and replaced.
+    """
+    workers = workers or default_workers()
+    if jobs.TRAIN_JOBS_ENABLED and workers > 1:
+        logger.warning(f"Running 1 worker instead of {workers}: the training jobs are kept in memory by one worker (set TRAIN_JOBS_ENABLED=false to scale out).")
+        workers = 1
+    return {
+        "bind": bind,
+        "workers": workers,
+        # Imported by name: gunicorn 20 only accepts a dotted path
+        "worker_class": "serve.Worker",
+        "preload_app": True,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests // 10,
+        "graceful_timeout": graceful_timeout,
+        "timeout": timeout,
+        "keepalive": 5,
+        # Heartbeat files in memory: a slow disk would get workers killed as silent
+        "worker_tmp_dir": "/dev/shm" if os.path.isdir("/dev/shm") else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bind", default=DEFAULT_BIND, help="Address to listen on.")
+    parser.add_argument("--workers", type=int, help="Number of workers (default: available CPUs).")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS, help="Requests before a worker is recycled.")
+    parser.add_argument("--graceful-timeout", type=int, default=DEFAULT_GRACEFUL_TIMEOUT, help="Seconds to finish in-flight requests.")
+    parser.add_argument("--timeout", type=int, default=120, help="Seconds before a silent worker is replaced.")
+    args = parser.parse_args()
+    Server(options(args.bind, args.workers, args.max_requests, args.graceful_timeout, args.timeout)).run()
+
+
+if __name__ == "__main__":
+    main()
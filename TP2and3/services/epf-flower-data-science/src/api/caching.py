@@ -0,0 +1,49 @@
+import hashlib
+import os
+from typing import Dict, Optional
+
+from fastapi import Response
+
+# Bumped whenever the body of a cached route changes for the same dataset
+RESPONSE_VERSION = "2"
+
+CACHE_MAX_AGE = int(os.environ.get("DATA_CACHE_MAX_AGE", "60"))
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+
+
+def make_etag(*parts: object) -> str:
+    """
+    Build a strong ETag from the identity of a response.
+
+    Args:
+        *parts: What the body depends on: the route, the dataset content hash and the
+            parameters of the pipeline.
+
+    Returns:
+        The quoted ETag.
+    """
+    raw = "|".join(str(part) for part in (RESPONSE_VERSION, *parts))
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Tell whether an `If-None-Match` header matches an ETag (weak comparison, as required
+    for `If-None-Match`).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """Return the `ETag` and `Cache-Control` headers of a cacheable response."""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    """Return the `304 Not Modified` answer to a matching conditional request."""
+    return Response(status_code=304, headers=cache_headers(etag))
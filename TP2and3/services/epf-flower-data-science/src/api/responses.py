@@ -0,0 +1,18 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from src.services import serialization
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, which accepts NumPy arrays and DataFrames as content.
+
+    Used by the routes that return datasets and predictions: the payload is encoded
+    straight from the arrays instead of being converted to Python lists and encoded with
+    the standard library.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return serialization.dumps(content)
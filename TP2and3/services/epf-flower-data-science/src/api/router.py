@@ -1,7 +1,9 @@
 """API Router for Fast API."""
 from fastapi import APIRouter
 
-from src.api.routes import hello, docs, data, load, process, split, train_model, predict,firestore_parameters
+from src.services import jobs
+
+from src.api.routes import hello, docs, data, load, process, split, train_model, train_jobs, search, predict,firestore_parameters, metrics, profiles
 
 router = APIRouter()
 
@@ -12,7 +14,12 @@ router.include_router(load.router, tags=["Load"])
 router.include_router(process.router, tags=["Process"])
 router.include_router(split.router, tags=["Split"])
 router.include_router(train_model.router, tags=["Train Model"])
+if jobs.TRAIN_JOBS_ENABLED:
+    router.include_router(train_jobs.router, tags=["Train Jobs"])
+router.include_router(search.router, tags=["Hyperparameter Search"])
 router.include_router(predict.router, tags=["Predict"])
 router.include_router(firestore_parameters.router, tags=["Firestore Parameters"])
+router.include_router(metrics.router, tags=["Metrics"])
+router.include_router(profiles.router, tags=["Profiles"])
 
 
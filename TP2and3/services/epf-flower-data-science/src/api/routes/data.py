@@ -3,8 +3,9 @@ import opendatasets as od
 from fastapi import APIRouter
 from typing import Dict
 import logging
+from src.services.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
+from src.services.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 # Redirect the root endpoint "/" to the Swagger UI
 @router.get("/", include_in_schema=False)
@@ -1,17 +1,72 @@
-from fastapi import APIRouter, HTTPException, Request
-from google.cloud import firestore
-from typing import Dict, Union, List
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
-from google.oauth2 import service_account
-import google.auth
 from firebase_admin import auth
+from src.services import metrics
+from src.services.firebase import get_async_firestore_client, get_firebase_app, get_firestore_client, run_blocking
+from src.services.listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, list_page, parse_filter
+from src.services.tokens import get_token_cache
+from src.services.parameters import (
+    CACHE_LISTEN,
+    MAX_IMPORT_SIZE,
+    PARAMETERS_COLLECTION,
+    PARAMETERS_DOCUMENT,
+    CollectionCache,
+    append_parameter_set,
+    delete_collection,
+    get_collection_cache,
+    import_documents,
+)
+from src.services.profiling import ProfiledRoute
 
 # Initialisation de l'API router
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def get_parameters_cache(db: Any = Depends(get_async_firestore_client)) -> CollectionCache:
+    """FastAPI dependency returning the in-memory cache of the "parameters" collection."""
+    return get_collection_cache(db, PARAMETERS_COLLECTION)
+
 
-# Initialiser Firestore
-credentials = service_account.Credentials.from_service_account_file( 'TP2and3/careful-maxim-443609-j6-bbedea89fd10.json'  )
-db = firestore.Client(credentials=credentials)
+async def read_page(
+    collection: Any,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+    filters: List[str],
+    order_by: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Read one page of a collection for a list endpoint.
+
+    Args:
+        collection: The Firestore collection.
+        limit: The page size.
+        cursor: The `next_cursor` of the previous page.
+        fields: Comma-separated fields to return.
+        filters: `<field><operator><value>` filters.
+        order_by: The field to order the documents by.
+
+    Returns:
+        The documents of the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: 422 if a filter or the cursor is invalid.
+    """
+    try:
+        page = await list_page(
+            collection,
+            limit=limit,
+            cursor=cursor,
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+            filters=[parse_filter(expression) for expression in filters],
+            order_by=order_by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"items": page.items, "next_cursor": page.next_cursor}
 
 
 class Parameters(BaseModel):
@@ -30,6 +85,12 @@ class ParametersResponse(BaseModel):
     message: str
     parameters: dict
 
+
+class ParametersImport(BaseModel):
+    """Pydantic model for a bulk import of parameter sets, keyed by document id."""
+    parameters: Dict[str, Parameters]
+    merge: bool = True
+
 class UserRegisterRequest(BaseModel):
     """Pydantic model for user registration."""
     email: str
@@ -38,10 +99,15 @@ class UserRegisterRequest(BaseModel):
 
 
 @router.get("/parameters")
-async def get_parameters() -> Dict[str, Union[Dict[str, str], str]]:
+async def get_parameters(
+    parameters_cache: CollectionCache = Depends(get_parameters_cache),
+) -> Dict[str, Dict[str, Any]]:
     """
     Retrieve all parameters from the Firestore "parameters" collection.
 
+    The collection is served from an in-memory cache, refreshed after its TTL, after a
+    write through this API or by a snapshot listener (`PARAMETERS_CACHE_LISTEN`).
+
     Returns:
         A dictionary of parameters from the Firestore collection or an error message in case of failure.
     
@@ -52,25 +118,55 @@ async def get_parameters() -> Dict[str, Union[Dict[str, str], str]]:
         }
     """
     try:
-        # Retrieve all documents from the "parameters" collection
-        docs = db.collection("parameters").stream()
-
-        # Prepare the response data in a dictionary format
-        parameters = {}
-        for doc in docs:
-            parameters[doc.id] = doc.to_dict()
-
-        return parameters
+        # Retrieve all documents from the "parameters" collection (through the cache)
+        return await parameters_cache.get_all()
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching parameters: {e}")
 
 
+@router.get("/parameters/page")
+async def get_parameters_page(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    filter: List[str] = Query([]),
+    order_by: Optional[str] = None,
+    db: Any = Depends(get_async_firestore_client),
+) -> Dict[str, Any]:
+    """
+    List the documents of the "parameters" collection one page at a time.
+
+    Endpoint:
+        GET /parameters/page?limit=100&fields=n_estimators,criterion&filter=n_estimators>=100
+
+    Parameters:
+        limit: The page size (at most `MAX_PAGE_SIZE`).
+        cursor: The `next_cursor` of the previous page.
+        fields: Comma-separated fields to return (all by default).
+        filter: `<field><operator><value>` filters, repeatable (`==`, `!=`, `<`, `<=`, `>`, `>=`).
+        order_by: The field to order the documents by (then by id).
+
+    Returns:
+        The documents of the page with their id, and the cursor of the next page (None on the
+        last page).
+    """
+    page = await read_page(db.collection(PARAMETERS_COLLECTION), limit, cursor, fields, filter, order_by)
+    return {"parameters": page["items"], "next_cursor": page["next_cursor"]}
+
+
 @router.post("/parameters", response_model=ParametersResponse)
-async def add_or_update_parameters(parameters: Parameters) -> ParametersResponse:
+async def add_or_update_parameters(
+    parameters: Parameters,
+    db: Any = Depends(get_async_firestore_client),
+    parameters_cache: CollectionCache = Depends(get_parameters_cache),
+) -> ParametersResponse:
     """
     Add or update parameters in Firestore.
 
+    The parameters are added as a new `param_<n>` field of the "parameters" document, in a
+    transaction: concurrent additions do not overwrite each other.
+
     Args:
         parameters: The parameters to be added or updated.
 
@@ -81,54 +177,113 @@ async def add_or_update_parameters(parameters: Parameters) -> ParametersResponse
         HTTPException: If an error occurs while interacting with Firestore.
     """
     try:
-        doc_ref = db.collection("parameters").document("parameters")
-        doc = doc_ref.get()
-
-        # Si le document existe déjà, récupérez les paramètres existants
-        if doc.exists:
-            existing_params = doc.to_dict()
-            param_num = len(existing_params) + 1
-            param_key = f"param_{param_num}"
-            existing_params[param_key] = parameters.dict()  # Ajouter le nouveau paramètre
-            doc_ref.set(existing_params)  # Mettre à jour le document
-        else:
-            # Si le document n'existe pas, créez-le avec le premier paramètre
-            doc_ref.set({f"param_1": parameters.dict()})
+        doc_ref = db.collection(PARAMETERS_COLLECTION).document(PARAMETERS_DOCUMENT)
+        await append_parameter_set(db, doc_ref, parameters.dict())
 
+        parameters_cache.invalidate()
         return ParametersResponse(message="Paramètre ajouté avec succès", parameters=parameters.dict())
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Une erreur s'est produite : {str(e)}")
 
 
-def clear_collection(collection_name: str) -> None:
+@router.post("/parameters/bulk")
+async def import_parameters(
+    request: ParametersImport,
+    db: Any = Depends(get_firestore_client),
+    parameters_cache: CollectionCache = Depends(get_parameters_cache),
+) -> Dict[str, Any]:
+    """
+    Import many parameter sets at once, one document per set.
+
+    Endpoint:
+        POST /parameters/bulk
+
+    Parameters:
+        request: The parameter sets keyed by document id, and whether to merge them into
+            existing documents (default) or replace those.
+
+    Returns:
+        A message and the number of documents written.
+
+    Raises:
+        HTTPException: 413 if there are more than `MAX_IMPORT_SIZE` sets, 500 if the import fails.
+    """
+    if len(request.parameters) > MAX_IMPORT_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_IMPORT_SIZE} parameter sets per import.")
+    try:
+        documents = {doc_id: params.dict() for doc_id, params in request.parameters.items()}
+        # BulkWriter is synchronous: run it off the event loop
+        written = await run_blocking(import_documents, db, PARAMETERS_COLLECTION, documents, merge=request.merge)
+        parameters_cache.invalidate()
+        return {"message": "Paramètres importés avec succès", "written": written}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'import : {e}")
+
+
+@router.get("/parameters/cache")
+async def get_parameters_cache_stats(
+    parameters_cache: CollectionCache = Depends(get_parameters_cache),
+) -> Dict[str, object]:
+    """
+    Return the hit rate and staleness of the "parameters" cache.
+
+    Returns:
+        The cache counters, the age of the cached copy and whether a snapshot listener runs.
+    """
+    return parameters_cache.stats()
+
+
+@router.on_event("startup")
+def start_parameters_listener() -> None:
+    """Keep the "parameters" cache up to date with a snapshot listener when enabled."""
+    if CACHE_LISTEN:
+        try:
+            collection = get_firestore_client().collection(PARAMETERS_COLLECTION)
+            get_parameters_cache(get_async_firestore_client()).start_listener(collection)
+        except Exception as e:
+            logging.warning(f"Parameters snapshot listener not started: {e}")
+
+
+@router.on_event("shutdown")
+def stop_parameters_listener() -> None:
+    """Stop the snapshot listener of the "parameters" cache."""
+    if CACHE_LISTEN:
+        get_parameters_cache(get_async_firestore_client()).stop_listener()
+
+
+def clear_collection(collection_name: str, db: Any = None) -> int:
     """
     Clear all documents from a Firestore collection.
 
     Args:
         collection_name: The name of the collection to be cleared.
+        db: The Firestore client, the shared client by default.
 
     Returns:
-        None
+        The number of documents deleted.
 
     Raises:
         None: Just deletes documents from the specified collection.
     """
-    # Récupérer tous les documents dans la collection
-    collection_ref = db.collection(collection_name)
-    docs = collection_ref.stream()
-
-    # Supprimer chaque document
-    for doc in docs:
-        doc.reference.delete()
-        print(f"Document {doc.id} supprimé.")
+    # Supprimer les documents par lots (BulkWriter)
+    db = db or get_firestore_client()
+    deleted = delete_collection(db, collection_name)
+    if collection_name == PARAMETERS_COLLECTION:
+        get_parameters_cache(get_async_firestore_client()).invalidate()
+    return deleted
 
 # Appeler la fonction pour effacer tous les documents dans la collection 'parameters'
 #clear_collection('parameters')
 
 
 @router.post("/parameters/{param_id}")
-async def update_parameter(param_id: str, param: ParamUpdate) -> Dict[str, str]:
+async def update_parameter(
+    param_id: str,
+    param: ParamUpdate,
+    db: Any = Depends(get_async_firestore_client),
+    parameters_cache: CollectionCache = Depends(get_parameters_cache),
+) -> Dict[str, str]:
     """
     Update parameters in Firestore based on param_id.
 
@@ -143,16 +298,18 @@ async def update_parameter(param_id: str, param: ParamUpdate) -> Dict[str, str]:
         HTTPException: If an error occurs while updating the parameter.
     """
     try:
-        doc_ref = db.collection("parameters").document(param_id)
+        doc_ref = db.collection(PARAMETERS_COLLECTION).document(param_id)
         
         # Log the parameters that will be updated
-        print(f"Updating parameter {param_id} with: {param.dict()}")
+        logging.info(f"Updating parameter {param_id} with: {param.dict()}")
         
-        # Met à jour le document avec les nouveaux paramètres
-        doc_ref.set({
-            "n_estimators": param.n_estimators,
-            "criterion": param.criterion
-        })
+        # Met à jour uniquement ces champs du document (les autres sont conservés)
+        with metrics.timer("firestore_write"):
+            await doc_ref.set({
+                "n_estimators": param.n_estimators,
+                "criterion": param.criterion
+            }, merge=True)
+        parameters_cache.invalidate()
         
         return {"message": f"Paramètre {param_id} mis à jour avec succès."}
     
@@ -165,12 +322,13 @@ async def update_parameter(param_id: str, param: ParamUpdate) -> Dict[str, str]:
 ############## Step 16 ################
 
 
-def verify_token(token: str) -> dict:
+def verify_token(token: str, firebase_app: Any = None) -> dict:
     """
     Verify the ID token using Firebase Authentication.
 
     Args:
         token: The Firebase ID token to verify.
+        firebase_app: The Firebase Admin app, the shared app by default.
 
     Returns:
         A dictionary with the decoded user information.
@@ -179,18 +337,42 @@ def verify_token(token: str) -> dict:
         HTTPException: If the token is invalid.
     """
     try:
-        # Verify the token with Firebase Authentication
-        decoded_token = auth.verify_id_token(token)
+        # Verify the token with Firebase Authentication (once per token, until it expires)
+        decoded_token = get_token_cache().verify(token, firebase_app or get_firebase_app())
         return decoded_token  # Contains user information
     except Exception as e:
         raise HTTPException(status_code=401, detail="Unauthorized. Invalid token.")
 
-def get_current_user(request: Request) -> dict:
+async def verify_token_async(token: str, firebase_app: Any) -> dict:
+    """
+    Verify the ID token without blocking the event loop.
+
+    A cached verification is returned directly, otherwise the token is verified in the
+    Firebase thread pool.
+
+    Args:
+        token: The Firebase ID token to verify.
+        firebase_app: The Firebase Admin app.
+
+    Returns:
+        A dictionary with the decoded user information.
+
+    Raises:
+        Exception: The error of `auth.verify_id_token` if the token is invalid.
+    """
+    claims = get_token_cache().lookup(token)
+    if claims is not None:
+        return claims
+    return await run_blocking(get_token_cache().verify, token, firebase_app)
+
+
+async def get_current_user(request: Request, firebase_app: Any = Depends(get_firebase_app)) -> dict:
     """
     Get the current user from the request by extracting and verifying the token.
 
     Args:
         request: The FastAPI Request object.
+        firebase_app: The Firebase Admin app.
 
     Returns:
         A dictionary with the user information.
@@ -204,33 +386,21 @@ def get_current_user(request: Request) -> dict:
         raise HTTPException(status_code=401, detail="Authorization token missing")
     
     # The token is usually in the form "Bearer <token>"
-    token = authorization_header.split(" ")[1]
-    print(token)
+    scheme, _, token = authorization_header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Unauthorized. Invalid token.")
     # Verify the token
-    user = verify_token(token)
-    print(user)
+    try:
+        user = await verify_token_async(token, firebase_app)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Unauthorized. Invalid token.")
 
     return user
 
 ############## Step 17 ################
 
-import firebase_admin
-
-from fastapi import APIRouter, HTTPException, Depends
-from firebase_admin import auth
-
-router = APIRouter()
-
-credentials = service_account.Credentials.from_service_account_file( 'TP2and3/careful-maxim-443609-j6-bbedea89fd10.json'  )
-
-
-firebase_admin.initialize_app(credentials)
-
-from fastapi import Query
-
 @router.post("/register")
-
-async def register_user(email: str, password: str) -> dict:
+async def register_user(email: str, password: str, firebase_app: Any = Depends(get_firebase_app)) -> dict:
     """
     Register a new user using Firebase Authentication.
 
@@ -246,10 +416,13 @@ async def register_user(email: str, password: str) -> dict:
     """
     try:
         # Create user with email and password
-        new_user = auth.create_user(
-            email=email,
-            password=password,
-        )
+        with metrics.timer("firebase_auth"):
+            new_user = await run_blocking(
+                auth.create_user,
+                email=email,
+                password=password,
+                app=firebase_app,
+            )
         return {"message": f"User {new_user.uid} created successfully!"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error registering user: {e}")
@@ -257,7 +430,7 @@ async def register_user(email: str, password: str) -> dict:
 
 
 @router.post("/login")
-async def login_user(id_token: str) -> dict:
+async def login_user(id_token: str, firebase_app: Any = Depends(get_firebase_app)) -> dict:
     """
     Login a user using Firebase Authentication and ID token.
 
@@ -272,7 +445,7 @@ async def login_user(id_token: str) -> dict:
     """
     try:
         # Verify the ID token
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = await verify_token_async(id_token, firebase_app)
         return {"message": "User logged in successfully", "user_info": decoded_token}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid ID token")
@@ -280,7 +453,7 @@ async def login_user(id_token: str) -> dict:
 
 
 @router.post("/logout")
-async def logout_user(id_token: str) -> dict:
+async def logout_user(id_token: str, firebase_app: Any = Depends(get_firebase_app)) -> dict:
     """
     Log out the user by revoking their refresh token.
 
@@ -295,8 +468,11 @@ async def logout_user(id_token: str) -> dict:
     """
     try:
         # Revoke the refresh token for the current user (force logout)
-        decoded_token = auth.verify_id_token(id_token)
-        auth.revoke_refresh_tokens(decoded_token["uid"])
+        decoded_token = await verify_token_async(id_token, firebase_app)
+        with metrics.timer("firebase_auth"):
+            await run_blocking(auth.revoke_refresh_tokens, decoded_token["uid"], app=firebase_app)
+        # Les tokens de cet utilisateur ne sont plus servis depuis le cache
+        get_token_cache().evict_user(decoded_token["uid"])
         return {"message": "User logged out successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Error logging out user")
@@ -317,12 +493,57 @@ def assign_admin_role(user_uid: str) -> None:
         Exception: If there is an error assigning the role.
     """
     try:
-        auth.set_custom_user_claims(user_uid, {"role": "admin"})
+        auth.set_custom_user_claims(user_uid, {"role": "admin"}, app=get_firebase_app())
     except Exception as e:
-        print(f"Error assigning role: {e}")
+        logging.error(f"Error assigning role: {e}")
 
 
 
+def get_role(claims: dict) -> str:
+    """
+    Get the role of a user from the claims of their verified ID token.
+
+    Args:
+        claims: The decoded ID token.
+
+    Returns:
+        The user's role (default is "user" if no custom role is set).
+    """
+    return claims.get("role", "user")  # Default role is "user"
+
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    FastAPI dependency returning the current user if they are an administrator.
+
+    Raises:
+        HTTPException: 401 if the token is missing or invalid, 403 if the user is not an admin.
+    """
+    if get_role(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required.")
+    return current_user
+
+
+async def is_admin(authorization: Optional[str]) -> bool:
+    """
+    Tell whether an `Authorization` header carries the ID token of an administrator.
+
+    Args:
+        authorization: The header value, "Bearer <token>".
+
+    Returns:
+        True if the token is valid and has the admin role.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        claims = await verify_token_async(token, get_firebase_app())
+    except Exception:
+        return False
+    return get_role(claims) == "admin"
+
+
 def get_user_role(id_token: str) -> str:
     """
     Get the role of a user by verifying their Firebase ID token.
@@ -337,34 +558,46 @@ def get_user_role(id_token: str) -> str:
         HTTPException: If there is an error fetching the role.
     """
     try:
-        decoded_token = auth.verify_id_token(id_token)
-        role = decoded_token.get("role", "user")  # Default role is "user"
-        return role
+        decoded_token = get_token_cache().verify(id_token, get_firebase_app())
+        return get_role(decoded_token)
     except Exception as e:
         raise HTTPException(status_code=400, detail="Error fetching user role")
 
 
 @router.get("/users")
-async def get_all_users(request: Request, current_user: dict = Depends(get_current_user)) -> dict:
+async def get_all_users(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    filter: List[str] = Query([]),
+    order_by: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: Any = Depends(get_async_firestore_client),
+) -> dict:
     """
-    Get all users from Firestore (admins only).
+    Get the users from Firestore, one page at a time (admins only).
 
     Args:
         request: The FastAPI Request object.
+        limit: The page size (at most `MAX_PAGE_SIZE`).
+        cursor: The `next_cursor` of the previous page.
+        fields: Comma-separated fields to return (all by default).
+        filter: `<field><operator><value>` filters, repeatable, e.g. `role==admin`.
+        order_by: The field to order the users by (then by id).
         current_user: The currently authenticated user.
 
     Returns:
-        A dictionary containing all users.
+        A dictionary containing the users of the page and the cursor of the next page.
 
     Raises:
         HTTPException: If the user is not an admin.
     """
-    role = get_user_role(current_user["uid"])
+    # The token was already verified by get_current_user
+    role = get_role(current_user)
     if role != "admin":
         raise HTTPException(status_code=403, detail="Forbidden. Admins only.")
     
-    # Fetch all users from Firestore (or another service)
-    users = db.collection("users").stream()
-    users_list = [user.to_dict() for user in users]
-    
-    return {"users": users_list}
+    # Fetch one page of users from Firestore
+    page = await read_page(db.collection("users"), limit, cursor, fields, filter, order_by)
+    return {"users": page["items"], "next_cursor": page["next_cursor"]}
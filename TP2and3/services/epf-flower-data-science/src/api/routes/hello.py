@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 from src.schemas.message import MessageResponse
+from src.services.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/hello/{name}", name="Demo route", response_model=MessageResponse)
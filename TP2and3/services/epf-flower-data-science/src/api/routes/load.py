@@ -1,37 +1,156 @@
 import os
-import pandas as pd
-from fastapi import APIRouter
-from typing import Dict, Union
+from fastapi import APIRouter, Header, HTTPException, Query
+from typing import Dict, List, Optional, Union
 import logging
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 
-router = APIRouter()
+from src.api.caching import cache_headers, etag_matches, make_etag, not_modified
+from src.api.responses import FastJSONResponse
+from src.services import data
+from src.services.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# Maximum number of rows returned by one page of /load-iris-dataset/page
+MAX_PAGE_SIZE = 10_000
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
 
 # New endpoint to load the dataset as a pandas DataFrame and return it as JSON
-@router.get("/load-iris-dataset", name="Load Iris Dataset")
-def load_iris_dataset() -> Union[JSONResponse, Dict[str, str]]:
+@router.get("/load-iris-dataset", name="Load Iris Dataset", response_model=None)
+def load_iris_dataset(if_none_match: Optional[str] = Header(None)) -> Union[Response, Dict[str, str]]:
     """
     Load the Iris dataset as a pandas DataFrame and return it as a JSON response.
 
+    The dataset is served from the process-wide cache of `src.services.data`: the CSV is
+    only parsed again when the file changes on disk. The response carries an ETag derived
+    from the content hash of the file; a request with a matching `If-None-Match` gets a
+    `304 Not Modified` without body.
+
     Endpoint:
         GET /load-iris-dataset
 
+    Parameters:
+        if_none_match (str, optional): The ETag of the copy the client already has.
+
     Returns:
-        Union[JSONResponse, Dict[str, str]]: A JSON response containing the Iris dataset in JSON format, 
+        Union[Response, Dict[str, str]]: A JSON response containing the Iris dataset in JSON format, 
         or an error message if the dataset is not found or cannot be loaded.
     """    
-    data_dir = "TP2and3/services/epf-flower-data-science/src/data"
-    iris_path = os.path.join(data_dir, "iris.csv")
+    iris_path = data.IRIS_PATH
 
     if not os.path.exists(iris_path):
         return {"error": "Dataset not found. Please download the dataset first."}
 
-    # Load the dataset into a pandas DataFrame
+    # Get the dataset (and its pre-encoded JSON body) from the cache
     try:
-        iris_df = pd.read_csv(iris_path)
-        # Convert the DataFrame to a dictionary (using to_dict() to make it JSON serializable)
-        iris_json = iris_df.to_dict(orient="records")
-        return JSONResponse(content={"data": iris_json})
+        dataset = data.get_dataset_cache(iris_path).get()
+        etag = make_etag("load-iris-dataset", dataset.fingerprint.sha256)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(content=dataset.json_bytes, media_type="application/json", headers=cache_headers(etag))
     except Exception as e:
         logging.error(f"Error loading dataset: {e}")
         return {"error": f"Failed to load dataset: {e}"}
+
+
+@router.get("/load-iris-dataset/cache", name="Iris Dataset Cache Statistics")
+def dataset_cache_stats() -> Dict[str, object]:
+    """
+    Return the hit/miss counters of the Iris dataset cache.
+
+    Endpoint:
+        GET /load-iris-dataset/cache
+
+    Returns:
+        Dict[str, object]: The cache counters and the fingerprint of the cached file.
+    """
+    return data.get_dataset_cache(data.IRIS_PATH).stats()
+
+
+@router.get("/load-iris-dataset/stream", name="Stream Iris Dataset")
+def stream_iris_dataset(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    columns: Optional[List[str]] = Query(None),
+    chunk_size: int = Query(data.STREAM_CHUNK_SIZE, ge=1, le=100_000),
+) -> StreamingResponse:
+    """
+    Stream the Iris dataset as NDJSON or CSV.
+
+    The file is read with a chunked `read_csv` and every chunk is encoded and sent before
+    the next one is read, so memory stays flat whatever the size of the file.
+
+    Endpoint:
+        GET /load-iris-dataset/stream
+
+    Parameters:
+        format (str): "ndjson" (one JSON record per line) or "csv".
+        columns (List[str], optional): Only stream these columns.
+        chunk_size (int): The number of rows read per chunk.
+
+    Returns:
+        StreamingResponse: The streamed dataset.
+
+    Raises:
+        HTTPException: 404 if the dataset is not found, 422 if a column does not exist.
+    """
+    iris_path = data.IRIS_PATH
+    if not os.path.exists(iris_path):
+        raise HTTPException(status_code=404, detail="Dataset not found. Please download the dataset first.")
+    try:
+        data.check_columns(iris_path, columns)
+    except KeyError as e:
+        raise HTTPException(status_code=422, detail=e.args[0])
+
+    chunks = data.iter_csv_chunks(iris_path, chunk_size=chunk_size, columns=columns)
+    body = data.stream_ndjson(chunks) if format == "ndjson" else data.stream_csv(chunks)
+    return StreamingResponse(body, media_type=STREAM_MEDIA_TYPES[format])
+
+
+@router.get("/load-iris-dataset/page", name="Paginate Iris Dataset")
+def page_iris_dataset(
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = Query(None),
+) -> FastJSONResponse:
+    """
+    Return one page of the Iris dataset.
+
+    Use either `offset`, or the `next_cursor` of the previous page: the cursor points
+    directly at the next row in the file, so deep pages cost the same as the first one.
+
+    Endpoint:
+        GET /load-iris-dataset/page
+
+    Parameters:
+        limit (int): The maximum number of rows of the page.
+        offset (int): The index of the first row (ignored when a cursor is given).
+        cursor (str, optional): The cursor returned by the previous page.
+        columns (List[str], optional): Only return these columns.
+
+    Returns:
+        FastJSONResponse: The rows of the page, its offset and the cursor of the next page
+        (null on the last page).
+
+    Raises:
+        HTTPException: 404 if the dataset is not found, 422 if a column or the cursor is
+        invalid, 409 if the dataset changed since the cursor was issued.
+    """
+    iris_path = data.IRIS_PATH
+    if not os.path.exists(iris_path):
+        raise HTTPException(status_code=404, detail="Dataset not found. Please download the dataset first.")
+    try:
+        page = data.read_page(iris_path, limit=limit, offset=offset, cursor=cursor, columns=columns)
+    except KeyError as e:
+        raise HTTPException(status_code=422, detail=e.args[0])
+    except data.StaleCursorError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return FastJSONResponse(content={
+        "data": page.frame,
+        "offset": page.offset,
+        "next_cursor": page.next_cursor,
+    })
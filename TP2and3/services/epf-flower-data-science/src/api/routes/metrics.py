@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.services import metrics
+from src.services.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get("/metrics", name="Prometheus Metrics")
+def get_metrics() -> Response:
+    """
+    Expose the metrics of this process in the Prometheus text format.
+
+    Under serve.py each worker keeps its own metrics: a scrape returns those of the worker
+    that answered, labelled with its `worker` process id.
+
+    Endpoint:
+        GET /metrics
+
+    Returns:
+        Response: The request latency histograms and in-flight gauges per route, the stage
+        timers (CSV load, scaling, split, fit, joblib load/dump, predict, Firestore calls)
+        and the hit ratio of each cache.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
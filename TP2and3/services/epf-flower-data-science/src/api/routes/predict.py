@@ -1,14 +1,20 @@
 import os
-import json
+import time
 import logging
-import joblib
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
+from src.api.responses import FastJSONResponse
+from src.services import compiled, metrics, models
+from src.services.cleaning import FEATURE_COLUMNS
+from src.services.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Maximum number of rows accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "10000"))
 
 # Define a Pydantic model for the input data (features)
 class IrisFeatures(BaseModel):
@@ -18,10 +24,74 @@ class IrisFeatures(BaseModel):
     PetalWidthCm: float
 
 
+# Define a Pydantic model for a batch of input rows
+class IrisBatch(BaseModel):
+    """
+    A batch of feature rows, either row-oriented or columnar.
+
+    `rows` holds objects with the same keys as `IrisFeatures`, `columns` maps each feature
+    name to the list of its values. The values are validated as one block when the batch
+    is converted to a float matrix, not field by field.
+    """
+    rows: Optional[List[Dict[str, Any]]] = None
+    columns: Optional[Dict[str, List[Any]]] = None
+
+
+def batch_to_matrix(batch: IrisBatch, max_batch_size: int) -> np.ndarray:
+    """
+    Convert a batch payload into a float feature matrix, validating it as a block.
+
+    Parameters:
+        batch (IrisBatch): The batch payload.
+        max_batch_size (int): The maximum number of rows accepted.
+
+    Returns:
+        np.ndarray: A `(n_rows, 4)` float64 matrix in `FEATURE_COLUMNS` order.
+
+    Raises:
+        HTTPException: 422 if the payload is malformed, 413 if the batch is too large.
+    """
+    if (batch.rows is None) == (batch.columns is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of 'rows' or 'columns'.")
+
+    if batch.rows is not None:
+        n_rows = len(batch.rows)
+    else:
+        missing = [c for c in FEATURE_COLUMNS if c not in batch.columns]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing feature columns: {missing}")
+        lengths = {len(batch.columns[c]) for c in FEATURE_COLUMNS}
+        if len(lengths) != 1:
+            raise HTTPException(status_code=422, detail="All feature columns must have the same length.")
+        n_rows = lengths.pop()
+
+    if n_rows == 0:
+        raise HTTPException(status_code=422, detail="The batch is empty.")
+    if n_rows > max_batch_size:
+        raise HTTPException(status_code=413, detail=f"Batch of {n_rows} rows exceeds the limit of {max_batch_size}.")
+
+    try:
+        if batch.rows is not None:
+            frame = pd.DataFrame.from_records(batch.rows, columns=FEATURE_COLUMNS)
+        else:
+            frame = pd.DataFrame({c: batch.columns[c] for c in FEATURE_COLUMNS})
+        X = frame.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid feature values: {e}")
+
+    if not np.isfinite(X).all():
+        bad_rows = np.flatnonzero(~np.isfinite(X).all(axis=1))[:10].tolist()
+        raise HTTPException(status_code=422, detail=f"Missing or non-finite feature values in rows {bad_rows}")
+    return X
+
+
 # Load the trained model from the file
 def load_trained_model(model_name: str) -> Any:
     """
-    Load a trained model from the file system.
+    Load a trained model through the process-wide model registry.
+
+    The model is only deserialized on the first request, after an eviction or when its
+    artifact was rewritten by `/train-model`.
 
     Parameters:
         model_name (str): The name of the trained model to load.
@@ -32,14 +102,30 @@ def load_trained_model(model_name: str) -> Any:
     Raises:
         FileNotFoundError: If the model file does not exist.
     """
-    model_path = os.path.join("TP2and3/services/epf-flower-data-science/src", "models", f"{model_name}.joblib")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file '{model_name}.joblib' not found at {model_path}")
-    return joblib.load(model_path)
+    return models.get_model_registry().get(model_name)
+
+
+def load_predictor(model_name: str, n_rows: int = 1) -> Any:
+    """
+    Return the fastest up-to-date predictor of a trained model for `n_rows` rows.
+
+    Tree models exported by `/train-model` are served by their compiled node arrays
+    (`src.services.compiled`), which skip the per-call overhead of scikit-learn, as long
+    as the batch is small enough for them to be faster. The other models, large batches
+    and tree models whose artifact changed since their export are served by the model
+    registry.
+
+    Raises:
+        FileNotFoundError: If the model file does not exist.
+    """
+    engine = compiled.get_compiled(model_name)
+    if engine is not None and engine.suits(n_rows):
+        return engine
+    return load_trained_model(model_name)
 
 
 @router.post("/predict", name="Make Predictions with Trained Model")
-def predict(model_name: str, features: IrisFeatures) -> JSONResponse:
+def predict(model_name: str, features: IrisFeatures) -> FastJSONResponse:
     """
     Make predictions using a trained model and provided input features.
 
@@ -51,25 +137,26 @@ def predict(model_name: str, features: IrisFeatures) -> JSONResponse:
         features (IrisFeatures): A Pydantic model containing the input features for prediction.
 
     Returns:
-        JSONResponse: A JSON response containing the model name and predictions.
+        FastJSONResponse: A JSON response containing the model name and predictions.
 
     Raises:
         HTTPException: If the model file is not found or if an error occurs during prediction.
     """
     try:
-        # Load the trained model
-        model = load_trained_model(model_name)
+        # Load the trained model (its compiled version when it has one)
+        model = load_predictor(model_name)
 
-        # Prepare the feature data for prediction
-        input_data = pd.DataFrame([features.dict()])
+        # Prepare the feature data for prediction (raw features, the model scales them)
+        input_data = np.array([[getattr(features, c) for c in FEATURE_COLUMNS]], dtype=np.float64)
 
         # Make predictions using the trained model
-        predictions = model.predict(input_data)
+        with metrics.timer("predict"):
+            predictions = model.predict(input_data)
 
         # Return the predictions as a JSON response
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "model_name": model_name,
-            "predictions": predictions.tolist()  # Convert the predictions to a list for JSON compatibility
+            "predictions": predictions  # The array is encoded directly
         })
 
     except FileNotFoundError as e:
@@ -79,3 +166,84 @@ def predict(model_name: str, features: IrisFeatures) -> JSONResponse:
     except Exception as e:
         logging.error(f"Error during prediction: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to make prediction: {e}")
+
+
+@router.post("/predict/batch", name="Make Batch Predictions with Trained Model")
+def predict_batch(
+    model_name: str,
+    batch: IrisBatch,
+    return_probabilities: bool = False,
+    max_batch_size: Optional[int] = Query(None, ge=1),
+) -> FastJSONResponse:
+    """
+    Make predictions for a whole batch of rows with a single vectorized model call.
+
+    Endpoint:
+        POST /predict/batch
+
+    Parameters:
+        model_name (str): The name of the trained model to use for predictions.
+        batch (IrisBatch): The feature rows, row-oriented or columnar.
+        return_probabilities (bool): Also return `predict_proba` for each row.
+        max_batch_size (int, optional): Lower the batch size limit for this request; it
+            cannot exceed `PREDICT_MAX_BATCH_SIZE`.
+
+    Returns:
+        FastJSONResponse: The predictions (and probabilities) with the batch size and the
+        validation/prediction timings in milliseconds.
+
+    Raises:
+        HTTPException: If the batch is invalid or too large, the model file is not found,
+        or an error occurs during prediction.
+    """
+    start = time.perf_counter()
+    limit = MAX_BATCH_SIZE if max_batch_size is None else min(max_batch_size, MAX_BATCH_SIZE)
+    X = batch_to_matrix(batch, limit)
+    validated = time.perf_counter()
+
+    try:
+        model = load_predictor(model_name, len(X))
+    except FileNotFoundError as e:
+        logging.error(f"Model not found: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if return_probabilities and not hasattr(model, "predict_proba"):
+        raise HTTPException(status_code=400, detail=f"Model '{model_name}' does not support probabilities.")
+
+    try:
+        loaded = time.perf_counter()
+        content: Dict[str, Any] = {
+            "model_name": model_name,
+            "batch_size": len(X),
+            "predictions": model.predict(X),
+        }
+        if return_probabilities:
+            content["classes"] = model.classes_
+            content["probabilities"] = model.predict_proba(X)
+        predicted = time.perf_counter()
+        metrics.observe_stage("predict", predicted - loaded)
+    except Exception as e:
+        logging.error(f"Error during batch prediction: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to make prediction: {e}")
+
+    content["timing_ms"] = {
+        "validation": (validated - start) * 1000,
+        "model_lookup": (loaded - validated) * 1000,
+        "prediction": (predicted - loaded) * 1000,
+        "total": (predicted - start) * 1000,
+    }
+    return FastJSONResponse(content=content)
+
+
+@router.get("/models/registry", name="Model Registry Statistics")
+def model_registry_stats() -> Dict[str, Any]:
+    """
+    Return the cached models and the per-model hit rate and load time of the registry.
+
+    Endpoint:
+        GET /models/registry
+
+    Returns:
+        Dict[str, Any]: The model registry statistics.
+    """
+    return models.get_model_registry().stats()
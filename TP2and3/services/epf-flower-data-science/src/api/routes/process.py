@@ -1,88 +1,96 @@
-import os
-import pandas as pd
 import logging
-from typing import Dict, Union
-from fastapi import APIRouter
-from sklearn.preprocessing import StandardScaler
-from fastapi.responses import JSONResponse
-from src.api.routes import load  
+from typing import Dict, Optional, Union
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from src.api.caching import cache_headers, etag_matches, make_etag, not_modified
+from src.api.responses import FastJSONResponse
+from src.api.routes.load import STREAM_MEDIA_TYPES
+from src.services import chunked, data, pipeline
+from src.services.profiling import ProfiledRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.get("/process-data", name="Process Iris Dataset")
-def process_data() -> Union[JSONResponse, Dict[str, str]]:
+@router.get("/process-data", name="Process Iris Dataset", response_model=None)
+def process_data(if_none_match: Optional[str] = Header(None)) -> Union[Response, Dict[str, str]]:
     """
     Process the Iris dataset by scaling the features and returning the processed data.
 
+    The result only depends on the content of the dataset: it carries an ETag, and a
+    request with a matching `If-None-Match` gets a `304 Not Modified` before anything is
+    computed.
+
     Endpoint:
         GET /process-data
 
+    Parameters:
+        if_none_match (str, optional): The ETag of the copy the client already has.
+
     Returns:
-        Union[JSONResponse, Dict[str, str]]: A JSON response containing the processed dataset in JSON format, 
+        Union[FastJSONResponse, Dict[str, str]]: A JSON response containing the processed dataset in JSON format, 
         or an error message if processing fails.
 
     Steps:
-        1. Verify that the Iris dataset exists in the specified directory.
-        2. Load the dataset using the `load_iris_dataset` function.
-        3. Extract and clean the dataset, ensuring required columns are present.
-        4. Scale the feature columns using `StandardScaler`.
-        5. Return the processed dataset as a JSON response.
+        1. Load the features from the memory-mapped snapshot of the dataset (`pipeline.load_features`).
+           The snapshot is built from the CSV file, cleaned by `cleaning.clean_dataset`, when
+           the file changes.
+        2. Scale the feature columns using `StandardScaler` (`pipeline.scale_features`).
+        3. Return the processed dataset as a JSON response.
     """
-    data_dir = "TP2and3/services/epf-flower-data-science/src/data"
-    iris_path = os.path.join(data_dir, "iris.csv")
-
-    if not os.path.exists(iris_path):
-        return {"error": "Dataset not found. Please download the dataset first."}
-
     try:
-        # Get the dataset from the /load-iris-dataset endpoint (via load function)
-        iris_response = load.load_iris_dataset()  # Call the load function to get the data
-
-        # Check if the response contains an error
-        if isinstance(iris_response, dict) and "error" in iris_response:
-            return iris_response  # Return the error if it exists
-        
-        # Extract the actual content from JSONResponse (assuming it returns JSON in the body)
-        iris_json = iris_response.body.decode("utf-8")  # Get the response body and decode it
-        
-        # Convert the string into a dictionary (JSON data)
-        import json
-        iris_data = json.loads(iris_json)
-
-        # Check if the data is nested under a key like 'data'
-        if 'data' in iris_data:
-            iris_data = iris_data['data']  # Extract the nested data
-
-        # Convert the processed data back into a DataFrame
-        iris_df = pd.DataFrame(iris_data)
-
-        # Log the columns for debugging
-        logging.info(f"Columns in the DataFrame: {iris_df.columns.tolist()}")
-
-        # Fix potential issues with column names (strip any whitespace)
-        iris_df.columns = iris_df.columns.str.strip()
-
-        # Check if 'Species' column exists (after cleaning the column names)
-        if 'Species' not in iris_df.columns:
-            return {"error": "Failed to process dataset: 'Species' column not found in the data."}
-
-        # Separate features and target
-        y = iris_df['Species']    # Target (species column)
-        X = iris_df.drop(iris_df.columns[[0, -1]], axis=1)
-        
-        # Apply feature scaling
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)  # Scale features
-        
-        # Rebuild the scaled DataFrame with the target
-        iris_scaled_df = pd.DataFrame(X_scaled, columns=X.columns)
-        iris_scaled_df['Species'] = y
-        
-        # Convert the processed DataFrame to JSON
-        iris_scaled_json = iris_scaled_df.to_dict(orient="records")
-        return JSONResponse(content={"data": iris_scaled_json})
-    
+        etag = _process_etag(pipeline.dataset_key())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        scaled = pipeline.process()
+    except FileNotFoundError:
+        return {"error": "Dataset not found. Please download the dataset first."}
     except Exception as e:
         logging.error(f"Error processing dataset: {e}")
         return {"error": f"Failed to process dataset: {e}"}
+
+    # Only the final result is serialized
+    return FastJSONResponse(content={"data": scaled.to_frame()}, headers=cache_headers(_process_etag(scaled.key)))
+
+
+@router.get("/process-data/chunked", name="Process Iris Dataset Out-of-Core")
+def process_data_chunked(
+    source: str = Query("csv", regex="^(csv|snapshot)$"),
+    block_rows: int = Query(chunked.BLOCK_ROWS, ge=1, le=1_000_000),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+) -> StreamingResponse:
+    """
+    Scale the Iris dataset block by block and stream the result.
+
+    Unlike `/process-data`, the dataset is never loaded whole: the scaler statistics are
+    computed with `partial_fit` over blocks of `block_rows` rows, the scaled blocks are
+    written to disk, then streamed back one block at a time. Rows appended to the CSV
+    file since the previous call only update the statistics.
+
+    Endpoint:
+        GET /process-data/chunked
+
+    Parameters:
+        source (str): "csv" to read the CSV file, "snapshot" to read its columnar snapshot.
+        block_rows (int): The number of rows held in memory at once.
+        format (str): "ndjson" (one JSON record per line) or "csv".
+
+    Returns:
+        StreamingResponse: The scaled features and the target.
+
+    Raises:
+        HTTPException: 404 if the dataset is not found, 422 if it cannot be processed.
+    """
+    try:
+        artifact = chunked.get_chunked_preprocessor().get(data.IRIS_PATH, source, block_rows)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found. Please download the dataset first.")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to process dataset: {e}")
+
+    frames = artifact.iter_frames(block_rows)
+    body = data.stream_ndjson(frames) if format == "ndjson" else data.stream_csv(frames)
+    return StreamingResponse(body, media_type=STREAM_MEDIA_TYPES[format])
+
+
+def _process_etag(key: str) -> str:
+    return make_etag("process-data", key, "StandardScaler")
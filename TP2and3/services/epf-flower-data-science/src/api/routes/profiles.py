@@ -0,0 +1,72 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from src.api.routes.firestore_parameters import get_admin_user
+from src.services.profiling import ProfiledRoute, ProfileStore
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def get_profile_store() -> ProfileStore:
+    """FastAPI dependency returning the store of the saved profiles."""
+    return ProfileStore()
+
+
+@router.get("/profiles", name="List Request Profiles")
+def list_profiles(
+    admin: dict = Depends(get_admin_user),
+    store: ProfileStore = Depends(get_profile_store),
+) -> List[Dict[str, Any]]:
+    """
+    List the saved request profiles, newest first (admins only).
+
+    A request is profiled when an admin sends it with the `X-Profile: cprofile` (or
+    `sample`) header or the `?profile=cprofile` query parameter.
+
+    Endpoint:
+        GET /profiles
+
+    Returns:
+        List[Dict[str, Any]]: The summary of each profile: route, status, total time and
+        time spent in each stage.
+    """
+    return store.list()
+
+
+@router.get("/profiles/{profile_id}", name="Get Request Profile", response_model=None)
+def get_profile(
+    profile_id: str,
+    download: bool = False,
+    admin: dict = Depends(get_admin_user),
+    store: ProfileStore = Depends(get_profile_store),
+) -> Any:
+    """
+    Return a saved request profile (admins only).
+
+    Endpoint:
+        GET /profiles/{profile_id}
+
+    Parameters:
+        profile_id (str): The `X-Profile-Id` header of the profiled response.
+        download (bool): Return the raw profile instead of its summary: a `.pstats` file
+            (`python -m pstats`, snakeviz) or a `.collapsed` stack file (flamegraph.pl,
+            speedscope).
+
+    Returns:
+        The summary with the stage breakdown and the top functions, or the raw profile.
+
+    Raises:
+        HTTPException: 404 if there is no such profile.
+    """
+    try:
+        summary = store.load(profile_id)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found.")
+    if not download:
+        return summary
+    if "file" not in summary:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' has no profile file.")
+    suffix = summary["file"].rsplit(".", 1)[-1]
+    return FileResponse(store.path(profile_id, suffix), filename=summary["file"], media_type="application/octet-stream")
@@ -0,0 +1,125 @@
+import logging
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, validator
+
+from src.services import pipeline, search
+from src.services.training import get_model, load_model_parameters, train
+from src.services.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+class SearchRequest(BaseModel):
+    """
+    Pydantic model for a hyperparameter search.
+
+    Give either `param_grid` (every combination is evaluated) or `param_distributions`
+    (`n_iter` candidates are drawn; each entry is a list of choices or a range
+    `{"low": ..., "high": ..., "log": bool, "type": "int" | "float"}`).
+    """
+    model_name: str
+    param_grid: Optional[Dict[str, List[Any]]] = None
+    param_distributions: Optional[Dict[str, Any]] = None
+    n_iter: int = Field(10, ge=1)
+    cv: int = Field(search.DEFAULT_CV, ge=2, le=20)
+    halving: bool = False
+    factor: int = Field(3, ge=2)
+    min_resources: Optional[int] = Field(None, ge=1)
+    max_seconds: Optional[float] = Field(None, gt=0)
+    n_jobs: int = Field(-1, ge=-1, le=search.MAX_JOBS)
+    random_state: int = 42
+    refit: bool = False
+
+    @validator("n_jobs")
+    def n_jobs_is_not_zero(cls, value: int) -> int:
+        if value == 0:
+            raise ValueError("n_jobs must be -1 (all cores) or a positive number of workers.")
+        return value
+
+
+@router.post("/search-hyperparameters", name="Search Model Hyperparameters")
+def search_hyperparameters(request: SearchRequest) -> Dict[str, Any]:
+    """
+    Cross-validate a parameter grid or a random-search space on the training set.
+
+    The candidates are fitted in parallel on cross-validation folds computed once per
+    dataset version, and every `(params, fold)` score is memoized so repeated searches
+    only pay for new candidates. Successive halving (`halving`) and a wall-clock budget
+    (`max_seconds`) keep large searches bounded.
+
+    Endpoint:
+        POST /search-hyperparameters
+
+    Parameters:
+        request (SearchRequest): The model, its search space and the search options. The
+            candidates override the parameters of `model_parameters.json`.
+
+    Returns:
+        Dict[str, Any]: The ranked candidates with their mean and standard deviation
+        scores, the best parameters, the halving rounds and, with `refit`, the result of
+        training and publishing the best model.
+
+    Raises:
+        HTTPException: 404 if the model or the dataset is not found, 422 if the search space
+        or the options are invalid.
+    """
+    if (request.param_grid is None) == (request.param_distributions is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of 'param_grid' or 'param_distributions'.")
+
+    base_params = load_model_parameters().get(request.model_name, {})
+    try:
+        get_model(request.model_name, {})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        if request.param_grid is not None:
+            candidates = search.expand_grid(request.param_grid)
+        else:
+            candidates = search.sample_space(request.param_distributions, request.n_iter, request.random_state)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not candidates or len(candidates) > search.MAX_CANDIDATES:
+        raise HTTPException(
+            status_code=422, detail=f"The search must have between 1 and {search.MAX_CANDIDATES} candidates."
+        )
+
+    try:
+        dataset = pipeline.split()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    result = search.search(
+        request.model_name,
+        candidates,
+        dataset.X_train,
+        dataset.y_train,
+        key=dataset.key,
+        base_params=base_params,
+        cv=request.cv,
+        halving=request.halving,
+        factor=request.factor,
+        min_resources=request.min_resources,
+        max_seconds=request.max_seconds,
+        n_jobs=request.n_jobs,
+        random_state=request.random_state,
+    )
+
+    if request.refit and result["best_params"] is not None:
+        logging.info(f"Refitting {request.model_name} with {result['best_params']}")
+        result["refit"] = train(request.model_name, result["best_params"], dataset).to_dict()
+    return result
+
+
+@router.get("/search-hyperparameters/cache", name="Hyperparameter Search Cache Statistics")
+def search_cache_stats() -> Dict[str, int]:
+    """
+    Return the counters of the cross-validation fold and score caches.
+
+    Endpoint:
+        GET /search-hyperparameters/cache
+
+    Returns:
+        Dict[str, int]: The number of cached folds and scores, and the memoization hits and misses.
+    """
+    return search.cache_stats()
@@ -0,0 +1,123 @@
+import logging
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from src.services import jobs
+from src.services.training import get_model, load_model_parameters
+from src.services.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+class TrainJobRequest(BaseModel):
+    """Pydantic model for a training job request."""
+    model_name: str
+    parameters: Optional[Dict[str, Any]] = None
+
+
+@router.post("/train-jobs", name="Submit a Training Job", status_code=202)
+def submit_train_job(request: TrainJobRequest) -> Dict[str, Any]:
+    """
+    Queue the training of a classification model and return immediately.
+
+    The model is trained in a process pool; poll `GET /train-jobs/{job_id}` for its state.
+    Submitting the same model and parameters as a job that has not finished yet returns
+    that job.
+
+    Endpoint:
+        POST /train-jobs
+
+    Parameters:
+        request (TrainJobRequest): The model name and, optionally, its parameters (the ones
+            of `model_parameters.json` by default).
+
+    Returns:
+        Dict[str, Any]: The job id and state.
+
+    Raises:
+        HTTPException: 404 if the model or its parameters are unknown, 429 if too many
+        jobs are pending.
+    """
+    params = request.parameters
+    if params is None:
+        params = load_model_parameters().get(request.model_name)
+        if params is None:
+            raise HTTPException(status_code=404, detail=f"Model '{request.model_name}' parameters not found.")
+    try:
+        # Fail fast on unknown models or invalid parameters
+        get_model(request.model_name, params)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        job = jobs.get_job_manager().submit(request.model_name, params)
+    except jobs.QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    logging.info(f"Training job {job.id} submitted for {request.model_name}")
+    return {"job_id": job.id, "state": job.state.value}
+
+
+@router.get("/train-jobs", name="List Training Jobs")
+def list_train_jobs() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    List the training jobs, most recent first.
+
+    Endpoint:
+        GET /train-jobs
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The jobs with their state.
+    """
+    return {"jobs": [job.to_dict() for job in jobs.get_job_manager().list()]}
+
+
+@router.get("/train-jobs/{job_id}", name="Get a Training Job")
+def get_train_job(job_id: str) -> Dict[str, Any]:
+    """
+    Return the state, timings and artifact path of a training job.
+
+    Endpoint:
+        GET /train-jobs/{job_id}
+
+    Parameters:
+        job_id (str): The job id returned by `POST /train-jobs`.
+
+    Returns:
+        Dict[str, Any]: The job state; finished jobs also report their queue and run times,
+        their artifact path and test accuracy, or their error.
+
+    Raises:
+        HTTPException: 404 if the job does not exist.
+    """
+    job = jobs.get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found.")
+    return job.to_dict()
+
+
+@router.delete("/train-jobs/{job_id}", name="Cancel a Training Job")
+def cancel_train_job(job_id: str) -> Dict[str, Any]:
+    """
+    Cancel a training job that has not started yet.
+
+    Endpoint:
+        DELETE /train-jobs/{job_id}
+
+    Parameters:
+        job_id (str): The job id.
+
+    Returns:
+        Dict[str, Any]: The job, in the cancelled state.
+
+    Raises:
+        HTTPException: 404 if the job does not exist, 409 if it already started.
+    """
+    try:
+        cancelled = jobs.get_job_manager().cancel(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found.")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail=f"Training job '{job_id}' already started.")
+    return jobs.get_job_manager().get(job_id).to_dict()
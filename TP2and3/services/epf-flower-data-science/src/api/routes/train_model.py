@@ -1,136 +1,205 @@
 import os
-import json
+import time
 import logging
-import joblib
 import pandas as pd
-from typing import Optional, Union, Dict, Any
-from fastapi import APIRouter
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.naive_bayes import GaussianNB
+from typing import Any, List, Optional, Union, Dict
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 
-from src.api.routes import split
+from src.services import online
+from src.services import training
+from src.services.training import load_model_parameters, train, train_all
+from src.services.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-# Load model parameters from the JSON file
-def load_model_parameters() -> Dict[str, Dict[str, Any]]:
+# Maximum number of rows accepted by one online update
+MAX_UPDATE_ROWS = int(os.environ.get("ONLINE_MAX_UPDATE_ROWS", "10000"))
+
+
+class LabeledRows(BaseModel):
+    """New labeled rows: objects with the keys of `IrisFeatures` and `Species`."""
+    rows: List[Dict[str, Any]]
+
+@router.get("/train-model", name="Train a Classification Model", response_model=None)
+def train_model(model_name: str) -> Union[JSONResponse, Dict[str, str]]:
     """
-    Load model parameters from a JSON configuration file.
+    Train a classification model with preprocessed data and save it to disk.
+
+    The dataset goes through the in-process pipeline (load, clean, scale, split, fit)
+    without being serialized between the stages.
+
+    Endpoint:
+        GET /train-model
+
+    Parameters:
+        model_name (str): The name of the classification model to train (e.g., "RandomForestClassifier").
 
     Returns:
-        dict: A dictionary containing model parameters for each model type.
+        JSONResponse: A JSON response containing the status of the training process, the path where the model 
+        was saved, or an error message in case of failure.
 
     Raises:
-        FileNotFoundError: If the configuration file is not found.
-        json.JSONDecodeError: If the configuration file cannot be parsed as JSON.
+        Exception: If an error occurs during model training or saving.
     """
-    model_params_path = os.path.join("TP2and3/services/epf-flower-data-science/src/config", "model_parameters.json")
-    if not os.path.exists(model_params_path):
-        raise FileNotFoundError(f"Model parameters file not found at {model_params_path}")
-    
-    with open(model_params_path, 'r') as f:
-        return json.load(f)
+    try:
+        # Load model parameters
+        model_params = load_model_parameters()
+
+        if model_name not in model_params:
+            return {"error": f"Model '{model_name}' parameters not found."}
+
+        # Load, clean, scale and split the data, train the model and save it, behind the scaler it
+        # was trained with, to the src/models folder; the model registry swaps it in for /predict
+        result = train(model_name, model_params[model_name])
+        model_save_path = result.model_path
 
+        return JSONResponse(content={
+            "message": f"Model '{model_name}' trained and saved to {model_save_path}",
+            "model_path": model_save_path
+        })
 
-# Select the model based on the name and parameters
-def get_model(model_name: str, params: Dict[str, Any]) -> Any:
+    except Exception as e:
+        logging.error(f"Error training model: {e}")
+        return {"error": f"Failed to train model: {e}"}
+
+
+@router.get("/train-models", name="Train All Configured Models")
+def train_models(
+    model_names: Optional[List[str]] = Query(None),
+    max_workers: Optional[int] = Query(None, ge=1, le=training.MAX_WORKERS),
+) -> Dict[str, Any]:
     """
-    Retrieve a classification model instance based on the provided model name and parameters.
+    Train every model of `model_parameters.json`, or a subset, concurrently across cores.
+
+    The dataset is loaded and split once and shared by all the fits, which run in a
+    process pool. A model that fails to train is reported with its error without failing
+    the others.
+
+    Endpoint:
+        GET /train-models
 
     Parameters:
-        model_name (str): The name of the classification model (e.g., "RandomForestClassifier").
-        params (dict): A dictionary of parameters to initialize the model.
+        model_names (List[str], optional): The models to train (all configured models by default).
+        max_workers (int, optional): The number of worker processes, at most `TRAIN_MAX_WORKERS`
+            (the number of CPUs by default).
 
     Returns:
-        sklearn.base.BaseEstimator: An instance of the specified classification model.
+        Dict[str, Any]: The fit time, artifact size, test accuracy and path of each model,
+        the most accurate model and the total wall-clock time.
 
     Raises:
-        ValueError: If the provided model name is not recognized.
-    """    
-    if model_name == "RandomForestClassifier":
-        return RandomForestClassifier(**params)
-    elif model_name == "SVC":
-        return SVC(**params)
-    elif model_name == "KNeighborsClassifier":
-        return KNeighborsClassifier(**params)
-    elif model_name == "DecisionTreeClassifier":
-        return DecisionTreeClassifier(**params)
-    elif model_name == "GaussianNB":
-        return GaussianNB(**params)
-    else:
-        raise ValueError(f"Model '{model_name}' not recognized.")
-
-
-@router.get("/train-model", name="Train a Classification Model")
-def train_model(model_name: str) -> Union[JSONResponse, Dict[str, str]]:
+        HTTPException: 404 if a requested model has no parameters.
     """
-    Train a classification model with preprocessed data and save it to disk.
+    start = time.perf_counter()
+    try:
+        results = train_all(model_names, max_workers=max_workers)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    trained = {name: result for name, result in results.items() if "error" not in result}
+    best_model = max(trained, key=lambda name: trained[name]["test_accuracy"]) if trained else None
+    return {
+        "models": results,
+        "best_model": best_model,
+        "total_seconds": time.perf_counter() - start,
+    }
+
+
+@router.get("/train-model/online", name="Train a Model Online")
+def train_model_online(
+    model_name: str,
+    batch_rows: int = Query(online.BATCH_ROWS, ge=1, le=1_000_000),
+    epochs: int = Query(1, ge=1, le=100),
+) -> Dict[str, Any]:
+    """
+    Train a model that supports `partial_fit` (SGDClassifier, GaussianNB, MultinomialNB,
+    Perceptron...) on mini-batches streamed from disk, and publish it for /predict as
+    `<model_name>.online`, next to the model of the same name trained by /train-model.
+
+    The dataset is scaled out-of-core, then fed in shuffled mini-batches of `batch_rows`
+    rows; the model is checkpointed periodically. Afterwards, new labeled rows update it
+    through `POST /train-model/online/{model_name}/rows` without a full retrain.
 
     Endpoint:
-        GET /train-model
+        GET /train-model/online
 
     Parameters:
-        model_name (str): The name of the classification model to train (e.g., "RandomForestClassifier").
+        model_name (str): The name of the classification model. Its parameters are read
+            from `model_parameters.json`, the defaults are used when it has none.
+        batch_rows (int): The number of rows per mini-batch.
+        epochs (int): The number of passes over the dataset.
 
     Returns:
-        JSONResponse: A JSON response containing the status of the training process, the path where the model 
-        was saved, or an error message in case of failure.
+        Dict[str, Any]: The name to predict with (`served_as`), the model path, the rows,
+        mini-batches and checkpoints of the run.
 
     Raises:
-        Exception: If an error occurs during model training or saving.
+        HTTPException: 404 if the dataset is not found, 422 if the model does not support
+        online training.
     """
     try:
-        # Call the split_data function from the split module and get the data
-        split_data_response = split.split_data()
+        params = load_model_parameters().get(model_name, {})
+        result = online.get_online_trainer().train(model_name, params, batch_rows=batch_rows, epochs=epochs)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return result.to_dict()
 
-        # If the response is a JSONResponse, extract the body content and parse it as JSON
-        if isinstance(split_data_response, JSONResponse):
-            split_data = split_data_response.body.decode("utf-8")  # Decode the response body
-            split_data = json.loads(split_data)  # Convert the string to a Python dictionary
-        else:
-            split_data = split_data_response  # If it's already a dict, use it directly
 
-        # Check if the response contains the necessary data
-        if "train_data" not in split_data or "test_data" not in split_data:
-            return {"error": "Split data does not contain the required fields."}
+@router.post("/train-model/online/{model_name}/rows", name="Update a Model Online")
+def update_model_online(model_name: str, batch: LabeledRows) -> Dict[str, Any]:
+    """
+    Update a model trained online with new labeled rows, and publish it for /predict.
 
-        # Extract the train data
-        train_data = split_data["train_data"]
-        X_train = pd.DataFrame(train_data["X_train"])
-        y_train = pd.Series(train_data["y_train"])
+    Only the new rows are fitted (`partial_fit`), with the scaler of the initial training.
 
-        # Load model parameters
-        model_params = load_model_parameters()
+    Endpoint:
+        POST /train-model/online/{model_name}/rows
 
-        if model_name not in model_params:
-            return {"error": f"Model '{model_name}' parameters not found."}
+    Parameters:
+        model_name (str): The name of a model trained by `/train-model/online`.
+        batch (LabeledRows): The new rows, with their features and `Species`.
 
-        # Get the parameters for the selected model
-        model_params_for_selected = model_params[model_name]
+    Returns:
+        Dict[str, Any]: The model path and the number of rows the model has seen.
 
-        # Get the model instance
-        model = get_model(model_name, model_params_for_selected)
+    Raises:
+        HTTPException: 404 if the model was never trained online, 413 if there are too
+        many rows, 422 if the rows are malformed or have a label unknown to the model.
+    """
+    if not batch.rows:
+        raise HTTPException(status_code=422, detail="No rows.")
+    if len(batch.rows) > MAX_UPDATE_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_UPDATE_ROWS} rows per update.")
+    try:
+        X, y = online.labeled_rows(pd.DataFrame.from_records(batch.rows))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-        # Train the model
-        model.fit(X_train, y_train)
+    try:
+        result = online.get_online_trainer().update(model_name, X, y)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return result.to_dict()
 
-        # Ensure the directory exists before saving the model
-        model_dir = os.path.join("TP2and3/services/epf-flower-data-science/src", "models")
-        os.makedirs(model_dir, exist_ok=True)  # Create the directory if it doesn't exist
 
-        # Save the trained model to the src/models folder
-        model_save_path = os.path.join(model_dir, f"{model_name}.joblib")
-        joblib.dump(model, model_save_path)
+@router.get("/train-model/online/{model_name}", name="Online Model Statistics")
+def online_model_stats(model_name: str) -> Dict[str, Any]:
+    """
+    Return the classes, features and counters of a model trained online.
 
-        return JSONResponse(content={
-            "message": f"Model '{model_name}' trained and saved to {model_save_path}",
-            "model_path": model_save_path
-        })
+    Endpoint:
+        GET /train-model/online/{model_name}
 
-    except Exception as e:
-        logging.error(f"Error training model: {e}")
-        return {"error": f"Failed to train model: {e}"}
+    Raises:
+        HTTPException: 404 if the model was never trained online.
+    """
+    try:
+        return online.get_online_trainer().stats(model_name)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -2,6 +2,8 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from src.api.router import router
+from src.api.routes.firestore_parameters import is_admin
+from src.services import firebase, jobs, metrics, profiling
 
 
 def get_application() -> FastAPI:
@@ -18,7 +20,14 @@ def get_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag"],
     )
+    if profiling.PROFILING_ENABLED:
+        application.add_middleware(profiling.ProfilingMiddleware, authorize=is_admin)
+    application.add_middleware(metrics.MetricsMiddleware)
 
     application.include_router(router)
+    application.add_event_handler("startup", firebase.warm_up)
+    application.add_event_handler("shutdown", jobs.shutdown_job_manager)
+    application.add_event_handler("shutdown", firebase.close)
     return application
@@ -0,0 +1,387 @@
+import hashlib
+import io
+import os
+import threading
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from src.services import data, metrics, preprocessing, snapshot
+from src.services.cleaning import TARGET_COLUMN, clean_dataset
+
+CHUNKED_VERSION = 1
+CHUNKED_DIR = os.path.join(preprocessing.PREPROCESSING_DIR, "chunked")
+SOURCES = ("csv", "snapshot")
+
+# Number of rows held in memory at once
+BLOCK_ROWS = int(os.environ.get("PREPROCESSING_BLOCK_ROWS", "100000"))
+
+# A block of raw features and the label names of its rows
+Block = Tuple[np.ndarray, np.ndarray]
+
+
+@dataclass(frozen=True)
+class ChunkedArtifact:
+    """Scaler fitted block by block and the scaled matrix it wrote to disk."""
+    key: str
+    meta: Dict[str, Any]
+    scaler: StandardScaler
+    X_scaled: np.ndarray
+    labels: np.ndarray
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.meta["feature_names"]
+
+    @property
+    def categories(self) -> np.ndarray:
+        return np.asarray(self.meta["categories"])
+
+    def iter_frames(self, block_rows: int = BLOCK_ROWS) -> Iterator[pd.DataFrame]:
+        """Yield the `/process-data` table (scaled features and target) block by block."""
+        for start in range(0, len(self.X_scaled), block_rows):
+            frame = pd.DataFrame(np.asarray(self.X_scaled[start:start + block_rows]), columns=self.feature_names)
+            frame[TARGET_COLUMN] = self.categories[self.labels[start:start + block_rows]]
+            yield frame
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read a binary file up to a byte offset, ignoring what was appended after it."""
+
+    def __init__(self, f: io.BufferedReader, end: int) -> None:
+        self._f = f
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        size = min(len(buffer), self._end - self._f.tell())
+        if size <= 0:
+            return 0
+        chunk = self._f.read(size)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def iter_csv_blocks(path: str, block_rows: int, start: int = 0, end: Optional[int] = None) -> Iterator[Block]:
+    """
+    Read the cleaned features and labels of a CSV file in blocks of `block_rows` rows.
+
+    Args:
+        path: The CSV file.
+        block_rows: The number of rows per block.
+        start: The byte offset of the first row to read (the header is always read).
+        end: The byte offset where reading stops, the end of the file by default.
+
+    Returns:
+        An iterator of `(features, labels)` blocks.
+
+    Raises:
+        ValueError: If the target column is missing.
+    """
+    end = os.stat(path).st_size if end is None else end
+    with open(path, "rb") as f:
+        columns = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns.tolist()
+        f.seek(max(start, f.tell()))
+        if f.tell() >= end:
+            return
+        reader = io.BufferedReader(_BoundedReader(f, end))
+        with pd.read_csv(reader, names=columns, header=None, chunksize=block_rows) as chunks:
+            for chunk in chunks:
+                dataset = clean_dataset(chunk)
+                yield dataset.features.to_numpy(dtype=np.float64), dataset.target.to_numpy()
+
+
+def iter_snapshot_blocks(dataset: snapshot.Snapshot, block_rows: int) -> Iterator[Block]:
+    """Read the features and labels of a snapshot in blocks of `block_rows` rows."""
+    for start in range(0, len(dataset.features), block_rows):
+        labels = dataset.categories[dataset.labels[start:start + block_rows]]
+        yield np.asarray(dataset.features[start:start + block_rows]), labels
+
+
+def partial_fit_blocks(blocks: Iterable[Block], scaler: Optional[StandardScaler] = None) -> Tuple[StandardScaler, Set[str], int]:
+    """
+    Update the running mean and variance of a scaler with each block.
+
+    Args:
+        blocks: The `(features, labels)` blocks.
+        scaler: A scaler already fitted on previous rows, a new one by default.
+
+    Returns:
+        The scaler, the label names seen and the number of rows read.
+    """
+    scaler = scaler or StandardScaler()
+    categories: Set[str] = set()
+    n_rows = 0
+    for X, y in blocks:
+        if len(X):
+            scaler.partial_fit(X)
+            categories.update(np.unique(y).tolist())
+            n_rows += len(X)
+    return scaler, categories, n_rows
+
+
+def write_scaled(
+    blocks: Iterable[Block],
+    scaler: StandardScaler,
+    n_rows: int,
+    categories: List[str],
+    directory: str,
+    tag: str,
+) -> Dict[str, str]:
+    """
+    Scale each block and write it into `.npy` files preallocated on disk.
+
+    Args:
+        blocks: The `(features, labels)` blocks, `n_rows` rows in total.
+        scaler: The fitted scaler.
+        n_rows: The number of rows.
+        categories: The sorted label names; the labels are written as their index.
+        directory: The output directory.
+        tag: The suffix of the file names.
+
+    Returns:
+        The file names of the scaled matrix and of the labels.
+    """
+    files = {"X_scaled": f"scaled-{tag}.npy", "labels": f"labels-{tag}.npy"}
+    # Unique temporary files: workers of other processes may write the same artifact
+    with ExitStack() as stack:
+        tmp = {key: stack.enter_context(snapshot.atomic_path(directory, name)) for key, name in files.items()}
+        X_out = np.lib.format.open_memmap(tmp["X_scaled"], mode="w+", dtype=np.float64, shape=(n_rows, scaler.n_features_in_))
+        labels_out = np.lib.format.open_memmap(tmp["labels"], mode="w+", dtype=np.int32, shape=(n_rows,))
+        row = 0
+        for X, y in blocks:
+            if row + len(X) > n_rows:
+                row += len(X)
+                break
+            X_out[row:row + len(X)] = scaler.transform(X)
+            labels_out[row:row + len(X)] = pd.Categorical(y, categories=categories).codes
+            row += len(X)
+        if row != n_rows:
+            raise ValueError(f"Expected {n_rows} rows, read {row}: the dataset changed while it was processed.")
+        X_out.flush()
+        labels_out.flush()
+        del X_out, labels_out
+    return files
+
+
+def _hash_prefix(path: str, size: int, prefix_size: int) -> Tuple[Optional[str], str]:
+    # Hash of the first `prefix_size` bytes (None if the file is shorter) and of the first `size` bytes
+    digest = hashlib.sha256()
+    prefix = None
+    read = 0
+    with open(path, "rb") as f:
+        for stop in (prefix_size, size):
+            while read < min(stop, size):
+                block = f.read(min(1 << 20, stop - read))
+                if not block:
+                    break
+                digest.update(block)
+                read += len(block)
+            if stop == prefix_size and read == prefix_size:
+                prefix = digest.hexdigest()
+    return prefix, digest.hexdigest()
+
+
+class ChunkedPreprocessor:
+    """
+    Out-of-core version of the scale stage.
+
+    The dataset is read in blocks of `block_rows` rows: a first pass updates the scaler
+    statistics with `partial_fit`, a second one writes the scaled blocks into a `.npy`
+    file on disk, so memory depends on the block size and not on the dataset size. The
+    scaler and the output are kept next to a `meta.json` describing the rows they cover.
+
+    With the CSV source, rows appended to the file since the last run only update the
+    statistics (the previous rows are not read again for them); the output is rewritten
+    since every row is scaled with the new mean and variance. Any other change refits
+    from scratch. The snapshot source refits whenever the snapshot changes; a snapshot
+    that has to be (re)built is converted from the CSV block by block too.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        """Init the preprocessor."""
+        self.directory = directory or CHUNKED_DIR
+        self._lock = threading.Lock()
+        # Dataset directory -> the artifact opened from its current files
+        self._artifacts: Dict[str, ChunkedArtifact] = {}
+        self.hits = 0
+        self.fits = 0
+        self.updates = 0
+
+    def dataset_dir(self, path: str, source: str) -> str:
+        """Return the directory of the artifacts of a dataset file and source."""
+        return os.path.join(self.directory, f"{source}-{hashlib.sha256(path.encode('utf-8')).hexdigest()[:16]}")
+
+    def get(self, path: Optional[str] = None, source: str = "csv", block_rows: int = BLOCK_ROWS) -> ChunkedArtifact:
+        """
+        Return the scaled dataset, fitting or updating it when the dataset changed.
+
+        Args:
+            path: The CSV file. Defaults to the Iris dataset.
+            source: "csv" to read the CSV file, "snapshot" to read its columnar snapshot.
+            block_rows: The number of rows held in memory at once.
+
+        Returns:
+            The fitted scaler and the memory-mapped scaled matrix.
+
+        Raises:
+            FileNotFoundError: If the dataset file does not exist.
+            ValueError: If the source is unknown or the target column is missing.
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source '{source}', expected one of {SOURCES}.")
+        path = os.path.abspath(path or data.IRIS_PATH)
+        directory = self.dataset_dir(path, source)
+
+        with self._lock:
+            meta = snapshot.read_meta(directory)
+            if meta is not None and meta.get("chunked_version") != CHUNKED_VERSION:
+                meta = None
+            if source == "snapshot":
+                meta = self._process_snapshot(path, directory, meta, block_rows)
+            else:
+                meta = self._process_csv(path, directory, meta, block_rows)
+            return self._open(directory, meta)
+
+    def stats(self) -> Dict[str, object]:
+        """Return the preprocessor counters."""
+        return {"hits": self.hits, "fits": self.fits, "updates": self.updates}
+
+    def _process_csv(self, path: str, directory: str, meta: Optional[Dict[str, Any]], block_rows: int) -> Dict[str, Any]:
+        stat = os.stat(path)
+        if meta is not None and snapshot.matches(meta, stat):
+            self.hits += 1
+            return meta
+
+        previous = meta["source"]["size"] if meta is not None else 0
+        prefix, sha256 = _hash_prefix(path, stat.st_size, previous)
+        if meta is not None and sha256 == meta["source"]["sha256"]:
+            # Touched but unchanged: keep the artifacts, refresh the metadata
+            meta["source"].update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            snapshot.write_meta(directory, meta)
+            self.hits += 1
+            return meta
+
+        with metrics.timer("scale"):
+            if meta is not None and prefix == meta["source"]["sha256"] and stat.st_size > previous:
+                # Rows were appended: only the new ones update the statistics
+                scaler = joblib.load(os.path.join(directory, meta["files"]["scaler"]))
+                scaler, categories, n_new = partial_fit_blocks(iter_csv_blocks(path, block_rows, previous, stat.st_size), scaler)
+                n_rows = meta["n_rows"] + n_new
+                categories |= set(meta["categories"])
+                self.updates += 1
+            else:
+                scaler, categories, n_rows = partial_fit_blocks(iter_csv_blocks(path, block_rows, 0, stat.st_size))
+                self.fits += 1
+            blocks = iter_csv_blocks(path, block_rows, 0, stat.st_size)
+            return self._save(directory, stat, sha256, scaler, blocks, n_rows, sorted(categories), _feature_names(path))
+
+    def _process_snapshot(self, path: str, directory: str, meta: Optional[Dict[str, Any]], block_rows: int) -> Dict[str, Any]:
+        # A missing or outdated snapshot is built block by block as well
+        dataset = snapshot.get_snapshot(path, block_rows)
+        if meta is not None and meta["source"]["sha256"] == dataset.sha256:
+            self.hits += 1
+            return meta
+
+        with metrics.timer("scale"):
+            scaler, _, n_rows = partial_fit_blocks(iter_snapshot_blocks(dataset, block_rows))
+            self.fits += 1
+            return self._save(
+                directory,
+                os.stat(path),
+                dataset.sha256,
+                scaler,
+                iter_snapshot_blocks(dataset, block_rows),
+                n_rows,
+                dataset.categories.tolist(),
+                dataset.feature_names,
+            )
+
+    def _save(
+        self,
+        directory: str,
+        stat: os.stat_result,
+        sha256: str,
+        scaler: StandardScaler,
+        blocks: Iterable[Block],
+        n_rows: int,
+        categories: List[str],
+        feature_names: List[str],
+    ) -> Dict[str, Any]:
+        if n_rows == 0:
+            raise ValueError("The dataset has no rows.")
+        os.makedirs(directory, exist_ok=True)
+        tag = sha256[:16]
+        files = write_scaled(blocks, scaler, n_rows, categories, directory, tag)
+        files["scaler"] = f"scaler-{tag}.joblib"
+        snapshot.write_atomic(directory, files["scaler"], lambda f: joblib.dump(scaler, f))
+
+        # meta.json is replaced last: readers see the previous artifacts or the new ones
+        meta = {
+            "version": snapshot.SNAPSHOT_VERSION,
+            "chunked_version": CHUNKED_VERSION,
+            "source": {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256},
+            "n_rows": n_rows,
+            "feature_names": feature_names,
+            "target_column": TARGET_COLUMN,
+            "categories": categories,
+            "files": files,
+        }
+        snapshot.write_meta(directory, meta)
+        for name in os.listdir(directory):
+            if name != snapshot.META_FILE and name not in files.values() and not name.endswith(".tmp"):
+                os.remove(os.path.join(directory, name))
+        return meta
+
+    def _open(self, directory: str, meta: Dict[str, Any]) -> ChunkedArtifact:
+        # Caller holds the lock; the files are named after the dataset hash, so the same
+        # file names mean the same content
+        cached = self._artifacts.get(directory)
+        if cached is not None and cached.meta["files"] == meta["files"]:
+            return cached
+        files = {key: os.path.join(directory, name) for key, name in meta["files"].items()}
+        with metrics.timer("joblib_load"):
+            scaler = joblib.load(files["scaler"])
+        artifact = ChunkedArtifact(
+            key=meta["source"]["sha256"],
+            meta=meta,
+            scaler=scaler,
+            X_scaled=np.load(files["X_scaled"], mmap_mode="r"),
+            labels=np.load(files["labels"], mmap_mode="r"),
+        )
+        self._artifacts[directory] = artifact
+        return artifact
+
+
+def _feature_names(path: str) -> List[str]:
+    return clean_dataset(pd.read_csv(path, nrows=0)).features.columns.tolist()
+
+
+_preprocessor: Optional[ChunkedPreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_chunked_preprocessor() -> ChunkedPreprocessor:
+    """Return the process-wide out-of-core preprocessor."""
+    global _preprocessor
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = ChunkedPreprocessor()
+        return _preprocessor
+
+
+def _cache_counts() -> Optional[Tuple[int, int]]:
+    preprocessor = _preprocessor
+    if preprocessor is None:
+        return None
+    return preprocessor.hits, preprocessor.fits + preprocessor.updates
+
+
+metrics.register_cache("chunked_preprocessing", _cache_counts)
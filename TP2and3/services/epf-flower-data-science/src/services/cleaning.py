@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+TARGET_COLUMN = "Species"
+FEATURE_COLUMNS = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+
+
+@dataclass(frozen=True)
+class CleanDataset:
+    """Feature columns and target of a cleaned dataset."""
+    features: pd.DataFrame
+    target: pd.Series
+
+
+def clean_dataset(frame: pd.DataFrame) -> CleanDataset:
+    """
+    Clean a raw Iris DataFrame and separate the features from the target.
+
+    Column names are stripped of surrounding whitespace, the leading identifier column
+    and the trailing target column are removed from the features.
+
+    Args:
+        frame: The raw dataset, as read from the CSV file.
+
+    Returns:
+        The feature columns and the target column.
+
+    Raises:
+        ValueError: If the target column is missing.
+    """
+    columns = frame.columns.str.strip()
+    if TARGET_COLUMN not in columns:
+        raise ValueError(f"'{TARGET_COLUMN}' column not found in the data.")
+
+    frame = frame.set_axis(columns, axis=1)
+    features = frame.drop(frame.columns[[0, -1]], axis=1)
+    return CleanDataset(features=features, target=frame[TARGET_COLUMN])
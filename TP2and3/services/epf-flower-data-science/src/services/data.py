@@ -0,0 +1,324 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from src.services import metrics, serialization
+
+DATA_DIR = "TP2and3/services/epf-flower-data-science/src/data"
+IRIS_PATH = os.path.join(DATA_DIR, "iris.csv")
+
+STREAM_CHUNK_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class DatasetFingerprint:
+    """Identity of a dataset file on disk."""
+    mtime_ns: int
+    size: int
+    sha256: str
+
+
+@dataclass(frozen=True)
+class CachedDataset:
+    """A parsed dataset together with its pre-encoded JSON payload."""
+    path: str
+    fingerprint: DatasetFingerprint
+    frame: pd.DataFrame
+    json_bytes: bytes
+
+
+def encode_records(frame: pd.DataFrame) -> bytes:
+    """
+    Encode a DataFrame as the `{"data": [...]}` document returned by the data routes.
+
+    Args:
+        frame: The DataFrame to encode.
+
+    Returns:
+        The UTF-8 encoded JSON document.
+    """
+    return serialization.dumps({"data": frame})
+
+
+class DatasetCache:
+    """
+    Process-wide cache of a CSV dataset.
+
+    The parsed DataFrame and its JSON encoding are kept in memory. Every lookup only
+    does an `os.stat`: the file is re-read when its mtime or size changes, and it is
+    re-parsed only when the content hash differs from the cached one.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Init the cache for the file at `path`."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._entry: Optional[CachedDataset] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def get(self) -> CachedDataset:
+        """
+        Return the cached dataset, reloading it if the file changed.
+
+        Returns:
+            The cached dataset.
+
+        Raises:
+            FileNotFoundError: If the dataset file does not exist.
+        """
+        stat = os.stat(self.path)
+        entry = self._entry
+        if entry is not None and self._same_stat(entry.fingerprint, stat):
+            self.hits += 1
+            return entry
+
+        with self._lock:
+            entry = self._entry
+            if entry is not None and self._same_stat(entry.fingerprint, stat):
+                self.hits += 1
+                return entry
+
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            fingerprint = DatasetFingerprint(
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                sha256=hashlib.sha256(raw).hexdigest(),
+            )
+
+            if entry is not None and entry.fingerprint.sha256 == fingerprint.sha256:
+                # Touched but unchanged: keep the parsed data, refresh the fingerprint
+                self.revalidations += 1
+                self.hits += 1
+                self._entry = CachedDataset(self.path, fingerprint, entry.frame, entry.json_bytes)
+                return self._entry
+
+            self.misses += 1
+            with metrics.timer("csv_load"):
+                frame = pd.read_csv(io.BytesIO(raw))
+            self._entry = CachedDataset(self.path, fingerprint, frame, encode_records(frame))
+            return self._entry
+
+    def invalidate(self) -> None:
+        """Drop the cached dataset so the next lookup reloads it from disk."""
+        with self._lock:
+            self._entry = None
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Return the cache counters.
+
+        Returns:
+            A dictionary with the hit, miss and revalidation counts, the hit ratio and
+            the fingerprint of the cached file (if any).
+        """
+        lookups = self.hits + self.misses
+        entry = self._entry
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "sha256": entry.fingerprint.sha256 if entry else None,
+        }
+
+    @staticmethod
+    def _same_stat(fingerprint: DatasetFingerprint, stat: os.stat_result) -> bool:
+        return fingerprint.mtime_ns == stat.st_mtime_ns and fingerprint.size == stat.st_size
+
+
+_caches: Dict[str, DatasetCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_dataset_cache(path: Optional[str] = None) -> DatasetCache:
+    """
+    Return the process-wide cache for a dataset file.
+
+    Args:
+        path: The dataset path. Defaults to the Iris dataset.
+
+    Returns:
+        The cache shared by every caller asking for the same file.
+    """
+    key = os.path.abspath(path or IRIS_PATH)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = DatasetCache(key)
+        return _caches[key]
+
+
+def _cache_counts() -> Tuple[int, int]:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return sum(cache.hits for cache in caches), sum(cache.misses for cache in caches)
+
+
+metrics.register_cache("dataset", _cache_counts)
+
+
+def load_iris_frame(path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Return the Iris dataset as a DataFrame, served from the process-wide cache.
+
+    Args:
+        path: The dataset path. Defaults to the Iris dataset.
+
+    Returns:
+        The cached DataFrame. Callers must copy it before mutating it.
+
+    Raises:
+        FileNotFoundError: If the dataset file does not exist.
+    """
+    return get_dataset_cache(path).get().frame
+
+
+class StaleCursorError(ValueError):
+    """Raised when a pagination cursor was issued for a previous version of the file."""
+
+
+@dataclass(frozen=True)
+class DatasetPage:
+    """One page of rows read from a CSV file."""
+    frame: pd.DataFrame
+    offset: int
+    next_cursor: Optional[str]
+
+
+def read_columns(path: str) -> List[str]:
+    """Return the column names of a CSV file, reading only its header."""
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def check_columns(path: str, columns: Optional[List[str]]) -> None:
+    """
+    Check that the requested columns exist in a CSV file.
+
+    Raises:
+        KeyError: If a requested column does not exist.
+    """
+    if columns:
+        unknown = sorted(set(columns) - set(read_columns(path)))
+        if unknown:
+            raise KeyError(f"Unknown columns: {unknown}")
+
+
+def iter_csv_chunks(
+    path: str,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV file in fixed-size chunks, keeping at most one chunk in memory.
+
+    Args:
+        path: The CSV file.
+        chunk_size: The number of rows per chunk.
+        columns: Only read these columns (all of them when omitted).
+
+    Returns:
+        An iterator of DataFrames. Call `check_columns` first: the file is only opened
+        when the iteration starts.
+    """
+    with pd.read_csv(path, chunksize=chunk_size, usecols=columns) as reader:
+        for chunk in reader:
+            yield chunk[columns] if columns else chunk
+
+
+def stream_ndjson(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode DataFrame chunks as newline-delimited JSON records."""
+    for chunk in chunks:
+        if len(chunk):
+            yield chunk.to_json(orient="records", lines=True).rstrip("\n").encode("utf-8") + b"\n"
+
+
+def stream_csv(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode DataFrame chunks as one CSV document, with the header on the first chunk."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def _encode_cursor(byte_offset: int, row_offset: int, mtime_ns: int) -> str:
+    raw = json.dumps({"b": byte_offset, "r": row_offset, "m": mtime_ns}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, int, int]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(raw["b"]), int(raw["r"]), int(raw["m"])
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+def read_page(
+    path: str,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> DatasetPage:
+    """
+    Read one page of rows from a CSV file.
+
+    Rows are located line by line without parsing them, so memory only depends on the
+    page size. With `offset` the file is scanned up to the first row of the page; a
+    `cursor` (returned as `next_cursor` by the previous page) seeks directly to it. Rows
+    are assumed not to contain quoted line breaks.
+
+    Args:
+        path: The CSV file.
+        limit: The maximum number of rows of the page.
+        offset: The index of the first row, ignored when a cursor is given.
+        cursor: The opaque cursor of the page.
+        columns: Only return these columns (all of them when omitted).
+
+    Returns:
+        The page, its row offset and the cursor of the next page (None on the last page).
+
+    Raises:
+        KeyError: If a requested column does not exist.
+        ValueError: If the cursor is malformed.
+        StaleCursorError: If the file changed since the cursor was issued.
+    """
+    check_columns(path, columns)
+    mtime_ns = os.stat(path).st_mtime_ns
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        if cursor is not None:
+            byte_offset, offset, cursor_mtime_ns = _decode_cursor(cursor)
+            if cursor_mtime_ns != mtime_ns:
+                raise StaleCursorError("The dataset changed since the cursor was issued.")
+            f.seek(byte_offset)
+        else:
+            for _ in range(offset):
+                if not f.readline():
+                    break
+
+        lines = []
+        for _ in range(limit):
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+        next_offset = f.tell()
+        has_more = bool(lines) and bool(f.readline())
+
+    frame = pd.read_csv(io.BytesIO(header + b"".join(lines)), usecols=columns)
+    if columns:
+        frame = frame[columns]
+    next_cursor = _encode_cursor(next_offset, offset + len(lines), mtime_ns) if has_more else None
+    return DatasetPage(frame=frame, offset=offset, next_cursor=next_cursor)
@@ -0,0 +1,211 @@
+import os
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+import firebase_admin
+from firebase_admin import credentials as firebase_credentials
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore
+
+CREDENTIALS_PATH = os.environ.get("FIREBASE_CREDENTIALS", "TP2and3/careful-maxim-443609-j6-bbedea89fd10.json")
+EMULATOR_PROJECT = os.environ.get("GOOGLE_CLOUD_PROJECT", "demo-epf-flower")
+APP_NAME = "epf-flower-data-science"
+MAX_BLOCKING_WORKERS = int(os.environ.get("FIREBASE_MAX_WORKERS", "8"))
+
+T = TypeVar("T")
+
+
+class FirebaseProvider:
+    """
+    Process-wide Firestore clients and Firebase Admin app, created on first use.
+
+    The service-account key is read once and shared by all of them, and each Firestore
+    client (and so its gRPC channel) is reused by every request. Async routes use the
+    `AsyncClient`; the synchronous client serves what only exists synchronously (snapshot
+    listeners, `BulkWriter`). Blocking calls (Firebase Admin, bulk writes) run in a bounded
+    thread pool so they never stall the event loop. When `FIRESTORE_EMULATOR_HOST` is set,
+    the clients connect to the emulator without credentials.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str = CREDENTIALS_PATH,
+        client_factory: Optional[Callable[[], Any]] = None,
+        app_factory: Optional[Callable[[], Any]] = None,
+        async_client_factory: Optional[Callable[[], Any]] = None,
+        max_blocking_workers: int = MAX_BLOCKING_WORKERS,
+    ) -> None:
+        """
+        Init the provider; nothing is loaded until a client is requested.
+
+        Args:
+            credentials_path: The path of the service-account key file.
+            client_factory: Builds the Firestore client (e.g. a fake in tests).
+            app_factory: Builds the Firebase Admin app (e.g. a fake in tests).
+            async_client_factory: Builds the Firestore `AsyncClient` (e.g. a fake in tests).
+            max_blocking_workers: The number of threads running blocking calls.
+        """
+        self.credentials_path = credentials_path
+        self.max_blocking_workers = max_blocking_workers
+        self._client_factory = client_factory or self._create_client
+        self._app_factory = app_factory or self._create_app
+        self._async_client_factory = async_client_factory or self._create_async_client
+        self._lock = threading.Lock()
+        self._certificate: Optional[firebase_credentials.Certificate] = None
+        self._client: Any = None
+        self._async_client: Any = None
+        self._app: Any = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get_client(self) -> Any:
+        """Return the shared Firestore client."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._client_factory()
+            return self._client
+
+    def get_async_client(self) -> Any:
+        """Return the shared Firestore `AsyncClient`."""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = self._async_client_factory()
+            return self._async_client
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Return the bounded thread pool of the blocking calls."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_blocking_workers, thread_name_prefix="firebase"
+                )
+            return self._executor
+
+    def get_app(self) -> Any:
+        """Return the shared Firebase Admin app, used by `firebase_admin.auth`."""
+        with self._lock:
+            if self._app is None:
+                self._app = self._app_factory()
+            return self._app
+
+    def warm_up(self) -> bool:
+        """
+        Create the clients ahead of the first request.
+
+        Returns:
+            True if the clients are ready, False if they could not be created (the error is
+            logged and the creation is retried on the next request).
+        """
+        try:
+            self.get_async_client()
+            self.get_client()
+            self.get_app()
+            return True
+        except Exception as e:
+            logging.warning(f"Firebase clients not initialized: {e}")
+            return False
+
+    def close(self) -> None:
+        """Close the Firestore channels, the thread pool and delete the Firebase Admin app."""
+        with self._lock:
+            for client in (self._client, self._async_client):
+                if client is not None and hasattr(client, "close"):
+                    client.close()
+            if isinstance(self._app, firebase_admin.App):
+                firebase_admin.delete_app(self._app)
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._client = None
+            self._async_client = None
+            self._app = None
+            self._executor = None
+
+    def _get_certificate(self) -> firebase_credentials.Certificate:
+        # Caller holds the lock
+        if self._certificate is None:
+            self._certificate = firebase_credentials.Certificate(self.credentials_path)
+        return self._certificate
+
+    def _create_client(self) -> firestore.Client:
+        if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            return firestore.Client(project=EMULATOR_PROJECT, credentials=AnonymousCredentials())
+        certificate = self._get_certificate()
+        return firestore.Client(project=certificate.project_id, credentials=certificate.get_credential())
+
+    def _create_async_client(self) -> firestore.AsyncClient:
+        if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            return firestore.AsyncClient(project=EMULATOR_PROJECT, credentials=AnonymousCredentials())
+        certificate = self._get_certificate()
+        return firestore.AsyncClient(project=certificate.project_id, credentials=certificate.get_credential())
+
+    def _create_app(self) -> firebase_admin.App:
+        if os.environ.get("FIREBASE_AUTH_EMULATOR_HOST"):
+            return firebase_admin.initialize_app(options={"projectId": EMULATOR_PROJECT}, name=APP_NAME)
+        return firebase_admin.initialize_app(self._get_certificate(), name=APP_NAME)
+
+
+_provider: Optional[FirebaseProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_firebase_provider() -> FirebaseProvider:
+    """Return the process-wide Firebase provider."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = FirebaseProvider()
+        return _provider
+
+
+def set_firebase_provider(provider: Optional[FirebaseProvider]) -> None:
+    """Replace the process-wide Firebase provider (e.g. by one serving fakes), None to reset it."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def get_firestore_client() -> Any:
+    """FastAPI dependency returning the shared Firestore client."""
+    return get_firebase_provider().get_client()
+
+
+def get_async_firestore_client() -> Any:
+    """FastAPI dependency returning the shared Firestore `AsyncClient`."""
+    return get_firebase_provider().get_async_client()
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking call (Firebase Admin, synchronous Firestore) in the bounded thread pool.
+
+    Args:
+        func: The blocking function.
+        *args: Its positional arguments.
+        **kwargs: Its keyword arguments.
+
+    Returns:
+        The result of the call.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_firebase_provider().get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def get_firebase_app() -> Any:
+    """FastAPI dependency returning the shared Firebase Admin app."""
+    return get_firebase_provider().get_app()
+
+
+def warm_up() -> None:
+    """Create the Firebase clients at startup."""
+    get_firebase_provider().warm_up()
+
+
+def close() -> None:
+    """Release the Firebase clients at shutdown."""
+    if _provider is not None:
+        _provider.close()
@@ -0,0 +1,285 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.services import training
+
+# The jobs live in the memory of the process that received them, so a multi-worker
+# server could not find a job from another worker: serve.py runs one worker while enabled
+TRAIN_JOBS_ENABLED = os.environ.get("TRAIN_JOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+MAX_WORKERS = 2
+MAX_PENDING_JOBS = 32
+MAX_FINISHED_JOBS = 100
+
+
+class JobState(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATES = {JobState.SUCCEEDED, JobState.FAILED, JobState.CANCELLED}
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many training jobs are waiting."""
+
+
+# Worker side: where the running job reports that it started, set by `_init_worker`
+_worker = threading.local()
+
+
+def _init_worker(started: Any) -> None:
+    _worker.started = started
+
+
+def run_training_job(job_id: str, model_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Train and publish a model in a worker process.
+
+    The job reports its start time to its manager as soon as a worker picks it up.
+
+    Args:
+        job_id: The id of the job.
+        model_name: The name of the classification model.
+        params: The parameters of the model.
+
+    Returns:
+        The training result with the start and end times of the run.
+    """
+    started_at = time.time()
+    started = getattr(_worker, "started", None)
+    if started is not None:
+        started.put((job_id, started_at))
+    result = training.train(model_name, params)
+    return {**result.to_dict(), "started_at": started_at, "finished_at": time.time()}
+
+
+@dataclass
+class TrainingJob:
+    """A training request and its progress."""
+    id: str
+    model_name: str
+    params: Dict[str, Any]
+    future: Optional[Future] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    cancelled_at: Optional[float] = None
+
+    @property
+    def key(self) -> str:
+        return job_key(self.model_name, self.params)
+
+    @property
+    def state(self) -> JobState:
+        if self.cancelled_at is not None or (self.future is not None and self.future.cancelled()):
+            return JobState.CANCELLED
+        if self.future is not None and self.future.done():
+            return JobState.FAILED if self.future.exception() is not None else JobState.SUCCEEDED
+        return JobState.RUNNING if self.started_at is not None else JobState.PENDING
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = self.state
+        content: Dict[str, Any] = {
+            "id": self.id,
+            "model_name": self.model_name,
+            "parameters": self.params,
+            "state": state.value,
+            "submitted_at": self.submitted_at,
+        }
+        if state == JobState.RUNNING:
+            content["started_at"] = self.started_at
+        elif state == JobState.SUCCEEDED:
+            result = self.future.result()
+            content.update(result)
+            content["queue_seconds"] = result["started_at"] - self.submitted_at
+            content["run_seconds"] = result["finished_at"] - result["started_at"]
+        elif state == JobState.FAILED:
+            content["error"] = str(self.future.exception())
+        elif state == JobState.CANCELLED:
+            content["cancelled_at"] = self.cancelled_at
+        return content
+
+
+def job_key(model_name: str, params: Dict[str, Any]) -> str:
+    """Return the identity of a training request, used to de-duplicate jobs."""
+    return json.dumps([model_name, params], sort_keys=True, default=str)
+
+
+def _process_pool(max_workers: int, initializer: Callable[..., None], initargs: Tuple[Any, ...]) -> Executor:
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+class JobManager:
+    """
+    Runs training jobs in a bounded process pool.
+
+    Training happens outside of the API worker threads, so `/predict` keeps being served
+    while models are fitted. Submitting a job identical to one that has not finished yet
+    returns the existing job instead of queueing a second one.
+
+    Jobs wait in the manager until a worker is free: the pool only ever holds running
+    jobs, so a waiting job can always be cancelled. A job is running from the time its
+    worker reports it started.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        max_pending: int = MAX_PENDING_JOBS,
+        executor_factory: Optional[Callable[[int, Callable[..., None], Tuple[Any, ...]], Executor]] = None,
+    ) -> None:
+        """
+        Init the manager; the pool is started on the first submission.
+
+        `executor_factory(max_workers, initializer, initargs)` builds the pool, whose
+        workers must run `initializer(*initargs)`; a spawn-based process pool by default.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor_factory = executor_factory or _process_pool
+        self._executor: Optional[Executor] = None
+        # Reentrant: a future that is already done runs its callback in `add_done_callback`
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._waiting: Deque[TrainingJob] = deque()
+        self._started = multiprocessing.get_context("spawn").SimpleQueue()
+
+    def submit(self, model_name: str, params: Dict[str, Any]) -> TrainingJob:
+        """
+        Queue a training job, or return the identical job already queued or running.
+
+        Args:
+            model_name: The name of the classification model.
+            params: The parameters of the model.
+
+        Returns:
+            The job.
+
+        Raises:
+            QueueFullError: If too many jobs are pending.
+        """
+        key = job_key(model_name, params)
+        with self._lock:
+            active = [job for job in self._jobs.values() if job.state not in FINISHED_STATES]
+            for job in active:
+                if job.key == key:
+                    return job
+            if len(active) >= self.max_pending:
+                raise QueueFullError(f"Too many training jobs pending ({len(active)}).")
+
+            job = TrainingJob(id=uuid.uuid4().hex, model_name=model_name, params=params)
+            self._jobs[job.id] = job
+            self._waiting.append(job)
+            self._dispatch()
+            self._prune()
+            return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        """Return a job by id."""
+        with self._lock:
+            self._collect_starts()
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[TrainingJob]:
+        """Return the known jobs, most recent first."""
+        with self._lock:
+            self._collect_starts()
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that has not started yet.
+
+        Returns:
+            True if the job is cancelled, False if it already started or finished.
+
+        Raises:
+            KeyError: If the job does not exist.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            if job in self._waiting:
+                self._waiting.remove(job)
+                job.cancelled_at = time.time()
+            return job.state == JobState.CANCELLED
+
+    def shutdown(self) -> None:
+        """Cancel pending jobs and stop the pool."""
+        with self._lock:
+            now = time.time()
+            while self._waiting:
+                self._waiting.popleft().cancelled_at = now
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _dispatch(self) -> None:
+        # Caller holds the lock: hand waiting jobs to the pool while a worker is free
+        running = sum(1 for job in self._jobs.values() if job.future is not None and not job.future.done())
+        while self._waiting and running < self.max_workers:
+            job = self._waiting.popleft()
+            if self._executor is None:
+                self._executor = self._executor_factory(self.max_workers, _init_worker, (self._started,))
+            try:
+                job.future = self._executor.submit(run_training_job, job.id, job.model_name, job.params)
+            except BrokenExecutor:
+                # A worker died (e.g. out of memory): the next jobs get a new pool
+                self._executor.shutdown(wait=False)
+                self._executor = self._executor_factory(self.max_workers, _init_worker, (self._started,))
+                job.future = self._executor.submit(run_training_job, job.id, job.model_name, job.params)
+            job.future.add_done_callback(self._on_done)
+            running += 1
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._dispatch()
+
+    def _collect_starts(self) -> None:
+        # Caller holds the lock: read the start times reported by the workers
+        while not self._started.empty():
+            job_id, started_at = self._started.get()
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.started_at = started_at
+
+    def _prune(self) -> None:
+        # Caller holds the lock: forget the oldest finished jobs
+        finished = [job for job in self.list() if job.state in FINISHED_STATES]
+        for job in finished[MAX_FINISHED_JOBS:]:
+            del self._jobs[job.id]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide training job manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+def shutdown_job_manager() -> None:
+    """Stop the process-wide job manager, if it was started."""
+    if _manager is not None:
+        _manager.shutdown()
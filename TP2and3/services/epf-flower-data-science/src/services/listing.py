@@ -0,0 +1,175 @@
+import base64
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from src.services import metrics
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DOCUMENT_ID = "__name__"
+
+FILTER_OPERATORS = ("==", "!=", "<=", ">=", "<", ">")
+_FILTER_PATTERN = re.compile(r"^([A-Za-z_][\w.]*)(==|!=|<=|>=|<|>)(.*)$")
+
+Filter = Tuple[str, str, Any]
+
+
+@dataclass
+class CollectionPage:
+    """A page of documents and the cursor of the next one."""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def parse_filter(expression: str) -> Filter:
+    """
+    Parse a `<field><operator><value>` filter, e.g. `n_estimators>=100` or `role==admin`.
+
+    The value is read as JSON when possible (numbers, booleans, quoted strings), as a plain
+    string otherwise.
+
+    Args:
+        expression: The filter.
+
+    Returns:
+        The `(field, operator, value)` filter.
+
+    Raises:
+        ValueError: If the filter is malformed.
+    """
+    match = _FILTER_PATTERN.match(expression)
+    if match is None:
+        raise ValueError(f"Invalid filter '{expression}', expected <field><{'|'.join(FILTER_OPERATORS)}><value>.")
+    field, operator, raw = match.groups()
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    return field, operator, value
+
+
+def _encode_value(value: Any) -> Dict[str, Any]:
+    # Typed, so a timestamp comes back as a timestamp and not as a string
+    if isinstance(value, datetime):
+        return {"t": "ts", "v": value.isoformat()}
+    return {"t": "json", "v": value}
+
+
+def _decode_value(value: Any) -> Any:
+    if not isinstance(value, dict) or value.get("t") not in ("ts", "json") or "v" not in value:
+        raise ValueError("Invalid cursor.")
+    return datetime.fromisoformat(value["v"]) if value["t"] == "ts" else value["v"]
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the order-by values of the last document of a page as an opaque cursor.
+
+    Raises:
+        ValueError: If a value is neither a timestamp nor a JSON value (e.g. a GeoPoint).
+    """
+    try:
+        payload = json.dumps([_encode_value(value) for value in values])
+    except TypeError:
+        raise ValueError(f"Cannot page by the values {values}.")
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor made by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor.")
+    try:
+        return [_decode_value(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
+
+def _field_value(snapshot: Any, field_path: str) -> Any:
+    # `get` follows dotted paths into maps
+    try:
+        return snapshot.get(field_path)
+    except KeyError:
+        return None
+
+
+async def list_page(
+    collection: Any,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+    order_by: Optional[str] = None,
+) -> CollectionPage:
+    """
+    Read one page of a Firestore collection.
+
+    Filtering, projection, ordering and the page boundary all run in Firestore: one page
+    costs at most `limit + 1` document reads whatever the size of the collection. The
+    documents are ordered by `order_by` (if given) then by id, and the next page starts
+    after the last document of this one.
+
+    Args:
+        collection: The `AsyncCollectionReference`.
+        limit: The number of documents of the page.
+        cursor: The cursor returned with the previous page.
+        fields: The fields to return (all by default).
+        filters: `(field, operator, value)` filters.
+        order_by: The field to order the documents by, the field of the first range filter
+            by default.
+
+    Returns:
+        The documents of the page (with their `id`) and the cursor of the next page, None on
+        the last page.
+
+    Raises:
+        ValueError: If the cursor does not match the ordering.
+    """
+    filters = filters or []
+    if order_by is None:
+        # Firestore orders by the field of a range filter first
+        order_by = next((field for field, operator, _ in filters if operator != "=="), None)
+
+    query = collection
+    for field, operator, value in filters:
+        query = query.where(filter=FieldFilter(field, operator, value))
+    if fields:
+        # The order-by field is needed to build the cursor
+        query = query.select(list(dict.fromkeys(fields + ([order_by] if order_by else []))))
+
+    order_keys = ([order_by] if order_by else []) + [DOCUMENT_ID]
+    for key in order_keys:
+        query = query.order_by(key)
+    if cursor is not None:
+        values = decode_cursor(cursor)
+        if len(values) != len(order_keys):
+            raise ValueError("Invalid cursor for this ordering.")
+        query = query.start_after(dict(zip(order_keys, values)))
+
+    # One extra document tells whether there is a next page
+    with metrics.timer("firestore_query"):
+        docs = [doc async for doc in query.limit(limit + 1).stream()]
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    items = [{"id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+    next_cursor = None
+    if has_more:
+        last = docs[-1]
+        values = ([_field_value(last, order_by)] if order_by else []) + [last.id]
+        next_cursor = encode_cursor(values)
+    return CollectionPage(items, next_cursor)
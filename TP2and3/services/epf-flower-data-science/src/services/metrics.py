@@ -0,0 +1,423 @@
+import abc
+import bisect
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a cache hit to a full training run
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _Metric(abc.ABC):
+    """Base class of the metrics: a name, a help text and the values of each label set."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _check(self, labels: Labels) -> None:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects the labels {self.label_names}, got {labels}.")
+
+    @abc.abstractmethod
+    def samples(self) -> List[Sample]:
+        """The (sample name, labels, value) samples to export."""
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. the number of requests in flight."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, dict(zip(self.label_names, labels)), value) for labels, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (latencies) in cumulative buckets.
+
+    An observation is a binary search and three additions under the lock; the buckets
+    are only accumulated when the metrics are rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: the count of each bucket (plus +Inf), the sum and the count
+        self._series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation for a label set."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                self._check(labels)
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[2] if series else 0
+
+    def sum(self, *labels: str) -> float:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[1] if series else 0.0
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of the `with` block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        samples = []
+        for labels, (counts, total, count) in series.items():
+            base = dict(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", {**base, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", base, total))
+            samples.append((f"{self.name}_count", base, count))
+        return samples
+
+
+class Registry:
+    """
+    The metrics of the process and the collectors read when they are rendered.
+
+    A collector is a function called at scrape time returning extra samples (e.g. the
+    counters of a cache), so the hot path does not pay for them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Tuple[str, str, Callable[[], List[Sample]]]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Add a metric to the registry.
+
+        Raises:
+            ValueError: If another metric already has this name.
+        """
+        with self._lock:
+            if metric.name in self._metrics or metric.name in self._collectors:
+                raise ValueError(f"Metric '{metric.name}' is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, name: str, type: str, documentation: str, collect: Callable[[], List[Sample]]) -> None:
+        """
+        Register (or replace) a metric whose samples are computed at scrape time.
+
+        Args:
+            name: The metric name.
+            type: The Prometheus type (`gauge`, `counter`).
+            documentation: The help text.
+            collect: Returns the `(name, labels, value)` samples.
+        """
+        with self._lock:
+            self._collectors[name] = (type, documentation, collect)
+
+    def render(self, labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Return every metric in the Prometheus text exposition format (version 0.0.4).
+
+        A collector that fails is skipped, so a broken cache cannot take `/metrics` down.
+
+        Args:
+            labels: Labels added to every sample, e.g. the worker process.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        families = [(m.name, m.type, m.documentation, m.samples) for m in metrics]
+        families += [(name, type, documentation, collect) for name, (type, documentation, collect) in collectors]
+
+        lines = []
+        for name, type, documentation, collect in families:
+            try:
+                samples = collect()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type}")
+            for sample_name, sample_labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels({**sample_labels, **(labels or {})})} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Latency of the HTTP requests, by method, route template and status code.",
+    ("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "Number of HTTP requests being served, by method and route template.",
+    ("method", "route"),
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "stage_duration_seconds",
+    "Duration of the pipeline, model and Firestore stages.",
+    ("stage",),
+)
+
+
+# The stages of the current request, when a caller asked for them (see `record_stages`)
+_stage_records: "contextvars.ContextVar[Optional[List[Tuple[str, float]]]]" = contextvars.ContextVar(
+    "stage_records", default=None
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Record the duration of a stage.
+
+    Args:
+        stage: The stage name (the `stage` label of `stage_duration_seconds`).
+        seconds: Its duration.
+    """
+    STAGE_LATENCY.observe(seconds, stage)
+    records = _stage_records.get()
+    if records is not None:
+        records.append((stage, seconds))
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """
+    Record the duration of a stage, e.g. `with metrics.timer("fit"): ...`.
+
+    Args:
+        stage: The stage name (the `stage` label of `stage_duration_seconds`).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def record_stages() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Also collect the `(stage, seconds)` recorded by the code run in the `with` block.
+
+    The list is shared through a context variable, so it also receives the stages of the
+    synchronous endpoints run in the thread pool.
+    """
+    records: List[Tuple[str, float]] = []
+    token = _stage_records.set(records)
+    try:
+        yield records
+    finally:
+        _stage_records.reset(token)
+
+
+_caches: Dict[str, Callable[[], Optional[Tuple[float, float]]]] = {}
+_caches_lock = threading.Lock()
+
+
+def register_cache(name: str, counts: Callable[[], Optional[Tuple[float, float]]]) -> None:
+    """
+    Export the hits, misses and hit ratio of a cache.
+
+    Args:
+        name: The `cache` label.
+        counts: Returns the `(hits, misses)` of the cache when `/metrics` is scraped, None
+            when the cache does not exist yet.
+    """
+    with _caches_lock:
+        _caches[name] = counts
+
+
+def _cache_counts() -> List[Tuple[str, float, float]]:
+    with _caches_lock:
+        caches = list(_caches.items())
+    counts = []
+    for name, read in caches:
+        try:
+            value = read()
+        except Exception:
+            continue
+        if value is not None:
+            counts.append((name, float(value[0]), float(value[1])))
+    return counts
+
+
+REGISTRY.add_collector(
+    "cache_hits_total", "counter", "Cache lookups served from memory.",
+    lambda: [("cache_hits_total", {"cache": name}, hits) for name, hits, _ in _cache_counts()],
+)
+REGISTRY.add_collector(
+    "cache_misses_total", "counter", "Cache lookups that had to load or compute the value.",
+    lambda: [("cache_misses_total", {"cache": name}, misses) for name, _, misses in _cache_counts()],
+)
+REGISTRY.add_collector(
+    "cache_hit_ratio", "gauge", "Hits over lookups of each cache since the process started.",
+    lambda: [
+        ("cache_hit_ratio", {"cache": name}, hits / (hits + misses) if hits + misses else 0.0)
+        for name, hits, misses in _cache_counts()
+    ],
+)
+
+
+def render() -> str:
+    """
+    Return the metrics of the process in the Prometheus text format.
+
+    Every process has its own registry: the samples carry a `worker` label (the process
+    id), so the series of the workers behind serve.py, and of a recycled worker, are never
+    mixed up.
+    """
+    return REGISTRY.render({"worker": str(os.getpid())})
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and the in-flight count of every HTTP request.
+
+    Requests are labelled with their route template (`/hello/{name}`, not the path), so
+    the number of series stays bounded; a path matching no route is labelled `unmatched`.
+    The template of a path is resolved once and then memoized.
+    """
+
+    def __init__(self, app: Any, max_paths: int = 4096) -> None:
+        self.app = app
+        self.max_paths = max_paths
+        self._routes: Dict[Tuple[str, str], str] = {}
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status = "500"
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method, route, status)
+            REQUESTS_IN_FLIGHT.dec(method, route)
+
+    def _route_template(self, scope: Dict[str, Any]) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._routes.get(key)
+        if template is not None:
+            return template
+
+        template = "unmatched"
+        for route in getattr(scope.get("app"), "routes", None) or []:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", template)
+                break
+            if match == Match.PARTIAL and template == "unmatched":
+                # Right path, wrong method: the app answers 405
+                template = getattr(route, "path", template)
+        if len(self._routes) >= self.max_paths:
+            self._routes.clear()
+        self._routes[key] = template
+        return template
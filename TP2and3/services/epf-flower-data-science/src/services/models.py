@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+from src.services import metrics, snapshot
+
+MODEL_DIR = os.path.join("TP2and3/services/epf-flower-data-science/src", "models")
+
+DEFAULT_MAX_MODELS = 8
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+@dataclass
+class ModelStats:
+    """Usage counters of one model in the registry."""
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    evictions: int = 0
+    last_load_seconds: float = 0.0
+    total_load_seconds: float = 0.0
+    size_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass(frozen=True)
+class _Entry:
+    model: Any
+    mtime_ns: int
+    size: int
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+class ModelRegistry:
+    """
+    In-memory registry of deserialized models.
+
+    Models are kept in a LRU bounded by a number of models and by an approximate memory
+    budget (the size of the `.joblib` artifacts). A lookup only stats the artifact: when
+    it was rewritten (by `publish` or by another process) the model is reloaded and
+    swapped in, readers keep using the previous instance until the swap.
+    """
+
+    def __init__(
+        self,
+        model_dir: Optional[str] = None,
+        max_models: int = DEFAULT_MAX_MODELS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        """Init the registry."""
+        self.model_dir = model_dir or MODEL_DIR
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._stats: Dict[str, ModelStats] = {}
+
+    def model_path(self, model_name: str) -> str:
+        """Return the artifact path of a model."""
+        return os.path.join(self.model_dir, f"{model_name}.joblib")
+
+    def get(self, model_name: str) -> Any:
+        """
+        Return a trained model, loading it from disk on a miss or when its artifact changed.
+
+        Args:
+            model_name: The name of the trained model.
+
+        Returns:
+            The trained model instance.
+
+        Raises:
+            FileNotFoundError: If the model file does not exist.
+        """
+        model_path = self.model_path(model_name)
+        try:
+            stat = os.stat(model_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Model file '{model_name}.joblib' not found at {model_path}")
+
+        with self._lock:
+            stats = self._stats.setdefault(model_name, ModelStats())
+            entry = self._entries.get(model_name)
+            if entry is not None and entry.matches(stat):
+                self._entries.move_to_end(model_name)
+                stats.hits += 1
+                return entry.model
+            stats.misses += 1
+
+        start = time.perf_counter()
+        model = joblib.load(model_path)
+        elapsed = time.perf_counter() - start
+        metrics.observe_stage("joblib_load", elapsed)
+
+        with self._lock:
+            stats.loads += 1
+            stats.last_load_seconds = elapsed
+            stats.total_load_seconds += elapsed
+            self._install(model_name, _Entry(model, stat.st_mtime_ns, stat.st_size))
+        return model
+
+    def publish(self, model_name: str, model: Any) -> str:
+        """
+        Save a trained model and make it the one served by the registry.
+
+        The artifact is written to a temporary file and renamed over the previous one, so
+        concurrent readers (in this process or another one) never see a partial file.
+
+        Args:
+            model_name: The name of the trained model.
+            model: The fitted estimator.
+
+        Returns:
+            The path of the saved artifact.
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
+        model_path = self.model_path(model_name)
+
+        with metrics.timer("joblib_dump"):
+            snapshot.write_atomic(self.model_dir, os.path.basename(model_path), lambda f: joblib.dump(model, f))
+
+        stat = os.stat(model_path)
+        with self._lock:
+            self._stats.setdefault(model_name, ModelStats())
+            self._install(model_name, _Entry(model, stat.st_mtime_ns, stat.st_size))
+        return model_path
+
+    def preload(self) -> List[str]:
+        """
+        Load the artifacts of the model directory into the registry.
+
+        Used before forking server workers, so they share the deserialized models
+        copy-on-write instead of each loading them on its first requests. The artifacts
+        are loaded oldest first: when they exceed the LRU bounds, the most recently
+        written ones are kept.
+
+        Returns:
+            The names of the models left in the registry.
+        """
+        try:
+            names = [f[:-len(".joblib")] for f in os.listdir(self.model_dir) if f.endswith(".joblib")]
+        except FileNotFoundError:
+            return []
+        names.sort(key=lambda name: os.stat(self.model_path(name)).st_mtime_ns)
+        for name in names[-self.max_models:]:
+            self.get(name)
+        with self._lock:
+            return list(self._entries)
+
+    def evict(self, model_name: str) -> None:
+        """Drop a model from memory; the next lookup reloads it from disk."""
+        with self._lock:
+            if self._entries.pop(model_name, None) is not None:
+                self._stats[model_name].evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the registry counters.
+
+        Returns:
+            A dictionary with the cached models, their approximate size and, for every
+            model ever requested, its hit rate and load times.
+        """
+        with self._lock:
+            return {
+                "cached_models": list(self._entries),
+                "cached_bytes": self._cached_bytes(),
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "models": {
+                    name: {**asdict(stats), "hit_rate": stats.hit_rate}
+                    for name, stats in self._stats.items()
+                },
+            }
+
+    def _install(self, model_name: str, entry: _Entry) -> None:
+        # Caller holds the lock
+        self._entries[model_name] = entry
+        self._entries.move_to_end(model_name)
+        self._stats[model_name].size_bytes = entry.size
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models or self._cached_bytes() > self.max_bytes
+        ):
+            evicted, _ = self._entries.popitem(last=False)
+            self._stats[evicted].evictions += 1
+
+    def _cached_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def _cache_counts() -> Optional[Tuple[int, int]]:
+    registry = _registry
+    if registry is None:
+        return None
+    with registry._lock:
+        stats = list(registry._stats.values())
+    return sum(s.hits for s in stats), sum(s.misses for s in stats)
+
+
+metrics.register_cache("models", _cache_counts)
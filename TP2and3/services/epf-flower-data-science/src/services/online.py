@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.services import chunked, metrics, models, pipeline, snapshot, training
+from src.services.cleaning import FEATURE_COLUMNS, TARGET_COLUMN
+
+CHECKPOINT_DIR = os.path.join(models.MODEL_DIR, "online")
+
+# Rows per mini-batch and mini-batches between two checkpoints
+BATCH_ROWS = int(os.environ.get("ONLINE_BATCH_ROWS", "1000"))
+CHECKPOINT_EVERY = int(os.environ.get("ONLINE_CHECKPOINT_BATCHES", "10"))
+
+# Appended to the registry name of a model trained online, so it never replaces the
+# artifact of the same model trained by /train-model
+ONLINE_SUFFIX = ".online"
+
+# Estimators that only accept non-negative features, trained on the raw ones
+NON_NEGATIVE_MODELS = {"MultinomialNB", "ComplementNB"}
+
+
+@dataclass
+class OnlineState:
+    """An incrementally trained model and what it has seen so far."""
+    model_name: str
+    model: Any
+    scaler: Optional[StandardScaler]
+    classes: np.ndarray
+    feature_names: List[str]
+    n_samples_seen: int = 0
+    n_batches: int = 0
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return self.scaler.transform(X) if self.scaler is not None else X
+
+    def serving_model(self) -> Any:
+        """Return the model behind the scaler it was trained with, taking raw features."""
+        if self.scaler is None:
+            return self.model
+        return Pipeline([("scaler", self.scaler), ("model", self.model)])
+
+
+@dataclass(frozen=True)
+class OnlineResult:
+    """Outcome of an online training run or update."""
+    model_name: str
+    served_as: str
+    model_path: str
+    rows: int
+    batches: int
+    checkpoints: int
+    n_samples_seen: int
+    fit_seconds: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def serving_name(model_name: str) -> str:
+    """Return the registry name (for /predict) of a model trained online."""
+    return f"{model_name}{ONLINE_SUFFIX}"
+
+
+def new_online_model(model_name: str, params: Dict[str, Any]) -> Any:
+    """
+    Return an unfitted estimator that can be trained incrementally.
+
+    Raises:
+        ValueError: If the model is not recognized or has no `partial_fit`.
+    """
+    model = training.get_model(model_name, params)
+    if not hasattr(model, "partial_fit"):
+        raise ValueError(f"Model '{model_name}' does not support online training (no partial_fit).")
+    return model
+
+
+def labeled_rows(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split new labeled rows into raw features, in `FEATURE_COLUMNS` order, and labels.
+
+    Raises:
+        ValueError: If a column is missing or a feature value is not a number.
+    """
+    missing = [c for c in FEATURE_COLUMNS + [TARGET_COLUMN] if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+    try:
+        X = frame[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Feature values must be numbers.")
+    return X, frame[TARGET_COLUMN].astype(str).to_numpy()
+
+
+def iter_minibatches(
+    artifact: chunked.ChunkedArtifact,
+    batch_rows: int,
+    epochs: int = 1,
+    random_state: int = pipeline.RANDOM_STATE,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Read shuffled mini-batches of scaled features and label names from a scaled dataset.
+
+    The dataset stays on disk: blocks of `batch_rows` rows are visited in a random order
+    and shuffled internally, so only one block is in memory at a time and sorted files
+    (the Iris CSV is sorted by species) do not feed one class at a time.
+    """
+    rng = np.random.default_rng(random_state)
+    n_rows = len(artifact.X_scaled)
+    starts = np.arange(0, n_rows, batch_rows)
+    for _ in range(epochs):
+        for start in rng.permutation(starts):
+            order = rng.permutation(min(batch_rows, n_rows - start))
+            X = np.asarray(artifact.X_scaled[start:start + batch_rows])[order]
+            y = artifact.categories[np.asarray(artifact.labels[start:start + batch_rows])[order]]
+            yield X, y
+
+
+class OnlineTrainer:
+    """
+    Trainer of `partial_fit` estimators, fed mini-batch by mini-batch.
+
+    The state of each model (estimator, scaler, classes, counters) is checkpointed every
+    `checkpoint_every` mini-batches and after each update, and the serving model is
+    published to the model registry as `serving_name(model_name)`. New labeled rows
+    update the published model from the last checkpoint: their cost depends on their number, not on the dataset size.
+    The scaler is fitted once by the initial training and kept fixed by the updates, so
+    the rows seen before and after an update are scaled the same way.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        registry: Optional[models.ModelRegistry] = None,
+        checkpoint_every: int = CHECKPOINT_EVERY,
+    ) -> None:
+        """Init the trainer."""
+        self.directory = directory or CHECKPOINT_DIR
+        self.registry = registry
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.Lock()
+        self._states: Dict[str, Tuple[OnlineState, int]] = {}
+
+    def checkpoint_path(self, model_name: str) -> str:
+        """Return the checkpoint path of a model."""
+        return os.path.join(self.directory, f"{model_name}.joblib")
+
+    def train(
+        self,
+        model_name: str,
+        params: Dict[str, Any],
+        path: Optional[str] = None,
+        batch_rows: int = BATCH_ROWS,
+        epochs: int = 1,
+    ) -> OnlineResult:
+        """
+        Train a model from scratch on the streamed dataset, then publish it.
+
+        The dataset is scaled out-of-core (`chunked`), then read back from disk in
+        shuffled mini-batches.
+
+        Args:
+            model_name: The name of the classification model.
+            params: The parameters of the model.
+            path: The CSV file. Defaults to the Iris dataset.
+            batch_rows: The number of rows per mini-batch.
+            epochs: The number of passes over the dataset.
+
+        Returns:
+            The published model and the training counters.
+
+        Raises:
+            FileNotFoundError: If the dataset file does not exist.
+            ValueError: If the model does not support online training.
+        """
+        model = new_online_model(model_name, params)
+        artifact = chunked.get_chunked_preprocessor().get(path, "csv", batch_rows)
+        scaler = None if model_name in NON_NEGATIVE_MODELS else artifact.scaler
+        state = OnlineState(model_name, model, scaler, artifact.categories, artifact.feature_names)
+
+        start = time.perf_counter()
+        checkpoints = 0
+        rows = 0
+        with self._lock, metrics.timer("fit"):
+            for X, y in iter_minibatches(artifact, batch_rows, epochs):
+                if scaler is None:
+                    X = artifact.scaler.inverse_transform(X)
+                self._partial_fit(state, X, y)
+                rows += len(X)
+                if state.n_batches % self.checkpoint_every == 0:
+                    self._checkpoint(state)
+                    checkpoints += 1
+            if state.n_batches % self.checkpoint_every:
+                self._checkpoint(state)
+                checkpoints += 1
+            self._remember(state)
+            model_path = self._registry().publish(serving_name(model_name), state.serving_model())
+        return OnlineResult(
+            model_name, serving_name(model_name), model_path, rows, state.n_batches, checkpoints, state.n_samples_seen, time.perf_counter() - start
+        )
+
+    def update(self, model_name: str, X: np.ndarray, y: np.ndarray) -> OnlineResult:
+        """
+        Update a trained model with new labeled rows and publish it.
+
+        Args:
+            model_name: The name of a model trained by `train`.
+            X: The raw features of the new rows, in `FEATURE_COLUMNS` order (see `labeled_rows`).
+            y: Their labels.
+
+        Returns:
+            The published model and the training counters.
+
+        Raises:
+            FileNotFoundError: If the model was never trained online.
+            ValueError: If a label was not in the training data.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            state = self._load(model_name)
+            unknown = sorted(set(np.unique(y).tolist()) - set(state.classes.tolist()))
+            if unknown:
+                raise ValueError(f"Unknown labels {unknown}, the model was trained on {state.classes.tolist()}.")
+            with metrics.timer("fit"):
+                self._partial_fit(state, state.transform(np.asarray(X, dtype=np.float64)), np.asarray(y))
+            self._checkpoint(state)
+            self._remember(state)
+            model_path = self._registry().publish(serving_name(model_name), state.serving_model())
+        return OnlineResult(model_name, serving_name(model_name), model_path, len(X), 1, 1, state.n_samples_seen, time.perf_counter() - start)
+
+    def stats(self, model_name: str) -> Dict[str, Any]:
+        """
+        Return the counters of a model trained online.
+
+        Raises:
+            FileNotFoundError: If the model was never trained online.
+        """
+        with self._lock:
+            state = self._load(model_name)
+            return {
+                "model_name": model_name,
+                "classes": state.classes.tolist(),
+                "feature_names": state.feature_names,
+                "scaled": state.scaler is not None,
+                "n_samples_seen": state.n_samples_seen,
+                "n_batches": state.n_batches,
+            }
+
+    def _registry(self) -> models.ModelRegistry:
+        return self.registry or models.get_model_registry()
+
+    @staticmethod
+    def _partial_fit(state: OnlineState, X: np.ndarray, y: np.ndarray) -> None:
+        state.model.partial_fit(X, y, classes=state.classes)
+        state.n_samples_seen += len(X)
+        state.n_batches += 1
+
+    def _load(self, model_name: str) -> OnlineState:
+        # Caller holds the lock; the checkpoint is read again when another process rewrote it
+        path = self.checkpoint_path(model_name)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Model '{model_name}' has no online checkpoint, train it first.")
+        cached = self._states.get(model_name)
+        if cached is not None and cached[1] == mtime_ns:
+            return cached[0]
+        with metrics.timer("joblib_load"):
+            state = joblib.load(path)
+        self._states[model_name] = (state, mtime_ns)
+        return state
+
+    def _remember(self, state: OnlineState) -> None:
+        # Caller holds the lock, after a checkpoint
+        self._states[state.model_name] = (state, os.stat(self.checkpoint_path(state.model_name)).st_mtime_ns)
+
+    def _checkpoint(self, state: OnlineState) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with metrics.timer("joblib_dump"):
+            snapshot.write_atomic(self.directory, os.path.basename(self.checkpoint_path(state.model_name)), lambda f: joblib.dump(state, f))
+
+
+_trainer: Optional[OnlineTrainer] = None
+_trainer_lock = threading.Lock()
+
+
+def get_online_trainer() -> OnlineTrainer:
+    """Return the process-wide online trainer."""
+    global _trainer
+    with _trainer_lock:
+        if _trainer is None:
+            _trainer = OnlineTrainer()
+        return _trainer
@@ -0,0 +1,267 @@
+import os
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from google.cloud import firestore
+
+from src.services import metrics
+
+PARAMETERS_COLLECTION = "parameters"
+PARAMETERS_DOCUMENT = "parameters"
+MAX_IMPORT_SIZE = 10000
+
+CACHE_TTL_SECONDS = float(os.environ.get("PARAMETERS_CACHE_TTL_SECONDS", "30"))
+CACHE_LISTEN = os.environ.get("PARAMETERS_CACHE_LISTEN", "false").lower() in ("1", "true", "yes")
+
+
+class CollectionCache:
+    """
+    Read-through, in-memory cache of a Firestore collection.
+
+    Reads are served from memory. The collection is streamed again (asynchronously) when
+    the cached copy is older than the TTL, after an invalidation (by a write of this
+    process), or kept up to date continuously by an `on_snapshot` listener when one is
+    started.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Init the cache.
+
+        Args:
+            collection: The `AsyncCollectionReference` read on a miss (or a fake with an
+                async `stream`).
+            ttl_seconds: The maximum age of the cached copy, 0 to always read through.
+            clock: The clock used for the TTL.
+        """
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, Any]]] = None
+        self._loaded_at: Optional[float] = None
+        self._watch: Any = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.snapshots = 0
+
+    async def get_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return every document of the collection, keyed by document id.
+
+        Returns:
+            A copy of the cached collection.
+        """
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return dict(self._data)
+            self.misses += 1
+            generation = self._generation
+
+        with metrics.timer("firestore_query"):
+            data = {doc.id: doc.to_dict() async for doc in self.collection.stream()}
+        with self._lock:
+            # Do not cache a read that raced with an invalidation
+            if generation == self._generation:
+                self._data, self._loaded_at = data, self._clock()
+        return dict(data)
+
+    def invalidate(self) -> None:
+        """Drop the cached copy; the next read streams the collection again."""
+        with self._lock:
+            self._data = None
+            self._loaded_at = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def start_listener(self, collection: Any) -> None:
+        """
+        Keep the cached copy up to date with a Firestore `on_snapshot` listener.
+
+        Args:
+            collection: The synchronous `CollectionReference` of the same collection (the
+                async client has no listeners).
+        """
+        if self._watch is None:
+            self._watch = collection.on_snapshot(self._on_snapshot)
+
+    def stop_listener(self) -> None:
+        """Stop the snapshot listener, if any."""
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the cache counters.
+
+        Returns:
+            The hit/miss counts and hit rate, the age of the cached copy (its staleness,
+            None when nothing is cached) and whether a listener is running.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "snapshots": self.snapshots,
+                "age_seconds": self._clock() - self._loaded_at if self._loaded_at is not None else None,
+                "ttl_seconds": self.ttl_seconds,
+                "listening": self._watch is not None,
+            }
+
+    def _is_fresh(self) -> bool:
+        # Caller holds the lock
+        if self._data is None:
+            return False
+        if self._watch is not None:
+            return True
+        return self._clock() - self._loaded_at < self.ttl_seconds
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        # Called by Firestore on a background thread with the full collection
+        data = {doc.id: doc.to_dict() for doc in docs}
+        with self._lock:
+            self._data, self._loaded_at = data, self._clock()
+            self._generation += 1
+            self.snapshots += 1
+        logging.info(f"Collection snapshot received: {len(data)} documents")
+
+
+_caches: Dict[str, Tuple[Any, CollectionCache]] = {}
+_caches_lock = threading.Lock()
+
+
+def get_collection_cache(client: Any, collection_name: str = PARAMETERS_COLLECTION) -> CollectionCache:
+    """
+    Return the process-wide cache of a collection of a Firestore client.
+
+    Args:
+        client: The Firestore `AsyncClient`.
+        collection_name: The name of the collection.
+
+    Returns:
+        The cache, created on first use (or when the client was replaced).
+    """
+    with _caches_lock:
+        cached = _caches.get(collection_name)
+        if cached is None or cached[0] is not client:
+            if cached is not None:
+                cached[1].stop_listener()
+            cached = (client, CollectionCache(client.collection(collection_name)))
+            _caches[collection_name] = cached
+        return cached[1]
+
+
+def _cache_counts() -> Tuple[int, int]:
+    with _caches_lock:
+        caches = [cache for _, cache in _caches.values()]
+    return sum(cache.hits for cache in caches), sum(cache.misses for cache in caches)
+
+
+metrics.register_cache("firestore_collections", _cache_counts)
+
+
+def next_parameter_key(existing: Dict[str, Any]) -> str:
+    """
+    Return the next free `param_<n>` field of the parameters document.
+
+    Args:
+        existing: The current fields of the document.
+
+    Returns:
+        `param_<n>` with `n` one more than the highest number in use.
+    """
+    numbers = [int(m.group(1)) for m in (re.fullmatch(r"param_(\d+)", key) for key in existing) if m]
+    return f"param_{max(numbers, default=0) + 1}"
+
+
+async def _append_parameter_set(transaction: Any, doc_ref: Any, values: Dict[str, Any]) -> str:
+    # Read the field names and write only the new field, in the same transaction
+    snapshot = await doc_ref.get(transaction=transaction)
+    param_key = next_parameter_key((snapshot.to_dict() or {}) if snapshot.exists else {})
+    transaction.set(doc_ref, {param_key: values}, merge=True)
+    return param_key
+
+
+async def append_parameter_set(client: Any, doc_ref: Any, values: Dict[str, Any]) -> str:
+    """
+    Add a parameter set to the parameters document as a new `param_<n>` field.
+
+    The read of the existing fields and the write run in a transaction, which Firestore
+    retries on contention, so concurrent additions never overwrite each other. Only the
+    new field is written.
+
+    Args:
+        client: The Firestore `AsyncClient`.
+        doc_ref: The parameters document, from the same client.
+        values: The parameter set.
+
+    Returns:
+        The name of the new field.
+    """
+    with metrics.timer("firestore_transaction"):
+        return await firestore.async_transactional(_append_parameter_set)(client.transaction(), doc_ref, values)
+
+
+def import_documents(client: Any, collection_name: str, documents: Dict[str, Dict[str, Any]], merge: bool = True) -> int:
+    """
+    Write many documents with a `BulkWriter`.
+
+    The writes are sent in parallel batches, throttled and retried by the client.
+
+    Args:
+        client: The synchronous Firestore client (`BulkWriter` is blocking, async code runs
+            this in an executor).
+        collection_name: The name of the collection.
+        documents: The document data, keyed by document id.
+        merge: Merge the fields into existing documents instead of replacing them.
+
+    Returns:
+        The number of documents written.
+    """
+    collection = client.collection(collection_name)
+    with metrics.timer("firestore_bulk_write"):
+        bulk_writer = client.bulk_writer()
+        for doc_id, data in documents.items():
+            bulk_writer.set(collection.document(doc_id), data, merge=merge)
+        bulk_writer.close()
+    return len(documents)
+
+
+def delete_collection(client: Any, collection_name: str) -> int:
+    """
+    Delete every document of a collection with a `BulkWriter`.
+
+    The documents are listed without reading their fields.
+
+    Args:
+        client: The synchronous Firestore client (`BulkWriter` is blocking, async code runs
+            this in an executor).
+        collection_name: The name of the collection.
+
+    Returns:
+        The number of documents deleted.
+    """
+    with metrics.timer("firestore_bulk_write"):
+        bulk_writer = client.bulk_writer()
+        deleted = 0
+        for doc_ref in client.collection(collection_name).list_documents():
+            bulk_writer.delete(doc_ref)
+            deleted += 1
+        bulk_writer.close()
+    logging.info(f"{deleted} documents deleted from '{collection_name}'")
+    return deleted
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.services import metrics, preprocessing, snapshot
+from src.services.cleaning import TARGET_COLUMN
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+
+@dataclass(frozen=True)
+class FeatureDataset:
+    """Feature matrix and target of the dataset, before scaling."""
+    X: np.ndarray
+    y: np.ndarray
+    feature_names: List[str]
+    key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ScaledDataset:
+    """Standardized feature matrix and its target."""
+    X: np.ndarray
+    y: np.ndarray
+    feature_names: List[str]
+    scaler: StandardScaler
+    key: Optional[str] = None
+
+    def to_frame(self) -> pd.DataFrame:
+        """Rebuild the `/process-data` table: scaled features followed by the target."""
+        frame = pd.DataFrame(self.X, columns=self.feature_names)
+        frame[TARGET_COLUMN] = self.y
+        return frame
+
+
+@dataclass(frozen=True)
+class SplitDataset:
+    """Train/test partition of a scaled dataset."""
+    X_train: np.ndarray
+    X_test: np.ndarray
+    y_train: np.ndarray
+    y_test: np.ndarray
+    feature_names: List[str]
+    scaler: Optional[StandardScaler] = None
+    key: Optional[str] = None
+
+
+def dataset_key(path: Optional[str] = None) -> str:
+    """
+    Return the content hash of the dataset the pipeline reads, without loading it.
+
+    Raises:
+        FileNotFoundError: If the dataset file does not exist.
+    """
+    return snapshot.get_snapshot(path).sha256
+
+
+def load_features(path: Optional[str] = None) -> FeatureDataset:
+    """
+    Load and clean stages: read the dataset from its columnar snapshot.
+
+    The CSV file is only parsed (and cleaned) when the snapshot is built; afterwards the
+    features are read through a memory-mapped float matrix.
+
+    Args:
+        path: The dataset path. Defaults to the Iris dataset.
+
+    Returns:
+        The memory-mapped feature matrix and the labels.
+
+    Raises:
+        FileNotFoundError: If the dataset file does not exist.
+        ValueError: If the target column is missing.
+    """
+    dataset = snapshot.get_snapshot(path)
+    return FeatureDataset(
+        X=dataset.features,
+        y=dataset.label_values(),
+        feature_names=dataset.feature_names,
+        key=dataset.sha256,
+    )
+
+
+def scale_features(dataset: FeatureDataset) -> ScaledDataset:
+    """
+    Scale stage: standardize the feature columns.
+
+    The scaler is fitted once per dataset version and persisted by the preprocessing
+    store, later calls reuse the saved scaler and scaled matrix.
+
+    Args:
+        dataset: The feature matrix and labels.
+
+    Returns:
+        The scaled feature matrix, the target and the fitted scaler.
+    """
+    artifact = preprocessing.get_preprocessing_store().get(dataset.key, dataset.X)
+    return ScaledDataset(
+        X=artifact.X_scaled,
+        y=dataset.y,
+        feature_names=dataset.feature_names,
+        scaler=artifact.scaler,
+        key=dataset.key,
+    )
+
+
+def split_dataset(
+    dataset: ScaledDataset,
+    test_size: float = TEST_SIZE,
+    random_state: int = RANDOM_STATE,
+) -> SplitDataset:
+    """
+    Split stage: partition the scaled dataset into training and testing sets.
+
+    Args:
+        dataset: The scaled dataset.
+        test_size: The fraction of rows kept for testing.
+        random_state: The seed of the shuffle.
+
+    Returns:
+        The train and test arrays.
+    """
+    with metrics.timer("split"):
+        X_train, X_test, y_train, y_test = train_test_split(
+            dataset.X, dataset.y, test_size=test_size, random_state=random_state
+        )
+    return SplitDataset(X_train, X_test, y_train, y_test, dataset.feature_names, dataset.scaler, dataset.key)
+
+
+def fit_model(dataset: SplitDataset, model: Any) -> Any:
+    """
+    Fit stage: train an estimator on the training set.
+
+    Args:
+        dataset: The split dataset.
+        model: An unfitted scikit-learn estimator.
+
+    Returns:
+        The fitted estimator.
+    """
+    with metrics.timer("fit"):
+        return model.fit(dataset.X_train, dataset.y_train)
+
+
+def serving_model(dataset: SplitDataset, model: Any) -> Any:
+    """
+    Bundle a fitted estimator with the scaler it was trained behind.
+
+    The result takes raw features, so `/predict` applies exactly the transform used for
+    training.
+
+    Args:
+        dataset: The split dataset the model was trained on.
+        model: The fitted estimator.
+
+    Returns:
+        A fitted `Pipeline(scaler, model)`, or the model itself if the data was not scaled.
+    """
+    if dataset.scaler is None:
+        return model
+    return Pipeline([("scaler", dataset.scaler), ("model", model)])
+
+
+def process(path: Optional[str] = None) -> ScaledDataset:
+    """Run the load, clean and scale stages."""
+    return scale_features(load_features(path))
+
+
+def split(path: Optional[str] = None) -> SplitDataset:
+    """Run the load, clean, scale and split stages."""
+    return split_dataset(process(path))
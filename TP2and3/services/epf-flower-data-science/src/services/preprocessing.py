@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from src.services import metrics, models, snapshot
+
+PREPROCESSING_DIR = os.path.join(models.MODEL_DIR, "preprocessing")
+
+MAX_CACHED_ARTIFACTS = 4
+
+# Dataset versions whose artifacts are kept on disk, the most recently used ones
+MAX_STORED_ARTIFACTS = int(os.environ.get("PREPROCESSING_MAX_STORED", "4"))
+
+
+@dataclass(frozen=True)
+class PreprocessingArtifact:
+    """Fitted scaler of a dataset and the matrix it produced."""
+    key: Optional[str]
+    scaler: StandardScaler
+    X_scaled: np.ndarray
+
+
+class PreprocessingStore:
+    """
+    Store of fitted preprocessing artifacts, keyed by the content hash of the dataset.
+
+    The scaler is fitted once per dataset version and saved with the scaled matrix;
+    later lookups are served from memory or, in another process, from the saved files
+    (the matrix is memory-mapped). Only the `max_stored` most recently used versions
+    are kept on disk: the files of the older ones are removed after each fit.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_cached: int = MAX_CACHED_ARTIFACTS,
+        max_stored: int = MAX_STORED_ARTIFACTS,
+    ) -> None:
+        """Init the store."""
+        self.directory = directory or PREPROCESSING_DIR
+        self.max_cached = max_cached
+        self.max_stored = max_stored
+        self._lock = threading.Lock()
+        self._artifacts: "OrderedDict[str, PreprocessingArtifact]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.fits = 0
+
+    def paths(self, key: str) -> Dict[str, str]:
+        """Return the scaler and scaled matrix paths of a dataset version."""
+        return {
+            "scaler": os.path.join(self.directory, f"scaler-{key}.joblib"),
+            "X_scaled": os.path.join(self.directory, f"scaled-{key}.npy"),
+        }
+
+    def get(self, key: Optional[str], X: np.ndarray) -> PreprocessingArtifact:
+        """
+        Return the fitted scaler and scaled matrix of a dataset, fitting them if needed.
+
+        Args:
+            key: The content hash of the dataset. Without a key the scaler is fitted and
+                nothing is stored.
+            X: The raw feature matrix of the dataset.
+
+        Returns:
+            The preprocessing artifact.
+        """
+        if key is None:
+            with metrics.timer("scale"):
+                scaler = StandardScaler()
+                return PreprocessingArtifact(None, scaler, scaler.fit_transform(X))
+
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is not None:
+                self._artifacts.move_to_end(key)
+                self.hits += 1
+                return artifact
+
+            paths = self.paths(key)
+            if all(os.path.exists(p) for p in paths.values()):
+                with metrics.timer("joblib_load"):
+                    scaler = joblib.load(paths["scaler"])
+                artifact = PreprocessingArtifact(key, scaler, np.load(paths["X_scaled"], mmap_mode="r"))
+                # Mark the version as recently used, so that pruning keeps it
+                os.utime(paths["scaler"])
+                self.disk_hits += 1
+            else:
+                with metrics.timer("scale"):
+                    scaler = StandardScaler()
+                    X_scaled = scaler.fit_transform(X)
+                with metrics.timer("joblib_dump"):
+                    self._save(paths, scaler, X_scaled)
+                self._prune()
+                artifact = PreprocessingArtifact(key, scaler, X_scaled)
+                self.fits += 1
+
+            self._artifacts[key] = artifact
+            while len(self._artifacts) > self.max_cached:
+                self._artifacts.popitem(last=False)
+            return artifact
+
+    def stats(self) -> Dict[str, object]:
+        """Return the store counters and the cached dataset versions."""
+        return {
+            "cached_keys": list(self._artifacts),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "fits": self.fits,
+        }
+
+    def _save(self, paths: Dict[str, str], scaler: StandardScaler, X_scaled: np.ndarray) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # The matrix is written first: the scaler file marks a complete artifact
+        for path, write in (
+            (paths["X_scaled"], lambda f: np.save(f, X_scaled)),
+            (paths["scaler"], lambda f: joblib.dump(scaler, f)),
+        ):
+            snapshot.write_atomic(self.directory, os.path.basename(path), write)
+
+    def _prune(self) -> None:
+        # The scaler file is written last and touched on use: its mtime dates the version
+        scalers = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith("scaler-") and name.endswith(".joblib")
+        ]
+        scalers.sort(key=os.path.getmtime)
+        for path in scalers[: max(len(scalers) - self.max_stored, 0)]:
+            key = os.path.basename(path)[len("scaler-"): -len(".joblib")]
+            for stale in self.paths(key).values():
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+
+_store: Optional[PreprocessingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_preprocessing_store() -> PreprocessingStore:
+    """Return the process-wide preprocessing store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PreprocessingStore()
+        return _store
+
+
+def _cache_counts() -> Optional[Tuple[int, int]]:
+    store = _store
+    if store is None:
+        return None
+    return store.hits, store.disk_hits + store.fits
+
+
+metrics.register_cache("preprocessing", _cache_counts)
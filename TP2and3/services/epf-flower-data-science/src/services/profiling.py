@@ -0,0 +1,487 @@
+import os
+import cProfile
+import asyncio
+import contextvars
+import functools
+import io
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from src.services import metrics
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "true").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join("TP2and3/services/epf-flower-data-science/src", "profiles"))
+MAX_PROFILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+SAMPLE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.005"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "profile"
+MODES = ("cprofile", "sample")
+TOP_FUNCTIONS = 25
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Authorizes a profiling request from its `Authorization` header
+Authorizer = Callable[[Optional[str]], Awaitable[bool]]
+
+
+class StackSampler:
+    """
+    Sampling profiler: a background thread reads the stacks of some threads at a fixed
+    interval and counts them as collapsed stacks (`outer;inner;leaf <count>`), the input
+    format of `flamegraph.pl`, speedscope and most flame graph viewers.
+
+    A thread is sampled either whole, or only while a given frame is on its stack: the
+    event loop thread is sampled from the frame of the profiled coroutine, so the steps
+    of the other requests sharing the loop are left out.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self.stacks: "Counter[str]" = Counter()
+        self.samples = 0
+        # Thread id -> the frames it is sampled from (None for the whole thread)
+        self._targets: Dict[int, List[Optional[FrameType]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, ident: int, frame: Optional[FrameType] = None) -> None:
+        """Start sampling a thread, or only the part of its stack above `frame`."""
+        with self._lock:
+            self._targets.setdefault(ident, []).append(frame)
+
+    def remove_thread(self, ident: int, frame: Optional[FrameType] = None) -> None:
+        with self._lock:
+            targets = self._targets.get(ident, [])
+            if frame in targets:
+                targets.remove(frame)
+            if not targets:
+                self._targets.pop(ident, None)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Return the sampled stacks in the collapsed format, one stack per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Record the current stack of every sampled thread."""
+        with self._lock:
+            targets = {ident: list(frames) for ident, frames in self._targets.items()}
+        frames = sys._current_frames()
+        for ident, roots in targets.items():
+            frame = frames.get(ident)
+            whole = None in roots
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                if not whole and frame in roots:
+                    break
+                frame = frame.f_back
+            # A coroutine that is not running has no frame on its thread's stack
+            if stack and (whole or frame is not None):
+                self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+
+@dataclass
+class ProfileSession:
+    """
+    One profiled request: its profilers and the stages it went through.
+
+    Only the code of the request is profiled: the thread pool thread running a
+    synchronous endpoint, or, in sample mode, the coroutine of an async endpoint. The
+    event loop thread is never profiled whole, since it also runs the other requests.
+    cProfile cannot follow a coroutine, so an async endpoint profiled in cprofile mode
+    only gets its stage breakdown; `notes` tells why a profile is partial.
+    """
+    mode: str
+    method: str
+    path: str
+    sample_interval: float = SAMPLE_INTERVAL_SECONDS
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    profilers: List[cProfile.Profile] = field(default_factory=list)
+    sampler: Optional[StackSampler] = None
+    notes: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def start(self) -> None:
+        """Start the sampler thread in sample mode (threads are profiled as they enter)."""
+        if self.mode == "sample":
+            self.sampler = StackSampler(self.sample_interval)
+            self.sampler.start()
+
+    def stop(self) -> None:
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def note(self, message: str) -> None:
+        """Record why the profile is partial (each message once)."""
+        with self._lock:
+            if message not in self.notes:
+                self.notes.append(message)
+
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        """Profile the current thread (a thread pool worker) during the `with` block."""
+        ident = threading.get_ident()
+        if self.mode == "sample":
+            self.sampler.add_thread(ident)
+            try:
+                yield
+            finally:
+                self.sampler.remove_thread(ident)
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python >= 3.12: a single profiler may be active in the process (sys.monitoring)
+            self.note(f"cProfile not started: {e}")
+            yield
+            return
+        with self._lock:
+            self.profilers.append(profiler)
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    @contextmanager
+    def profile_task(self, frame: FrameType) -> Iterator[None]:
+        """Sample the coroutine running `frame` on the event loop during the `with` block."""
+        if self.mode != "sample":
+            self.note("Async endpoint: cProfile only profiles threads, use the sample profiler.")
+            yield
+            return
+        ident = threading.get_ident()
+        self.sampler.add_thread(ident, frame)
+        try:
+            yield
+        finally:
+            self.sampler.remove_thread(ident, frame)
+
+    def stats(self) -> Optional[pstats.Stats]:
+        """Return the merged cProfile statistics of every profiled thread."""
+        with self._lock:
+            profilers = list(self.profilers)
+        if not profilers:
+            return None
+        stats = pstats.Stats(profilers[0], stream=io.StringIO())
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+_session: "contextvars.ContextVar[Optional[ProfileSession]]" = contextvars.ContextVar("profile_session", default=None)
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap an endpoint so that it is profiled when its request is.
+
+    FastAPI runs synchronous endpoints in its thread pool: the wrapper profiles that
+    thread for the duration of the call. Async endpoints share the event loop with the
+    other requests: the wrapper has the sampler follow their coroutine only. Outside of
+    a profiled request it costs one context variable lookup.
+    """
+    if getattr(func, "__profiled__", False):
+        return func
+
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            session = _session.get()
+            if session is None:
+                return await func(*args, **kwargs)
+            with session.profile_task(sys._getframe()):
+                return await func(*args, **kwargs)
+
+        async_wrapper.__profiled__ = True
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        session = _session.get()
+        if session is None:
+            return func(*args, **kwargs)
+        with session.profile_thread():
+            return func(*args, **kwargs)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """`APIRoute` whose endpoint can be profiled, see `profiled`."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+class ProfileStore:
+    """Directory of the saved profiles: a JSON summary and the raw profile of each request."""
+
+    def __init__(self, directory: Optional[str] = None, max_profiles: int = MAX_PROFILES) -> None:
+        self.directory = directory or PROFILE_DIR
+        self.max_profiles = max_profiles
+
+    def path(self, profile_id: str, suffix: str) -> str:
+        """
+        Return the path of a file of a profile.
+
+        Raises:
+            ValueError: If the profile id is malformed.
+        """
+        if not _PROFILE_ID.match(profile_id):
+            raise ValueError(f"Invalid profile id '{profile_id}'.")
+        return os.path.join(self.directory, f"{profile_id}.{suffix}")
+
+    def save(self, session: ProfileSession, stages: List[Tuple[str, float]], total_seconds: float, status: int) -> Dict[str, Any]:
+        """
+        Save a profiled request and drop the oldest profiles above `max_profiles`.
+
+        Args:
+            session: The finished profiling session.
+            stages: The `(stage, seconds)` recorded during the request.
+            total_seconds: The duration of the request.
+            status: Its status code.
+
+        Returns:
+            The summary of the profile.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        summary: Dict[str, Any] = {
+            "id": session.id,
+            "mode": session.mode,
+            "method": session.method,
+            "path": session.path,
+            "status": status,
+            "created_at": time.time(),
+            "total_ms": total_seconds * 1000,
+            "stages": [{"stage": stage, "ms": seconds * 1000} for stage, seconds in stages],
+            "stage_totals_ms": stage_totals(stages),
+            "notes": session.notes,
+        }
+        if session.mode == "cprofile":
+            stats = session.stats()
+            if stats is not None:
+                stats.dump_stats(self.path(session.id, "pstats"))
+                summary["file"] = f"{session.id}.pstats"
+                summary["top"] = top_functions(stats)
+        else:
+            with open(self.path(session.id, "collapsed"), "w") as f:
+                f.write(session.sampler.collapsed())
+            summary["file"] = f"{session.id}.collapsed"
+            summary["samples"] = session.sampler.samples
+            summary["top"] = top_frames(session.sampler.stacks)
+
+        with open(self.path(session.id, "json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        self._prune()
+        return summary
+
+    def load(self, profile_id: str) -> Dict[str, Any]:
+        """
+        Return the summary of a saved profile.
+
+        Raises:
+            ValueError: If the profile id is malformed.
+            FileNotFoundError: If there is no such profile.
+        """
+        with open(self.path(profile_id, "json")) as f:
+            return json.load(f)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return the summaries of the saved profiles, newest first, without their top functions."""
+        summaries = []
+        for name in self._summary_files():
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop("top", None)
+            summaries.append(summary)
+        return sorted(summaries, key=lambda s: s["created_at"], reverse=True)
+
+    def _summary_files(self) -> List[str]:
+        try:
+            return [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _prune(self) -> None:
+        paths = [os.path.join(self.directory, name) for name in self._summary_files()]
+        paths.sort(key=os.path.getmtime)
+        for path in paths[: max(len(paths) - self.max_profiles, 0)]:
+            profile_id = os.path.basename(path)[: -len(".json")]
+            for suffix in ("json", "pstats", "collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{profile_id}.{suffix}"))
+                except FileNotFoundError:
+                    pass
+
+
+def stage_totals(stages: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Return the total milliseconds spent in each stage."""
+    totals: Dict[str, float] = {}
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+    return totals
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Return the functions with the highest cumulative time of cProfile statistics."""
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "total_ms": total * 1000,
+            "cumulative_ms": cumulative * 1000,
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def top_frames(stacks: "Counter[str]", limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Return the frames found on top of the most samples (where the time is spent)."""
+    leaves: "Counter[str]" = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return [{"function": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+
+def server_timing(stages: List[Tuple[str, float]], total_seconds: float) -> str:
+    """Return a `Server-Timing` header value with the time spent in each stage."""
+    entries = [f"{stage};dur={ms:.3f}" for stage, ms in stage_totals(stages).items()]
+    entries.append(f"total;dur={total_seconds * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def requested_mode(scope: Dict[str, Any]) -> Optional[str]:
+    """Return the profiler asked for by the `X-Profile` header or the `profile` query parameter."""
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1").strip().lower()
+    query_string = scope.get("query_string", b"")
+    if b"profile=" in query_string:
+        values = parse_qs(query_string.decode("latin-1")).get(PROFILE_QUERY)
+        if values:
+            return values[0].strip().lower()
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests that ask for it.
+
+    A request is profiled when it carries `X-Profile: cprofile|sample` (or
+    `?profile=cprofile|sample`) and its `Authorization` header is accepted by `authorize`
+    (an administrator token). The response gets an `X-Profile-Id` header and a
+    `Server-Timing` header with its stage breakdown; the profile (pstats or collapsed
+    stacks) and its summary are saved in the profile store. Other requests only pay for
+    the header lookup.
+
+    One request is profiled at a time, and only its own code is (see `ProfileSession`):
+    the other requests running concurrently on the event loop stay out of the profile.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        authorize: Authorizer,
+        store: Optional[ProfileStore] = None,
+        sample_interval: float = SAMPLE_INTERVAL_SECONDS,
+    ) -> None:
+        self.app = app
+        self.authorize = authorize
+        self.store = store or ProfileStore()
+        self.sample_interval = sample_interval
+        self._busy = False
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = next((v.decode("latin-1") for n, v in scope["headers"] if n == b"authorization"), None)
+        if not await self.authorize(authorization):
+            await JSONResponse({"detail": "Profiling requires an admin token."}, status_code=403)(scope, receive, send)
+            return
+        if mode not in MODES:
+            await JSONResponse({"detail": f"Unknown profiler '{mode}', expected one of {list(MODES)}."}, status_code=400)(
+                scope, receive, send
+            )
+            return
+        if self._busy:
+            await JSONResponse({"detail": "Another request is being profiled."}, status_code=409)(scope, receive, send)
+            return
+
+        self._busy = True
+        session = ProfileSession(mode, scope["method"], scope["path"], self.sample_interval)
+        token = _session.set(session)
+        status = 500
+        start = time.perf_counter()
+        try:
+            with metrics.record_stages() as stages:
+
+                async def send_wrapper(message: Dict[str, Any]) -> None:
+                    nonlocal status
+                    if message["type"] == "http.response.start":
+                        status = message["status"]
+                        timing = server_timing(stages, time.perf_counter() - start)
+                        message = {
+                            **message,
+                            "headers": list(message.get("headers", []))
+                            + [(b"x-profile-id", session.id.encode()), (b"server-timing", timing.encode())],
+                        }
+                    await send(message)
+
+                session.start()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    session.stop()
+            try:
+                self.store.save(session, stages, time.perf_counter() - start, status)
+            except OSError as e:
+                logging.warning(f"Profile {session.id} not saved: {e}")
+        finally:
+            _session.reset(token)
+            self._busy = False
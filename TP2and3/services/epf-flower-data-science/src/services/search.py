@@ -0,0 +1,307 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.model_selection import StratifiedKFold
+
+from src.services import metrics
+from src.services.training import get_model
+
+DEFAULT_CV = 5
+MAX_CANDIDATES = 1000
+MAX_MEMOIZED_SCORES = 100_000
+
+# Upper bound of the parallel fits of a search, whatever the request asks for
+MAX_JOBS = int(os.environ.get("SEARCH_MAX_JOBS", os.cpu_count() or 1))
+
+Fold = Tuple[np.ndarray, np.ndarray]
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def expand_grid(param_grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Return every combination of a parameter grid."""
+    names = sorted(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+def sample_space(space: Dict[str, Any], n_iter: int, random_state: int) -> List[Dict[str, Any]]:
+    """
+    Draw distinct candidates from a random-search space.
+
+    Each entry of the space is either a list of choices or a range
+    `{"low": ..., "high": ..., "log": bool, "type": "int" | "float"}`.
+
+    Args:
+        space: The search space.
+        n_iter: The number of candidates to draw.
+        random_state: The seed of the draws.
+
+    Returns:
+        The distinct candidates (fewer than `n_iter` if the space is too small).
+
+    Raises:
+        ValueError: If an entry of the space is malformed.
+    """
+    rng = np.random.default_rng(random_state)
+
+    def draw(name: str, spec: Any) -> Any:
+        if isinstance(spec, list):
+            return spec[rng.integers(len(spec))]
+        if not isinstance(spec, dict) or "low" not in spec or "high" not in spec:
+            raise ValueError(f"Invalid search space for '{name}': {spec}")
+        low, high = spec["low"], spec["high"]
+        if spec.get("type") == "int":
+            return int(rng.integers(low, high + 1))
+        if spec.get("log"):
+            return float(math.exp(rng.uniform(math.log(low), math.log(high))))
+        return float(rng.uniform(low, high))
+
+    candidates: Dict[str, Dict[str, Any]] = {}
+    for _ in range(n_iter * 10):
+        if len(candidates) >= n_iter:
+            break
+        params = {name: draw(name, spec) for name, spec in sorted(space.items())}
+        candidates.setdefault(_params_key(params), params)
+    return list(candidates.values())
+
+
+_folds: Dict[Tuple[Any, ...], List[Fold]] = {}
+_scores: "OrderedDict[Tuple[Any, ...], Tuple[float, Optional[str]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_memo_stats = {"hits": 0, "misses": 0}
+
+metrics.register_cache("search", lambda: (_memo_stats["hits"], _memo_stats["misses"]))
+
+
+def get_folds(key: Optional[str], y: np.ndarray, cv: int, random_state: int) -> List[Fold]:
+    """
+    Return the stratified cross-validation folds of a dataset, computed once per dataset version.
+
+    The training indices of each fold are shuffled, so any prefix of them is a random
+    subsample (used as the budget of successive halving).
+
+    Args:
+        key: The content hash of the dataset; without a key the folds are not cached.
+        y: The target.
+        cv: The number of folds.
+        random_state: The seed of the folds.
+
+    Returns:
+        The `(train_indices, test_indices)` of each fold.
+    """
+    cache_key = (key, len(y), cv, random_state)
+    with _cache_lock:
+        if key is not None and cache_key in _folds:
+            return _folds[cache_key]
+
+    rng = np.random.default_rng(random_state)
+    splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    folds = [(rng.permutation(train), test) for train, test in splitter.split(np.zeros(len(y)), y)]
+    if key is not None:
+        with _cache_lock:
+            _folds[cache_key] = folds
+    return folds
+
+
+def _fit_and_score(
+    model_name: str, params: Dict[str, Any], X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray
+) -> Tuple[float, Optional[str]]:
+    try:
+        model = get_model(model_name, params).fit(X[train], y[train])
+        return float(model.score(X[test], y[test])), None
+    except Exception as e:
+        return float("nan"), str(e)
+
+
+@dataclass
+class Candidate:
+    """One parameter set and its cross-validation scores at the last budget it reached."""
+    params: Dict[str, Any]
+    scores: List[float] = field(default_factory=list)
+    resources: int = 0
+    error: Optional[str] = None
+
+    @property
+    def mean_score(self) -> float:
+        return float(np.mean(self.scores)) if self.scores and self.error is None else float("nan")
+
+    def rank_key(self) -> Tuple[int, float]:
+        return (0, self.mean_score) if not math.isnan(self.mean_score) else (1, 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        mean = self.mean_score
+        return {
+            "params": self.params,
+            "mean_score": None if math.isnan(mean) else mean,
+            "std_score": float(np.std(self.scores)) if self.error is None and self.scores else None,
+            "n_folds": len(self.scores),
+            "resources": self.resources,
+            "error": self.error,
+        }
+
+
+def search(
+    model_name: str,
+    candidates: List[Dict[str, Any]],
+    X: np.ndarray,
+    y: np.ndarray,
+    key: Optional[str] = None,
+    base_params: Optional[Dict[str, Any]] = None,
+    cv: int = DEFAULT_CV,
+    halving: bool = False,
+    factor: int = 3,
+    min_resources: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    n_jobs: int = -1,
+    random_state: int = 42,
+) -> Dict[str, Any]:
+    """
+    Cross-validate parameter candidates in parallel and return them ranked.
+
+    Every `(params, fold, budget)` score is memoized per dataset version, so repeated or
+    overlapping searches only fit what was never evaluated. With `halving`, all the
+    candidates start on `min_resources` training rows per fold and only the best
+    `1 / factor` of them go on to the next round, with `factor` times more rows. With
+    `max_seconds`, no new batch of fits is started once the deadline has passed.
+
+    Args:
+        model_name: The name of the classification model.
+        candidates: The parameter sets to evaluate.
+        X: The feature matrix.
+        y: The target.
+        key: The content hash of the dataset `X` and `y` come from, used by the fold and
+            score caches.
+        base_params: Parameters shared by every candidate (overridden by the candidate).
+        cv: The number of folds.
+        halving: Run successive halving instead of evaluating every candidate fully.
+        factor: The halving rate.
+        min_resources: The number of training rows of the first halving round.
+        max_seconds: The wall-clock budget of the search.
+        n_jobs: The number of parallel fits (-1 for all cores), at most `MAX_JOBS`.
+        random_state: The seed of the folds.
+
+    Returns:
+        The ranked candidates, the best parameters and score, the rounds that were run and
+        the memoization counters.
+    """
+    start = time.perf_counter()
+    deadline = start + max_seconds if max_seconds else None
+    n_jobs = min(effective_n_jobs(n_jobs), MAX_JOBS)
+    base_params = base_params or {}
+    folds = get_folds(key, y, cv, random_state)
+    n_train = min(len(train) for train, _ in folds)
+
+    if halving:
+        n_classes = len(np.unique(y))
+        resources = max(min_resources or n_classes * 2 * cv, 1)
+        schedule = []
+        while resources < n_train:
+            schedule.append(resources)
+            resources *= factor
+        schedule.append(n_train)
+    else:
+        schedule = [n_train]
+
+    pool = [Candidate({**base_params, **params}) for params in candidates]
+    survivors = list(pool)
+    rounds: List[Dict[str, Any]] = []
+    stopped_early = False
+    memo_hits = 0
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for resources in schedule:
+            if deadline and time.perf_counter() >= deadline:
+                stopped_early = True
+                break
+
+            tasks, results = [], {}
+            for ci, candidate in enumerate(survivors):
+                for fi, (train, test) in enumerate(folds):
+                    memo_key = (key, model_name, _params_key(candidate.params), cv, random_state, fi, resources)
+                    with _cache_lock:
+                        cached = _scores.get(memo_key) if key is not None else None
+                    if cached is not None:
+                        results[(ci, fi)] = cached
+                        memo_hits += 1
+                    else:
+                        tasks.append((ci, fi, memo_key, train[:resources] if resources < n_train else train, test))
+
+            batch_size = effective_n_jobs(n_jobs) * 4
+            for offset in range(0, len(tasks), batch_size):
+                if deadline and time.perf_counter() >= deadline:
+                    stopped_early = True
+                    break
+                batch = tasks[offset:offset + batch_size]
+                scores = parallel(
+                    delayed(_fit_and_score)(model_name, survivors[ci].params, X, y, train, test)
+                    for ci, _, _, train, test in batch
+                )
+                for (ci, fi, memo_key, _, _), score in zip(batch, scores):
+                    results[(ci, fi)] = score
+                    if key is not None:
+                        with _cache_lock:
+                            _scores[memo_key] = score
+                            while len(_scores) > MAX_MEMOIZED_SCORES:
+                                _scores.popitem(last=False)
+
+            evaluated = []
+            for ci, candidate in enumerate(survivors):
+                fold_scores = [results[(ci, fi)] for fi in range(len(folds)) if (ci, fi) in results]
+                if len(fold_scores) < len(folds):
+                    continue  # The deadline interrupted this candidate
+                candidate.scores = [score for score, _ in fold_scores]
+                candidate.error = next((error for _, error in fold_scores if error), None)
+                candidate.resources = resources
+                evaluated.append(candidate)
+
+            rounds.append({"resources": resources, "n_candidates": len(survivors), "n_fits": len(tasks)})
+            if stopped_early or not evaluated:
+                break
+
+            evaluated.sort(key=lambda c: (c.rank_key()[0], -c.rank_key()[1]))
+            if halving and resources != schedule[-1]:
+                survivors = evaluated[:max(1, math.ceil(len(evaluated) / factor))]
+                if len(survivors) == 1:
+                    break
+
+    with _cache_lock:
+        _memo_stats["hits"] += memo_hits
+        _memo_stats["misses"] += sum(round["n_fits"] for round in rounds)
+
+    ranked = sorted(
+        (c for c in pool if c.scores),
+        key=lambda c: (-c.resources, c.rank_key()[0], -c.rank_key()[1]),
+    )
+    best = ranked[0] if ranked and ranked[0].error is None else None
+    return {
+        "model_name": model_name,
+        "results": [c.to_dict() for c in ranked],
+        "best_params": best.params if best else None,
+        "best_score": best.mean_score if best else None,
+        "rounds": rounds,
+        "stopped_early": stopped_early,
+        "memo_hits": memo_hits,
+        "elapsed_seconds": time.perf_counter() - start,
+    }
+
+
+def cache_stats() -> Dict[str, int]:
+    """Return the fold and score cache counters."""
+    with _cache_lock:
+        return {
+            "cached_folds": len(_folds),
+            "memoized_scores": len(_scores),
+            "hits": _memo_stats["hits"],
+            "misses": _memo_stats["misses"],
+        }
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.services import data, metrics
+from src.services.cleaning import TARGET_COLUMN, clean_dataset
+
+SNAPSHOT_VERSION = 1
+META_FILE = "meta.json"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Columnar binary copy of a CSV dataset.
+
+    `features` is a read-only memory-mapped float64 matrix and `labels` holds the
+    category code of each row, so every worker reading the same snapshot shares its
+    pages through the OS page cache.
+    """
+    directory: str
+    meta: Dict[str, Any]
+    ids: np.ndarray
+    features: np.ndarray
+    labels: np.ndarray
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.meta["feature_names"]
+
+    @property
+    def categories(self) -> np.ndarray:
+        return np.asarray(self.meta["categories"])
+
+    @property
+    def sha256(self) -> str:
+        return self.meta["source"]["sha256"]
+
+    def label_values(self) -> np.ndarray:
+        """Return the labels as their category names."""
+        return self.categories[self.labels]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Rebuild the dataset as it is read from the CSV file."""
+        frame = pd.DataFrame(np.asarray(self.features), columns=self.feature_names)
+        frame.insert(0, self.meta["id_column"], np.asarray(self.ids))
+        frame[self.meta["target_column"]] = self.label_values()
+        return frame
+
+
+def snapshot_dir(csv_path: str) -> str:
+    """Return the directory of the snapshot of a CSV file (next to it)."""
+    return f"{csv_path}.snapshot"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_meta(directory: str) -> Optional[Dict[str, Any]]:
+    """Return the `meta.json` of an artifact directory, None if missing or of another version."""
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta if meta.get("version") == SNAPSHOT_VERSION else None
+
+
+@contextmanager
+def atomic_path(directory: str, name: str) -> Iterator[str]:
+    """
+    Yield a temporary path in `directory`, moved to `name` when the `with` block succeeds.
+
+    The temporary name is unique, so processes writing the same file do not clobber each
+    other's partial writes: the last one to finish replaces the file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(directory: str, name: str, write: Callable[[BinaryIO], Any]) -> None:
+    """Write a file of `directory` through `write(f)` and atomically replace it."""
+    with atomic_path(directory, name) as tmp_path, open(tmp_path, "wb") as f:
+        write(f)
+
+
+def write_meta(directory: str, meta: Dict[str, Any]) -> None:
+    """Atomically replace the `meta.json` of an artifact directory."""
+    write_atomic(directory, META_FILE, lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+
+
+def _scan_csv(csv_path: str, block_rows: int) -> Dict[str, Any]:
+    # First pass of a block-by-block build: the shape, columns and categories of the dataset
+    header = pd.read_csv(csv_path, nrows=0)
+    n_rows = 0
+    categories = set()
+    ids_dtype = np.dtype(np.int64)
+    with pd.read_csv(csv_path, chunksize=block_rows) as chunks:
+        for i, chunk in enumerate(chunks):
+            categories.update(clean_dataset(chunk).target.unique().tolist())
+            n_rows += len(chunk)
+            ids = chunk.iloc[:, 0].to_numpy()
+            ids_dtype = ids.dtype if i == 0 else np.promote_types(ids_dtype, ids.dtype)
+    return {
+        "n_rows": n_rows,
+        "id_column": header.columns[0].strip(),
+        "feature_names": clean_dataset(header).features.columns.tolist(),
+        "categories": sorted(categories),
+        "ids_dtype": ids_dtype,
+    }
+
+
+def _write_arrays_in_blocks(csv_path: str, block_rows: int, directory: str, files: Dict[str, str], shape: Dict[str, Any]) -> None:
+    # Second pass: every block is written into `.npy` files preallocated on disk
+    n_rows, n_features = shape["n_rows"], len(shape["feature_names"])
+    with ExitStack() as stack:
+        paths = {key: stack.enter_context(atomic_path(directory, name)) for key, name in files.items()}
+        out = {
+            "ids": np.lib.format.open_memmap(paths["ids"], mode="w+", dtype=shape["ids_dtype"], shape=(n_rows,)),
+            "features": np.lib.format.open_memmap(paths["features"], mode="w+", dtype=np.float64, shape=(n_rows, n_features)),
+            "labels": np.lib.format.open_memmap(paths["labels"], mode="w+", dtype=np.int32, shape=(n_rows,)),
+        }
+        row = 0
+        with pd.read_csv(csv_path, chunksize=block_rows) as chunks:
+            for chunk in chunks:
+                dataset = clean_dataset(chunk)
+                stop = row + len(chunk)
+                if stop > n_rows:
+                    break
+                out["ids"][row:stop] = chunk.iloc[:, 0].to_numpy()
+                out["features"][row:stop] = dataset.features.to_numpy(dtype=np.float64)
+                out["labels"][row:stop] = pd.Categorical(dataset.target, categories=shape["categories"]).codes
+                row = stop
+        if row != n_rows:
+            raise ValueError(f"Expected {n_rows} rows, read {row}: the dataset changed while it was converted.")
+        for array in out.values():
+            array.flush()
+        del out
+
+
+def build_snapshot(csv_path: str, sha256: Optional[str] = None, block_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Convert a CSV dataset into a columnar binary snapshot.
+
+    The arrays are written as `.npy` files named after the content hash of the CSV, then
+    `meta.json` is atomically replaced to point at them: readers see either the previous
+    snapshot or the new one, never a mix of both.
+
+    Args:
+        csv_path: The CSV file.
+        sha256: The content hash of the CSV file, computed when omitted.
+        block_rows: Read the CSV in blocks of this many rows (two passes), so that memory
+            does not depend on the dataset size. The whole file is parsed at once by default.
+
+    Returns:
+        The metadata of the new snapshot.
+
+    Raises:
+        ValueError: If the target column is missing.
+    """
+    stat = os.stat(csv_path)
+    sha256 = sha256 or _file_sha256(csv_path)
+    directory = snapshot_dir(csv_path)
+    os.makedirs(directory, exist_ok=True)
+    tag = sha256[:16]
+    files = {
+        "ids": f"ids-{tag}.npy",
+        "features": f"features-{tag}.npy",
+        "labels": f"labels-{tag}.npy",
+    }
+
+    with metrics.timer("csv_load"):
+        if block_rows is None:
+            frame = pd.read_csv(csv_path)
+            dataset = clean_dataset(frame)
+            codes, categories = pd.factorize(dataset.target, sort=True)
+            shape = {
+                "n_rows": len(frame),
+                "id_column": frame.columns[0].strip(),
+                "feature_names": dataset.features.columns.tolist(),
+                "categories": categories.tolist(),
+            }
+            arrays = {
+                "ids": frame.iloc[:, 0].to_numpy(),
+                "features": np.ascontiguousarray(dataset.features.to_numpy(dtype=np.float64)),
+                "labels": codes.astype(np.int32),
+            }
+            for key, name in files.items():
+                write_atomic(directory, name, lambda f, a=arrays[key]: np.save(f, a))
+        else:
+            shape = _scan_csv(csv_path, block_rows)
+            _write_arrays_in_blocks(csv_path, block_rows, directory, files, shape)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "source": {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256},
+        "n_rows": shape["n_rows"],
+        "id_column": shape["id_column"],
+        "feature_names": shape["feature_names"],
+        "target_column": TARGET_COLUMN,
+        "categories": shape["categories"],
+        "files": files,
+    }
+    write_meta(directory, meta)
+
+    # Remove the arrays of previous snapshots
+    for name in os.listdir(directory):
+        if name.endswith(".npy") and name not in files.values():
+            os.remove(os.path.join(directory, name))
+    return meta
+
+
+def _open_snapshot(directory: str, meta: Dict[str, Any]) -> Snapshot:
+    files = {key: os.path.join(directory, name) for key, name in meta["files"].items()}
+    return Snapshot(
+        directory=directory,
+        meta=meta,
+        ids=np.load(files["ids"], mmap_mode="r"),
+        features=np.load(files["features"], mmap_mode="r"),
+        labels=np.load(files["labels"], mmap_mode="r"),
+    )
+
+
+def matches(meta: Optional[Dict[str, Any]], stat: os.stat_result) -> bool:
+    """Tell whether artifact metadata was written for a source file in its current state."""
+    return (
+        meta is not None
+        and meta["source"]["mtime_ns"] == stat.st_mtime_ns
+        and meta["source"]["size"] == stat.st_size
+    )
+
+
+_snapshots: Dict[str, Snapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(csv_path: Optional[str] = None, block_rows: Optional[int] = None) -> Snapshot:
+    """
+    Return the memory-mapped snapshot of a CSV dataset, building it when needed.
+
+    A lookup only stats the CSV file. When its mtime or size no longer match the
+    snapshot, the CSV is hashed: an unchanged content only refreshes the metadata,
+    otherwise the snapshot is rebuilt.
+
+    Args:
+        csv_path: The CSV file. Defaults to the Iris dataset.
+        block_rows: When the snapshot has to be built, read the CSV in blocks of this many
+            rows instead of parsing it whole (see `build_snapshot`).
+
+    Returns:
+        The snapshot.
+
+    Raises:
+        FileNotFoundError: If the CSV file does not exist.
+    """
+    csv_path = os.path.abspath(csv_path or data.IRIS_PATH)
+    stat = os.stat(csv_path)
+    snapshot = _snapshots.get(csv_path)
+    if snapshot is not None and matches(snapshot.meta, stat):
+        return snapshot
+
+    with _snapshots_lock:
+        snapshot = _snapshots.get(csv_path)
+        if snapshot is not None and matches(snapshot.meta, stat):
+            return snapshot
+
+        directory = snapshot_dir(csv_path)
+        meta = read_meta(directory)
+        if not matches(meta, stat):
+            sha256 = _file_sha256(csv_path)
+            if meta is not None and meta["source"]["sha256"] == sha256:
+                meta["source"].update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                write_meta(directory, meta)
+            else:
+                meta = build_snapshot(csv_path, sha256, block_rows)
+
+        snapshot = _open_snapshot(directory, meta)
+        _snapshots[csv_path] = snapshot
+        return snapshot
@@ -0,0 +1,162 @@
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from firebase_admin import auth
+
+from src.services import metrics
+
+TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "10000"))
+CHECK_REVOKED = os.environ.get("AUTH_CHECK_REVOKED", "false").lower() in ("1", "true", "yes")
+REVOCATION_CHECK_SECONDS = float(os.environ.get("AUTH_REVOCATION_CHECK_SECONDS", "300"))
+
+Verifier = Callable[[str, Any, bool], Dict[str, Any]]
+
+
+def _verify_id_token(token: str, app: Any, check_revoked: bool) -> Dict[str, Any]:
+    # firebase_admin caches Google's public keys for as long as their Cache-Control allows
+    return auth.verify_id_token(token, app=app, check_revoked=check_revoked)
+
+
+@dataclass
+class _Entry:
+    claims: Dict[str, Any]
+    expires_at: float
+    checked_at: float
+
+
+class TokenCache:
+    """
+    Bounded cache of verified Firebase ID tokens, keyed by the SHA-256 of the token.
+
+    The decoded claims are kept until the `exp` of the token, so its signature is checked
+    once instead of on every request. With `check_revoked`, the token is verified again
+    (with a revocation check against Firebase) when its last check is older than
+    `revocation_check_seconds`.
+    """
+
+    def __init__(
+        self,
+        max_size: int = TOKEN_CACHE_SIZE,
+        check_revoked: bool = CHECK_REVOKED,
+        revocation_check_seconds: float = REVOCATION_CHECK_SECONDS,
+        verifier: Optional[Verifier] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Init the cache.
+
+        Args:
+            max_size: The maximum number of cached tokens (least recently used are evicted).
+            check_revoked: Also check that the tokens are not revoked.
+            revocation_check_seconds: How long a revocation check stays valid.
+            verifier: Verifies a token, `(token, app, check_revoked) -> claims`.
+            clock: The clock compared to the `exp` claim (seconds since the epoch).
+        """
+        self.max_size = max_size
+        self.check_revoked = check_revoked
+        self.revocation_check_seconds = revocation_check_seconds
+        self._verifier = verifier or _verify_id_token
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str, app: Any = None) -> Dict[str, Any]:
+        """
+        Return the claims of an ID token, verifying it unless a valid verification is cached.
+
+        Args:
+            token: The Firebase ID token.
+            app: The Firebase Admin app.
+
+        Returns:
+            The decoded claims.
+
+        Raises:
+            Exception: The error of `auth.verify_id_token` if the token is invalid, expired
+                or revoked.
+        """
+        claims = self.lookup(token)
+        if claims is not None:
+            return claims
+
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = self._clock()
+        with self._lock:
+            self.misses += 1
+        with metrics.timer("firebase_verify_token"):
+            claims = self._verifier(token, app, self.check_revoked)
+        if "exp" in claims:
+            with self._lock:
+                self._entries[key] = _Entry(dict(claims), float(claims["exp"]), now)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return claims
+
+    def lookup(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the claims of a token if a valid verification is cached, without verifying it.
+
+        Args:
+            token: The Firebase ID token.
+
+        Returns:
+            The cached claims, or None if the token has to be verified.
+        """
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                if not self.check_revoked or now - entry.checked_at < self.revocation_check_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry.claims)
+            if entry is not None:
+                del self._entries[key]
+            return None
+
+    def evict_user(self, uid: str) -> int:
+        """
+        Forget the cached tokens of a user (e.g. after their refresh tokens are revoked).
+
+        Returns:
+            The number of tokens evicted.
+        """
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.claims.get("uid") == uid]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache size and its hit/miss counters."""
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[TokenCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """Return the process-wide verified token cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TokenCache()
+        return _cache
+
+
+def _cache_counts() -> Optional[Tuple[int, int]]:
+    cache = _cache
+    return (cache.hits, cache.misses) if cache is not None else None
+
+
+metrics.register_cache("tokens", _cache_counts)
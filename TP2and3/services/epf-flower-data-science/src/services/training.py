@@ -0,0 +1,203 @@
+import os
+import json
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, Perceptron, SGDClassifier
+from sklearn.svm import SVC
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.naive_bayes import ComplementNB, GaussianNB, MultinomialNB
+
+from src.services import compiled, metrics, models, pipeline
+
+MODEL_PARAMETERS_PATH = os.path.join("TP2and3/services/epf-flower-data-science/src/config", "model_parameters.json")
+
+# Upper bound of the worker processes of `train_all`, whatever the request asks for
+MAX_WORKERS = int(os.environ.get("TRAIN_MAX_WORKERS", os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class TrainingResult:
+    """Outcome of training and publishing one model."""
+    model_name: str
+    model_path: str
+    fit_seconds: float
+    test_accuracy: float
+    artifact_bytes: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# Load model parameters from the JSON file
+def load_model_parameters() -> Dict[str, Dict[str, Any]]:
+    """
+    Load model parameters from a JSON configuration file.
+
+    Returns:
+        dict: A dictionary containing model parameters for each model type.
+
+    Raises:
+        FileNotFoundError: If the configuration file is not found.
+        json.JSONDecodeError: If the configuration file cannot be parsed as JSON.
+    """
+    model_params_path = MODEL_PARAMETERS_PATH
+    if not os.path.exists(model_params_path):
+        raise FileNotFoundError(f"Model parameters file not found at {model_params_path}")
+    
+    with open(model_params_path, 'r') as f:
+        return json.load(f)
+
+
+# Select the model based on the name and parameters
+def get_model(model_name: str, params: Dict[str, Any]) -> Any:
+    """
+    Retrieve a classification model instance based on the provided model name and parameters.
+
+    Parameters:
+        model_name (str): The name of the classification model (e.g., "RandomForestClassifier").
+        params (dict): A dictionary of parameters to initialize the model.
+
+    Returns:
+        sklearn.base.BaseEstimator: An instance of the specified classification model.
+
+    Raises:
+        ValueError: If the provided model name is not recognized.
+    """    
+    if model_name == "LogisticRegression":
+        return LogisticRegression(**params)
+    elif model_name == "RandomForestClassifier":
+        return RandomForestClassifier(**params)
+    elif model_name == "SVC":
+        return SVC(**params)
+    elif model_name == "KNeighborsClassifier":
+        return KNeighborsClassifier(**params)
+    elif model_name == "DecisionTreeClassifier":
+        return DecisionTreeClassifier(**params)
+    elif model_name == "GaussianNB":
+        return GaussianNB(**params)
+    elif model_name == "SGDClassifier":
+        return SGDClassifier(**params)
+    elif model_name == "Perceptron":
+        return Perceptron(**params)
+    elif model_name == "MultinomialNB":
+        return MultinomialNB(**params)
+    elif model_name == "ComplementNB":
+        return ComplementNB(**params)
+    else:
+        raise ValueError(f"Model '{model_name}' not recognized.")
+
+
+def train(
+    model_name: str,
+    params: Dict[str, Any],
+    dataset: Optional[pipeline.SplitDataset] = None,
+    registry: Optional[models.ModelRegistry] = None,
+) -> TrainingResult:
+    """
+    Fit a model on the split dataset, score it and publish it to the model registry.
+
+    Args:
+        model_name: The name of the classification model.
+        params: The parameters of the model.
+        dataset: The split dataset, computed by the pipeline when omitted.
+        registry: The registry publishing the model, the process-wide one by default.
+
+    Returns:
+        The artifact path, fit time and test accuracy of the model.
+
+    Raises:
+        ValueError: If the model name is not recognized.
+    """
+    model = get_model(model_name, params)
+    dataset = dataset if dataset is not None else pipeline.split()
+    registry = registry or models.get_model_registry()
+
+    start = time.perf_counter()
+    model = pipeline.fit_model(dataset, model)
+    fit_seconds = time.perf_counter() - start
+    test_accuracy = float(model.score(dataset.X_test, dataset.y_test)) if len(dataset.X_test) else float("nan")
+
+    serving_model = pipeline.serving_model(dataset, model)
+    model_path = registry.publish(model_name, serving_model)
+    # Tree models are also exported as flat node arrays, served by /predict when present
+    compiled.export(model_name, serving_model, registry)
+    return TrainingResult(
+        model_name=model_name,
+        model_path=model_path,
+        fit_seconds=fit_seconds,
+        test_accuracy=test_accuracy,
+        artifact_bytes=os.path.getsize(model_path),
+    )
+
+
+def _train_from_file(model_name: str, params: Dict[str, Any], dataset_path: str) -> TrainingResult:
+    # Worker side of train_all: the split arrays are memory-mapped, not copied
+    dataset = joblib.load(dataset_path, mmap_mode="r")
+    return train(model_name, params, dataset)
+
+
+def _process_pool(max_workers: int) -> Executor:
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def train_all(
+    model_names: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+    executor_factory: Optional[Callable[[int], Executor]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fit several configured models concurrently on the same split dataset.
+
+    The dataset is loaded and split once, saved to a temporary file and memory-mapped
+    by every worker process, which then fits, scores and publishes one model.
+
+    Args:
+        model_names: The models to train, every model of `model_parameters.json` by default.
+            A model listed twice is trained once.
+        max_workers: The size of the process pool, one worker per model by default, at
+            most `MAX_WORKERS`.
+        executor_factory: Builds the executor from the number of workers, a spawn-based
+            process pool by default.
+
+    Returns:
+        The training result of each model, or its error.
+
+    Raises:
+        ValueError: If a requested model has no parameters.
+    """
+    model_params = load_model_parameters()
+    # Keep the order, but never fit and publish the same model twice at once
+    model_names = list(dict.fromkeys(model_names or model_params))
+    missing = [name for name in model_names if name not in model_params]
+    if missing:
+        raise ValueError(f"Model parameters not found for: {missing}")
+
+    dataset = pipeline.split()
+    max_workers = min(max_workers or len(model_names), MAX_WORKERS)
+    executor_factory = executor_factory or _process_pool
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_path = os.path.join(tmp_dir, "split.joblib")
+        with metrics.timer("joblib_dump"):
+            joblib.dump(dataset, dataset_path)
+
+        with executor_factory(max_workers) as executor:
+            futures = {
+                name: executor.submit(_train_from_file, name, model_params[name], dataset_path)
+                for name in model_names
+            }
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result().to_dict()
+                except Exception as e:
+                    results[name] = {"model_name": name, "error": str(e)}
+    return results
@@ -0,0 +1,73 @@
+import os
+import pytest
+import src
+from src.services import chunked, data, models, online, preprocessing, training
+
+IRIS_HEADER = "Id,SepalLengthCm,SepalWidthCm,PetalLengthCm,PetalWidthCm,Species\n"
+
+# Petit dataset Iris : deux setosa, deux virginica, puis un versicolor
+IRIS_CSV = IRIS_HEADER + (
+    "1,5.1,3.5,1.4,0.2,Iris-setosa\n"
+    "2,4.9,3.0,1.4,0.2,Iris-setosa\n"
+    "3,6.3,2.9,5.6,1.8,Iris-virginica\n"
+    "4,5.8,2.7,5.1,1.9,Iris-virginica\n"
+    "5,6.7,3.1,4.4,1.4,Iris-versicolor\n"
+)
+
+# 60 lignes, 20 par espèce, pour l'entraînement en ligne
+LARGE_IRIS_CSV = IRIS_HEADER + "".join(
+    f"{i * 3 + 1},5.{i % 5},3.{i % 4 + 2},1.{i % 6},0.{i % 3 + 1},Iris-setosa\n"
+    f"{i * 3 + 2},6.{i % 5},2.{i % 4 + 5},4.{i % 6},1.{i % 3 + 1},Iris-versicolor\n"
+    f"{i * 3 + 3},7.{i % 5},3.{i % 4},6.{i % 6},2.{i % 3 + 1},Iris-virginica\n"
+    for i in range(20)
+)
+
+# Nouvelles lignes étiquetées pour les mises à jour en ligne
+NEW_ROWS = [
+    {"SepalLengthCm": 5.0, "SepalWidthCm": 3.4, "PetalLengthCm": 1.5, "PetalWidthCm": 0.2, "Species": "Iris-setosa"},
+    {"SepalLengthCm": 7.4, "SepalWidthCm": 3.0, "PetalLengthCm": 6.1, "PetalWidthCm": 2.2, "Species": "Iris-virginica"},
+]
+
+
+@pytest.fixture
+def artifact_dirs(tmp_path, monkeypatch) -> str:
+    """
+    Use temporary preprocessing, model and online checkpoint directories
+    """
+    monkeypatch.setattr(preprocessing, "_store", preprocessing.PreprocessingStore(str(tmp_path / "preprocessing")))
+    monkeypatch.setattr(chunked, "_preprocessor", chunked.ChunkedPreprocessor(str(tmp_path / "chunked")))
+    monkeypatch.setattr(models, "_registry", models.ModelRegistry(str(tmp_path / "models")))
+    monkeypatch.setattr(online, "_trainer", online.OnlineTrainer(str(tmp_path / "online"), checkpoint_every=2))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def write_iris_csv(tmp_path, monkeypatch):
+    """
+    Write an Iris CSV (IRIS_CSV by default) and point the data service at it
+    """
+    def write(text: str = IRIS_CSV) -> str:
+        path = tmp_path / "iris.csv"
+        path.write_text(text)
+        monkeypatch.setattr(data, "IRIS_PATH", str(path))
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def iris_path(write_iris_csv, artifact_dirs) -> str:
+    """
+    Write IRIS_CSV, with temporary artifact directories
+    """
+    return write_iris_csv()
+
+
+@pytest.fixture
+def online_trainer(write_iris_csv, artifact_dirs, monkeypatch) -> online.OnlineTrainer:
+    """
+    Write LARGE_IRIS_CSV and return an online trainer using temporary directories
+    """
+    write_iris_csv(LARGE_IRIS_CSV)
+    # Le chemin de la configuration est relatif à la racine du dépôt
+    monkeypatch.setattr(training, "MODEL_PARAMETERS_PATH", os.path.join(os.path.dirname(src.__file__), "config", "model_parameters.json"))
+    return online.get_online_trainer()
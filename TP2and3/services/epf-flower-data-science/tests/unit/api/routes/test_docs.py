@@ -2,7 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
-from src.api import router 
+from src.api.router import router
 
 # Créez une instance de FastAPI avec le router
 app = FastAPI()
@@ -18,7 +18,7 @@ def client() -> TestClient:
 class TestRedirectToDocs:
     def test_redirect_to_docs(self, client):
         # Effectuer une requête GET sur la route "/"
-        response = client.get("/")
+        response = client.get("/", follow_redirects=False)
 
         # Vérifier que la réponse est une redirection
         assert response.status_code == 307
@@ -0,0 +1,323 @@
+import asyncio
+import httpx
+from datetime import datetime, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.routes import firestore_parameters, hello
+from src.services import firebase, tokens
+from src.services.firebase import FirebaseProvider, get_async_firestore_client, get_firebase_app, get_firestore_client
+
+
+class FakeDocument:
+    def __init__(self, id, data):
+        self.id, self._data = id, data
+
+    def to_dict(self):
+        return dict(self._data)
+
+    def get(self, field_path):
+        # Comme DocumentSnapshot.get : chemin pointé, KeyError si absent
+        value = self._data
+        for part in field_path.split("."):
+            value = value[part]
+        return value
+
+
+def lookup(data, field_path):
+    for part in field_path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+OPERATORS = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b, "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+}
+
+
+class FakeQuery:
+    """
+    Requête Firestore en mémoire (where, select, order_by, start_after, limit)
+    """
+    def __init__(self, store, filters=(), fields=None, orders=(), after=None, limit=None, delay=0):
+        self.store, self.filters, self.fields = store, filters, fields
+        self.orders, self.after, self._limit, self.delay = orders, after, limit, delay
+
+    def _copy(self, **changes):
+        state = dict(
+            filters=self.filters, fields=self.fields, orders=self.orders, after=self.after, limit=self._limit,
+            delay=self.delay,
+        )
+        state.update(changes)
+        return FakeQuery(self.store, **state)
+
+    def where(self, filter):
+        return self._copy(filters=self.filters + ((filter.field_path, filter.op_string, filter.value),))
+
+    def select(self, fields):
+        return self._copy(fields=fields)
+
+    def order_by(self, field):
+        return self._copy(orders=self.orders + (field,))
+
+    def start_after(self, values):
+        return self._copy(after=values)
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def _key(self, id, data):
+        return tuple(id if field == "__name__" else lookup(data, field) for field in self.orders)
+
+    async def stream(self):
+        await asyncio.sleep(self.delay)
+        rows = [
+            (id, data) for id, data in self.store.items()
+            if all(field in data and OPERATORS[op](data[field], value) for field, op, value in self.filters)
+        ]
+        rows.sort(key=lambda row: self._key(*row))
+        if self.after is not None:
+            after = tuple(self.after[field] for field in self.orders)
+            rows = [row for row in rows if self._key(*row) > after]
+        rows = rows[:self._limit] if self._limit is not None else rows
+        for id, data in rows:
+            yield FakeDocument(id, {k: v for k, v in data.items() if self.fields is None or k in self.fields})
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, store, delay=0):
+        super().__init__(store, delay=delay)
+        self.streams = 0
+
+    def stream(self):
+        self.streams += 1
+        return super().stream()
+
+    def document(self, id):
+        return id
+
+
+class FakeBulkWriter:
+    def __init__(self, store):
+        self.store = store
+
+    def set(self, doc_id, data, merge=False):
+        self.store[doc_id] = {**(self.store.get(doc_id, {}) if merge else {}), **data}
+
+    def close(self):
+        pass
+
+
+class FakeFirestore:
+    """
+    Client Firestore en mémoire avec une seule collection "parameters"
+    """
+    def __init__(self):
+        self.store = {"rf": {"n_estimators": 100, "criterion": "gini"}}
+        self.parameters = FakeCollection(self.store)
+        self.users = FakeCollection({
+            "alice": {"email": "alice@epf.fr", "role": "admin", "age": 30},
+            "bob": {"email": "bob@epf.fr", "role": "user", "age": 25},
+            "carol": {"email": "carol@epf.fr", "role": "user", "age": 41},
+        })
+
+    def collection(self, name):
+        return self.users if name == "users" else self.parameters
+
+    def bulk_writer(self):
+        return FakeBulkWriter(self.store)
+
+
+@pytest.fixture
+def db():
+    return FakeFirestore()
+
+
+@pytest.fixture
+def client(db) -> TestClient:
+    """
+    Test client with the Firestore client dependency replaced by a fake
+    """
+    app = FastAPI()
+    app.include_router(firestore_parameters.router)
+    app.dependency_overrides[get_firestore_client] = lambda: db
+    app.dependency_overrides[get_async_firestore_client] = lambda: db
+    app.dependency_overrides[get_firebase_app] = object
+    return TestClient(app)
+
+
+@pytest.fixture
+def verified_tokens(monkeypatch):
+    """
+    Token cache with a fake verifier: the token is the role of the user
+    """
+    calls = []
+
+    def verifier(token, app, check_revoked):
+        calls.append(token)
+        return {"uid": "alice", "role": token, "exp": 4102444800}
+
+    monkeypatch.setattr(tokens, "_cache", tokens.TokenCache(verifier=verifier))
+    return calls
+
+
+class TestFirebaseProvider:
+
+    def test_clients_are_created_once_on_first_use(self):
+        created = []
+        provider = FirebaseProvider(client_factory=lambda: created.append(1) or object(), app_factory=object)
+
+        assert created == []  # Rien n'est créé à l'initialisation
+        assert provider.get_client() is provider.get_client()
+        assert created == [1]
+
+    def test_warm_up_failure_does_not_raise(self, tmp_path):
+        provider = FirebaseProvider(credentials_path=str(tmp_path / "missing.json"))
+
+        assert provider.warm_up() is False
+
+    def test_provider_can_be_replaced(self, db):
+        firebase.set_firebase_provider(FirebaseProvider(client_factory=lambda: db, app_factory=object))
+        try:
+            assert get_firestore_client() is db
+        finally:
+            firebase.set_firebase_provider(None)
+
+
+class TestParametersRoutes:
+
+    def test_get_parameters_is_cached(self, client, db):
+        assert client.get("/parameters").json() == {"rf": {"n_estimators": 100, "criterion": "gini"}}
+        client.get("/parameters")
+
+        assert db.parameters.streams == 1
+        assert client.get("/parameters/cache").json()["hits"] == 1
+
+    def test_parameters_page(self, client, db):
+        db.store["svm"] = {"n_estimators": 10, "criterion": "entropy"}
+        response = client.get("/parameters/page", params={"limit": 1, "filter": "criterion==gini"})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "parameters": [{"id": "rf", "n_estimators": 100, "criterion": "gini"}],
+            "next_cursor": None,
+        }
+
+    def test_bulk_import_invalidates_the_cache(self, client, db):
+        client.get("/parameters")
+        response = client.post("/parameters/bulk", json={"parameters": {
+            "rf": {"n_estimators": 300, "criterion": "gini"},
+            "rf_entropy": {"n_estimators": 50, "criterion": "entropy"},
+        }})
+
+        assert response.status_code == 200
+        assert response.json()["written"] == 2
+        assert client.get("/parameters").json()["rf"]["n_estimators"] == 300
+        assert db.parameters.streams == 2
+
+    def test_bulk_import_size_limit(self, client, monkeypatch):
+        monkeypatch.setattr(firestore_parameters, "MAX_IMPORT_SIZE", 1)
+        response = client.post("/parameters/bulk", json={"parameters": {
+            "a": {"n_estimators": 1, "criterion": "gini"},
+            "b": {"n_estimators": 2, "criterion": "gini"},
+        }})
+
+        assert response.status_code == 413
+
+
+class TestUsersRoute:
+
+    def test_admin_token_is_verified_once(self, client, verified_tokens):
+        for _ in range(3):
+            response = client.get("/users", headers={"Authorization": "Bearer admin"})
+            assert response.status_code == 200
+            assert len(response.json()["users"]) == 3
+
+        assert verified_tokens == ["admin"]
+
+    def test_non_admin_is_forbidden(self, client, verified_tokens):
+        response = client.get("/users", headers={"Authorization": "Bearer user"})
+
+        assert response.status_code == 403
+
+    def test_missing_or_malformed_token(self, client, verified_tokens):
+        assert client.get("/users").status_code == 401
+        assert client.get("/users", headers={"Authorization": "admin"}).status_code == 401
+
+    def test_users_are_paginated(self, client, verified_tokens):
+        headers = {"Authorization": "Bearer admin"}
+        first = client.get("/users", params={"limit": 2}, headers=headers).json()
+        second = client.get("/users", params={"limit": 2, "cursor": first["next_cursor"]}, headers=headers).json()
+
+        assert [user["id"] for user in first["users"]] == ["alice", "bob"]
+        assert [user["id"] for user in second["users"]] == ["carol"]
+        assert second["next_cursor"] is None
+
+    def test_projection_filter_and_order(self, client, verified_tokens):
+        headers = {"Authorization": "Bearer admin"}
+        first = client.get("/users", params={"limit": 1, "fields": "email", "filter": "age>=26"}, headers=headers).json()
+        # Le tri se fait par défaut sur le champ du filtre d'inégalité
+        assert first["users"] == [{"id": "alice", "email": "alice@epf.fr", "age": 30}]
+
+        second = client.get(
+            "/users", params={"limit": 1, "fields": "email", "filter": "age>=26", "cursor": first["next_cursor"]},
+            headers=headers,
+        ).json()
+        assert [user["id"] for user in second["users"]] == ["carol"]
+
+    @pytest.mark.parametrize("order_by", ["joined", "stats.logins"])
+    def test_pages_ordered_by_a_timestamp_or_a_nested_field(self, client, db, verified_tokens, order_by):
+        db.users = FakeCollection({
+            "alice": {"joined": datetime(2024, 3, 1, tzinfo=timezone.utc), "stats": {"logins": 3}},
+            "bob": {"joined": datetime(2024, 1, 1, tzinfo=timezone.utc), "stats": {"logins": 1}},
+            "carol": {"joined": datetime(2024, 2, 1, tzinfo=timezone.utc), "stats": {"logins": 2}},
+        })
+        headers = {"Authorization": "Bearer admin"}
+
+        # Le curseur garde le type de la valeur : aucune page sautée ni répétée
+        ids, cursor = [], None
+        for _ in range(3):
+            params = {"limit": 1, "order_by": order_by, **({"cursor": cursor} if cursor else {})}
+            page = client.get("/users", params=params, headers=headers).json()
+            ids += [user["id"] for user in page["users"]]
+            cursor = page["next_cursor"]
+
+        assert ids == ["bob", "carol", "alice"]
+        assert cursor is None
+
+    def test_invalid_filter_and_limit(self, client, verified_tokens):
+        headers = {"Authorization": "Bearer admin"}
+
+        assert client.get("/users", params={"filter": "age"}, headers=headers).status_code == 422
+        assert client.get("/users", params={"cursor": "not-a-cursor"}, headers=headers).status_code == 422
+        assert client.get("/users", params={"limit": 100000}, headers=headers).status_code == 422
+
+
+class TestEventLoop:
+
+    def test_slow_firestore_calls_do_not_block_other_requests(self, db):
+        db.parameters = FakeCollection(db.store, delay=0.3)
+        app = FastAPI()
+        app.include_router(hello.router)
+        app.include_router(firestore_parameters.router)
+        app.dependency_overrides[get_async_firestore_client] = lambda: db
+
+        async def run():
+            finished = []
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                async def get(url):
+                    response = await client.get(url)
+                    finished.append(url)
+                    return response
+
+                slow = asyncio.create_task(get("/parameters/page"))
+                await asyncio.sleep(0.05)
+                await get("/hello/test")
+                await slow
+            return finished
+
+        # /hello est servi pendant que la requête Firestore attend
+        assert asyncio.run(run()) == ["/hello/test", "/parameters/page"]
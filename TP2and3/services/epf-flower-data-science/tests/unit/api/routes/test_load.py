@@ -1,14 +1,17 @@
 import os
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 import pandas as pd
-from src.api import router  
+from src.api.routes import load
+from src.services import data
+from tests.conftest import IRIS_HEADER
 
 # Créez une instance de FastAPI avec le router
 from fastapi import FastAPI
 app = FastAPI()
-app.include_router(router)
+app.include_router(load.router)
 
 @pytest.fixture
 def client() -> TestClient:
@@ -19,21 +22,7 @@ def client() -> TestClient:
 
 class TestLoadIrisDataset:
     
-    @patch("os.path.exists")
-    @patch("pandas.read_csv")
-    def test_load_iris_dataset_success(self, mock_read_csv, mock_exists, client):
-        # Simuler que le fichier iris.csv existe
-        mock_exists.return_value = True
-        # Simuler que pandas.read_csv retourne un DataFrame correct
-        mock_df = pd.DataFrame({
-            'sepal_length': [5.1, 4.9],
-            'sepal_width': [3.5, 3.0],
-            'petal_length': [1.4, 1.4],
-            'petal_width': [0.2, 0.2],
-            'species': ['setosa', 'setosa']
-        })
-        mock_read_csv.return_value = mock_df
-
+    def test_load_iris_dataset_success(self, iris_path, client):
         # Appeler l'endpoint pour charger le dataset
         response = client.get("/load-iris-dataset")
 
@@ -42,8 +31,8 @@ class TestLoadIrisDataset:
 
         # Vérifier que les données retournées sont correctes
         assert "data" in response.json()
-        assert len(response.json()["data"]) == 2  # Nous avons deux lignes dans le DataFrame mocké
-        assert response.json()["data"][0]["sepal_length"] == 5.1
+        assert len(response.json()["data"]) == 5  # Nous avons cinq lignes dans le fichier
+        assert response.json()["data"][0]["SepalLengthCm"] == 5.1
 
     @patch("os.path.exists")
     def test_load_iris_dataset_not_found(self, mock_exists, client):
@@ -57,11 +46,8 @@ class TestLoadIrisDataset:
         assert response.status_code == 200
         assert response.json() == {"error": "Dataset not found. Please download the dataset first."}
 
-    @patch("os.path.exists")
     @patch("pandas.read_csv")
-    def test_load_iris_dataset_error(self, mock_read_csv, mock_exists, client):
-        # Simuler que le fichier iris.csv existe
-        mock_exists.return_value = True
+    def test_load_iris_dataset_error(self, mock_read_csv, iris_path, client):
         # Simuler que pandas.read_csv lève une exception
         mock_read_csv.side_effect = Exception("Error reading CSV file")
 
@@ -72,3 +58,122 @@ class TestLoadIrisDataset:
         assert response.status_code == 200
         assert "error" in response.json()
         assert response.json()["error"] == "Failed to load dataset: Error reading CSV file"
+
+
+class TestConditionalRequests:
+
+    def test_etag_and_not_modified(self, iris_path, client):
+        response = client.get("/load-iris-dataset")
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"].startswith("public")
+
+        revalidated = client.get("/load-iris-dataset", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["ETag"] == etag
+
+    def test_etag_changes_with_the_content(self, iris_path, client):
+        etag = client.get("/load-iris-dataset").headers["ETag"]
+        with open(iris_path, "a") as f:
+            f.write("6,4.7,3.2,1.3,0.2,Iris-setosa\n")
+
+        response = client.get("/load-iris-dataset", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+class TestDatasetCache:
+
+    def test_steady_state_requests_hit_the_cache(self, iris_path, client):
+        with patch("pandas.read_csv", wraps=pd.read_csv) as mock_read_csv:
+            for _ in range(3):
+                assert client.get("/load-iris-dataset").status_code == 200
+
+        # Le CSV n'est parsé qu'une seule fois
+        assert mock_read_csv.call_count == 1
+        stats = client.get("/load-iris-dataset/cache").json()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+
+    def test_cache_is_invalidated_when_file_changes(self, iris_path, client):
+        client.get("/load-iris-dataset")
+
+        # Ajouter une ligne au fichier
+        with open(iris_path, "a") as f:
+            f.write("6,4.7,3.2,1.3,0.2,Iris-setosa\n")
+
+        response = client.get("/load-iris-dataset")
+        assert len(response.json()["data"]) == 6
+        assert client.get("/load-iris-dataset/cache").json()["misses"] == 2
+
+    def test_touch_without_content_change_does_not_reparse(self, iris_path):
+        cache = data.get_dataset_cache(iris_path)
+        first = cache.get()
+
+        stat = os.stat(iris_path)
+        os.utime(iris_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        second = cache.get()
+        assert second.frame is first.frame
+        assert cache.stats()["revalidations"] == 1
+        assert cache.stats()["misses"] == 1
+
+
+class TestStreamAndPaginate:
+
+    @pytest.fixture
+    def iris_path(self, write_iris_csv) -> str:
+        """
+        Write a 25-row Iris CSV
+        """
+        return write_iris_csv(IRIS_HEADER + "".join(f"{i},{4 + i / 10},3.0,1.4,0.2,Iris-setosa\n" for i in range(1, 26)))
+
+    def test_stream_ndjson(self, iris_path, client):
+        response = client.get("/load-iris-dataset/stream?chunk_size=10")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == 25
+        assert records[24]["Id"] == 25
+
+    def test_stream_csv_with_projection(self, iris_path, client):
+        response = client.get("/load-iris-dataset/stream?format=csv&chunk_size=7&columns=Species&columns=Id")
+
+        lines = response.text.splitlines()
+        assert lines[0] == "Species,Id"
+        assert len(lines) == 26
+        assert lines[1] == "Iris-setosa,1"
+
+    def test_stream_unknown_column(self, iris_path, client):
+        response = client.get("/load-iris-dataset/stream?columns=Petals")
+
+        assert response.status_code == 422
+
+    def test_offset_pagination(self, iris_path, client):
+        response = client.get("/load-iris-dataset/page?offset=20&limit=10&columns=Id")
+
+        assert response.json()["data"] == [{"Id": i} for i in range(21, 26)]
+        assert response.json()["next_cursor"] is None
+
+    def test_cursor_pagination_walks_the_whole_file(self, iris_path, client):
+        ids, cursor = [], None
+        while True:
+            url = "/load-iris-dataset/page?limit=10&columns=Id"
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            ids += [row["Id"] for row in response.json()["data"]]
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                break
+
+        assert ids == list(range(1, 26))
+
+    def test_stale_cursor(self, iris_path, client):
+        cursor = client.get("/load-iris-dataset/page?limit=10").json()["next_cursor"]
+        with open(iris_path, "a") as f:
+            f.write("26,4.1,3.0,1.4,0.2,Iris-setosa\n")
+        stat = os.stat(iris_path)
+        os.utime(iris_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        response = client.get(f"/load-iris-dataset/page?limit=10&cursor={cursor}")
+
+        assert response.status_code == 409
@@ -0,0 +1,44 @@
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.routes import hello, metrics as metrics_route
+from src.services import metrics
+
+
+@pytest.fixture
+def client() -> TestClient:
+    # Application minimale avec le middleware de métriques
+    app = FastAPI()
+    app.include_router(hello.router)
+    app.include_router(metrics_route.router)
+    app.add_middleware(metrics.MetricsMiddleware)
+    return TestClient(app)
+
+
+class TestMetrics:
+
+    def test_requests_are_labelled_by_route_template(self, client):
+        before = metrics.REQUEST_LATENCY.count("GET", "/hello/{name}", "200")
+        client.get("/hello/alice")
+        client.get("/hello/bob")
+
+        assert metrics.REQUEST_LATENCY.count("GET", "/hello/{name}", "200") == before + 2
+        assert metrics.REQUESTS_IN_FLIGHT.value("GET", "/hello/{name}") == 0
+
+    def test_unknown_paths_share_one_label(self, client):
+        before = metrics.REQUEST_LATENCY.count("GET", "unmatched", "404")
+        client.get("/does-not-exist")
+        client.get("/neither")
+
+        assert metrics.REQUEST_LATENCY.count("GET", "unmatched", "404") == before + 2
+
+    def test_metrics_endpoint(self, client):
+        client.get("/hello/alice")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert f'http_request_duration_seconds_count{{method="GET",route="/hello/{{name}}",status="200",worker="{os.getpid()}"}}' in response.text
+        assert "# TYPE stage_duration_seconds histogram" in response.text
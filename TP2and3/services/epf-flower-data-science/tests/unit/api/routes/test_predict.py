@@ -1,13 +1,16 @@
 import os
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
-from src.api import router  
+from sklearn.naive_bayes import GaussianNB
+from src.api.routes import predict
+from src.services import compiled, models
 
 # Créez une instance de FastAPI avec le router
 from fastapi import FastAPI
 app = FastAPI()
-app.include_router(router)
+app.include_router(predict.router)
 
 @pytest.fixture
 def client() -> TestClient:
@@ -18,12 +21,12 @@ def client() -> TestClient:
 
 class TestPredict:
 
-    @patch("your_module.load_trained_model")  # Remplacez `your_module` par le bon nom de module
+    @patch("src.api.routes.predict.load_trained_model")
     @patch("joblib.load")
     def test_predict_success(self, mock_joblib_load, mock_load_trained_model, client):
         # Simuler que le modèle est correctement chargé
         mock_model = MagicMock()
-        mock_model.predict.return_value = [0]  # Simuler une prédiction
+        mock_model.predict.return_value = np.array([0])  # Simuler une prédiction
         mock_load_trained_model.return_value = mock_model
 
         # Définir les données d'entrée pour la prédiction
@@ -42,7 +45,7 @@ class TestPredict:
         assert "predictions" in response.json()
         assert response.json()["predictions"] == [0]  # La prédiction simulée
 
-    @patch("your_module.load_trained_model")  # Remplacez `your_module` par le bon nom de module
+    @patch("src.api.routes.predict.load_trained_model")
     def test_predict_model_not_found(self, mock_load_trained_model, client):
         # Simuler que le modèle n'existe pas
         mock_load_trained_model.side_effect = FileNotFoundError("Model file not found")
@@ -62,7 +65,7 @@ class TestPredict:
         assert response.status_code == 404
         assert response.json() == {"detail": "Model file not found"}
 
-    @patch("your_module.load_trained_model")  # Remplacez `your_module` par le bon nom de module
+    @patch("src.api.routes.predict.load_trained_model")
     @patch("joblib.load")
     def test_predict_error_during_prediction(self, mock_joblib_load, mock_load_trained_model, client):
         # Simuler que le modèle est correctement chargé
@@ -84,3 +87,171 @@ class TestPredict:
         # Vérifier que l'erreur 500 est renvoyée
         assert response.status_code == 500
         assert response.json() == {"detail": "Failed to make prediction: Error during prediction"}
+
+
+def fit_model(label: str) -> GaussianNB:
+    """
+    Train a tiny model that always predicts `label`
+    """
+    X = np.array([[5.1, 3.5, 1.4, 0.2], [4.9, 3.0, 1.4, 0.2]])
+    return GaussianNB().fit(X, [label, label])
+
+
+class TestModelRegistry:
+
+    @pytest.fixture
+    def registry(self, tmp_path, monkeypatch) -> models.ModelRegistry:
+        """
+        Process-wide registry backed by a temporary model directory
+        """
+        registry = models.ModelRegistry(model_dir=str(tmp_path))
+        monkeypatch.setattr(models, "_registry", registry)
+        return registry
+
+    def test_model_is_loaded_once(self, registry, client):
+        registry.publish("iris_model", fit_model("Iris-setosa"))
+        registry.evict("iris_model")
+        input_data = {"SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2}
+
+        with patch("joblib.load", wraps=models.joblib.load) as mock_joblib_load:
+            for _ in range(3):
+                response = client.post("/predict?model_name=iris_model", json=input_data)
+                assert response.json()["predictions"] == ["Iris-setosa"]
+
+        assert mock_joblib_load.call_count == 1
+        stats = client.get("/models/registry").json()["models"]["iris_model"]
+        assert stats["loads"] == 1
+        assert stats["hits"] == 2
+        assert stats["last_load_seconds"] > 0
+
+    def test_publish_hot_reloads_the_served_model(self, registry):
+        registry.publish("iris_model", fit_model("Iris-setosa"))
+        first = registry.get("iris_model")
+
+        registry.publish("iris_model", fit_model("Iris-virginica"))
+        second = registry.get("iris_model")
+
+        assert second is not first
+        assert second.predict([[5.1, 3.5, 1.4, 0.2]]).tolist() == ["Iris-virginica"]
+        assert not [f for f in os.listdir(registry.model_dir) if f.endswith(".tmp")]
+
+    def test_artifact_rewritten_by_another_process_is_reloaded(self, registry):
+        registry.publish("iris_model", fit_model("Iris-setosa"))
+        registry.get("iris_model")
+
+        # Un autre worker réécrit l'artefact
+        other = models.ModelRegistry(model_dir=registry.model_dir)
+        other.publish("iris_model", fit_model("Iris-versicolor"))
+        os.utime(registry.model_path("iris_model"), ns=(0, 1))
+
+        assert registry.get("iris_model").predict([[5.1, 3.5, 1.4, 0.2]]).tolist() == ["Iris-versicolor"]
+
+    def test_lru_eviction_by_count(self, tmp_path):
+        registry = models.ModelRegistry(model_dir=str(tmp_path), max_models=2)
+        for name in ("a", "b", "c"):
+            registry.publish(name, fit_model(name))
+
+        assert registry.stats()["cached_models"] == ["b", "c"]
+        assert registry.stats()["models"]["a"]["evictions"] == 1
+
+    def test_preload_keeps_the_most_recent_artifacts(self, tmp_path):
+        writer = models.ModelRegistry(model_dir=str(tmp_path))
+        for i, name in enumerate(("a", "b", "c")):
+            writer.publish(name, fit_model(name))
+            os.utime(writer.model_path(name), ns=(i, i))
+
+        registry = models.ModelRegistry(model_dir=str(tmp_path), max_models=2)
+
+        assert registry.preload() == ["b", "c"]
+        assert registry.stats()["models"]["c"]["loads"] == 1
+        assert models.ModelRegistry(model_dir=str(tmp_path / "missing")).preload() == []
+
+
+    def test_exported_tree_model_is_served_compiled(self, registry, client):
+        from sklearn.ensemble import RandomForestClassifier
+        X = np.array([[5.1, 3.5, 1.4, 0.2], [4.9, 3.0, 1.4, 0.2], [6.3, 2.9, 5.6, 1.8], [5.8, 2.7, 5.1, 1.9]])
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, ["Iris-setosa"] * 2 + ["Iris-virginica"] * 2)
+        registry.publish("forest", model)
+        compiled.export("forest", model, registry)
+        input_data = {"SepalLengthCm": 6.3, "SepalWidthCm": 2.9, "PetalLengthCm": 5.6, "PetalWidthCm": 1.8}
+
+        with patch.object(registry, "get", wraps=registry.get) as mock_get:
+            response = client.post("/predict?model_name=forest", json=input_data)
+            batch = client.post("/predict/batch?model_name=forest&return_probabilities=true", json={"rows": [input_data]})
+
+        # Le modèle compilé répond sans passer par le registre
+        mock_get.assert_not_called()
+        assert response.json()["predictions"] == ["Iris-virginica"]
+        assert batch.json()["classes"] == ["Iris-setosa", "Iris-virginica"]
+        assert batch.json()["probabilities"] == model.predict_proba(X[[2]]).tolist()
+
+
+class TestPredictBatch:
+
+    @pytest.fixture
+    def model(self):
+        """
+        Patch the model lookup with a real fitted model
+        """
+        X = np.array([[5.1, 3.5, 1.4, 0.2], [6.3, 2.9, 5.6, 1.8]])
+        model = GaussianNB().fit(X, ["Iris-setosa", "Iris-virginica"])
+        with patch("src.api.routes.predict.load_trained_model", return_value=model):
+            yield model
+
+    def test_predict_batch_rows(self, model, client):
+        rows = [
+            {"SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2},
+            {"SepalLengthCm": 6.3, "SepalWidthCm": 2.9, "PetalLengthCm": 5.6, "PetalWidthCm": 1.8},
+        ]
+
+        response = client.post("/predict/batch?model_name=iris_model", json={"rows": rows})
+
+        assert response.status_code == 200
+        assert response.json()["predictions"] == ["Iris-setosa", "Iris-virginica"]
+        assert response.json()["batch_size"] == 2
+        assert "total" in response.json()["timing_ms"]
+
+    def test_predict_batch_columns_with_probabilities(self, model, client):
+        columns = {
+            "SepalLengthCm": [5.1, 6.3],
+            "SepalWidthCm": [3.5, 2.9],
+            "PetalLengthCm": [1.4, 5.6],
+            "PetalWidthCm": [0.2, 1.8],
+        }
+
+        with patch.object(model, "predict", wraps=model.predict) as mock_predict:
+            response = client.post(
+                "/predict/batch?model_name=iris_model&return_probabilities=true", json={"columns": columns}
+            )
+
+        # Un seul appel vectorisé pour tout le batch
+        mock_predict.assert_called_once()
+        assert response.status_code == 200
+        assert response.json()["classes"] == ["Iris-setosa", "Iris-virginica"]
+        assert len(response.json()["probabilities"]) == 2
+
+    def test_predict_batch_too_large(self, model, client):
+        rows = [{"SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2}] * 3
+
+        response = client.post("/predict/batch?model_name=iris_model&max_batch_size=2", json={"rows": rows})
+
+        assert response.status_code == 413
+
+    @pytest.mark.parametrize("max_batch_size", [0, -1])
+    def test_predict_batch_invalid_max_batch_size(self, model, client, max_batch_size):
+        rows = [{"SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2}]
+
+        response = client.post(f"/predict/batch?model_name=iris_model&max_batch_size={max_batch_size}", json={"rows": rows})
+
+        assert response.status_code == 422
+
+    def test_predict_batch_invalid_rows(self, model, client):
+        rows = [
+            {"SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2},
+            {"SepalLengthCm": 6.3, "SepalWidthCm": 2.9, "PetalLengthCm": 5.6},
+        ]
+
+        response = client.post("/predict/batch?model_name=iris_model", json={"rows": rows})
+
+        assert response.status_code == 422
+        assert "rows [1]" in response.json()["detail"]
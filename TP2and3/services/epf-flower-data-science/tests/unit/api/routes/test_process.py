@@ -1,8 +1,9 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from fastapi.responses import JSONResponse
-from unittest.mock import patch
+import pandas as pd
 from main import app  # Assurez-vous que c'est là où FastAPI est initialisé (remplacez si nécessaire)
+from src.services import preprocessing
 
 # Client de test pour simuler les appels à l'API
 client = TestClient(app)
@@ -10,16 +11,22 @@ client = TestClient(app)
 # Données simulées pour le test
 MOCK_IRIS_DATA = {
     "data": [
-        {"SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2, "Species": "Iris-setosa"},
-        {"SepalLengthCm": 4.9, "SepalWidthCm": 3.0, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2, "Species": "Iris-setosa"},
+        {"Id": 1, "SepalLengthCm": 5.1, "SepalWidthCm": 3.5, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2, "Species": "Iris-setosa"},
+        {"Id": 2, "SepalLengthCm": 4.9, "SepalWidthCm": 3.0, "PetalLengthCm": 1.4, "PetalWidthCm": 0.2, "Species": "Iris-setosa"},
     ]
 }
 
+@pytest.fixture
+def iris_path(write_iris_csv, artifact_dirs):
+    """
+    Write the simulated data as the Iris CSV, with temporary artifact directories
+    """
+    return lambda frame: write_iris_csv(frame.to_csv(index=False))
+
 # Test pour le endpoint /process-data
-@patch("src.api.routes.load.load_iris_dataset")  # Mock de la fonction load_iris_dataset
-def test_process_data(mock_load_iris_dataset):
-    # Configurer le mock pour renvoyer les données simulées
-    mock_load_iris_dataset.return_value = JSONResponse(content=MOCK_IRIS_DATA)
+def test_process_data(iris_path):
+    # Configurer le dataset avec les données simulées
+    iris_path(pd.DataFrame(MOCK_IRIS_DATA["data"]))
     
     # Appeler le endpoint via le client de test
     response = client.get("/process-data")
@@ -44,3 +51,60 @@ def test_process_data(mock_load_iris_dataset):
     
     # Vérifier que la colonne 'Species' est intacte
     assert all(row["Species"] in ["Iris-setosa"] for row in processed_data)
+
+    # Vérifier que la colonne 'Id' a été retirée des caractéristiques
+    assert all("Id" not in row for row in processed_data)
+
+
+def test_repeated_process_data_reuses_the_fitted_scaler(iris_path):
+    iris_path(pd.DataFrame(MOCK_IRIS_DATA["data"]))
+
+    first = client.get("/process-data").json()
+    second = client.get("/process-data").json()
+
+    # Le scaler n'est ajusté qu'une seule fois par version du dataset
+    assert first == second
+    assert preprocessing.get_preprocessing_store().stats()["fits"] == 1
+    assert preprocessing.get_preprocessing_store().stats()["hits"] == 1
+
+
+def test_process_data_not_modified(iris_path):
+    iris_path(pd.DataFrame(MOCK_IRIS_DATA["data"]))
+    etag = client.get("/process-data").headers["ETag"]
+
+    response = client.get("/process-data", headers={"If-None-Match": f'W/{etag}, "other"'})
+
+    # 304 sans recalcul ni corps
+    assert response.status_code == 304
+    assert response.content == b""
+    assert preprocessing.get_preprocessing_store().stats()["hits"] == 0
+
+
+def test_process_data_missing_species(iris_path):
+    # Un dataset sans colonne 'Species' renvoie une erreur
+    iris_path(pd.DataFrame(MOCK_IRIS_DATA["data"]).drop(columns="Species"))
+
+    response = client.get("/process-data")
+
+    assert response.status_code == 200
+    assert response.json() == {"error": "Failed to process dataset: 'Species' column not found in the data."}
+
+
+def test_process_data_chunked(iris_path):
+    iris_path(pd.DataFrame(MOCK_IRIS_DATA["data"]))
+
+    response = client.get("/process-data/chunked?block_rows=1")
+
+    # Même résultat que /process-data, une ligne NDJSON par enregistrement
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == client.get("/process-data").json()["data"]
+
+
+def test_process_data_chunked_not_found(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.data.IRIS_PATH", str(tmp_path / "missing.csv"))
+
+    response = client.get("/process-data/chunked")
+
+    assert response.status_code == 404
@@ -0,0 +1,109 @@
+import time
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from src.api.routes import profiles
+from src.api.routes.firestore_parameters import get_admin_user
+from src.services import metrics
+from src.services.profiling import ProfiledRoute, ProfileStore, ProfilingMiddleware
+
+# Endpoint synchrone lent, exécuté dans le pool de threads comme /train-model
+slow_router = APIRouter(route_class=ProfiledRoute)
+
+
+def slow_fit():
+    deadline = time.perf_counter() + 0.03
+    while time.perf_counter() < deadline:
+        pass
+
+
+@slow_router.get("/slow")
+def slow() -> dict:
+    with metrics.timer("fit"):
+        slow_fit()
+    return {"status": "ok"}
+
+
+@slow_router.get("/slow-async")
+async def slow_async() -> dict:
+    slow_fit()
+    return {"status": "ok"}
+
+
+async def authorize(authorization):
+    return authorization == "Bearer admin-token"
+
+
+@pytest.fixture
+def store(tmp_path) -> ProfileStore:
+    return ProfileStore(str(tmp_path))
+
+
+@pytest.fixture
+def client(store) -> TestClient:
+    app = FastAPI()
+    app.include_router(slow_router)
+    app.include_router(profiles.router)
+    app.add_middleware(ProfilingMiddleware, authorize=authorize, store=store, sample_interval=0.001)
+    app.dependency_overrides[get_admin_user] = lambda: {"uid": "admin", "role": "admin"}
+    app.dependency_overrides[profiles.get_profile_store] = lambda: store
+    return TestClient(app)
+
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+
+class TestProfiling:
+
+    def test_requests_are_not_profiled_by_default(self, client, store):
+        response = client.get("/slow")
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        assert store.list() == []
+
+    def test_profiling_requires_an_admin(self, client):
+        response = client.get("/slow", headers={"X-Profile": "cprofile", "Authorization": "Bearer user-token"})
+        assert response.status_code == 403
+
+    def test_unknown_profiler(self, client):
+        response = client.get("/slow?profile=perf", headers=ADMIN)
+        assert response.status_code == 400
+
+    def test_cprofile_covers_the_threaded_endpoint(self, client):
+        response = client.get("/slow", headers={**ADMIN, "X-Profile": "cprofile"})
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("fit;dur=")
+
+        summary = client.get(f"/profiles/{response.headers['x-profile-id']}").json()
+        assert summary["path"] == "/slow"
+        assert summary["stage_totals_ms"]["fit"] >= 30
+        assert any(row["function"].startswith("slow_fit ") for row in summary["top"])
+
+        download = client.get(f"/profiles/{summary['id']}?download=true")
+        assert download.status_code == 200
+        assert download.headers["content-disposition"].endswith(f'{summary["id"]}.pstats"')
+
+    def test_sampling_profiler_returns_collapsed_stacks(self, client):
+        response = client.get("/slow?profile=sample", headers=ADMIN)
+        profile_id = response.headers["x-profile-id"]
+
+        collapsed = client.get(f"/profiles/{profile_id}?download=true").text
+        assert "slow_fit (test_profiles.py" in collapsed
+        assert [summary["id"] for summary in client.get("/profiles").json()] == [profile_id]
+
+    def test_async_endpoint_cprofile_is_degraded(self, client):
+        response = client.get("/slow-async", headers={**ADMIN, "X-Profile": "cprofile"})
+        assert response.status_code == 200
+
+        summary = client.get(f"/profiles/{response.headers['x-profile-id']}").json()
+        assert "file" not in summary
+        assert "sample profiler" in summary["notes"][0]
+
+    def test_async_endpoint_is_sampled(self, client):
+        response = client.get("/slow-async?profile=sample", headers=ADMIN)
+        collapsed = client.get(f"/profiles/{response.headers['x-profile-id']}?download=true").text
+        assert "slow_fit (test_profiles.py" in collapsed
+
+    def test_unknown_profile(self, client):
+        assert client.get("/profiles/../../etc/passwd").status_code == 404
+        assert client.get("/profiles/" + "0" * 32).status_code == 404
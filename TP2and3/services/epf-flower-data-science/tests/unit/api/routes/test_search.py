@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sklearn.datasets import make_classification
+from src.api.routes import search as search_route
+from src.services import search
+from src.services.pipeline import SplitDataset
+
+# Créez une instance de FastAPI avec le router
+app = FastAPI()
+app.include_router(search_route.router)
+
+X, y = make_classification(n_samples=200, n_features=4, n_informative=3, n_redundant=0, random_state=0)
+MOCK_SPLIT_DATA = SplitDataset(X[:160], X[160:], y[:160], y[160:], ["f1", "f2", "f3", "f4"], key="dataset-v1")
+
+@pytest.fixture
+def client():
+    """
+    Test client with the pipeline and the model parameters mocked
+    """
+    with patch("src.services.pipeline.split", return_value=MOCK_SPLIT_DATA), \
+            patch("src.api.routes.search.load_model_parameters", return_value={"DecisionTreeClassifier": {"random_state": 0}}):
+        yield TestClient(app)
+
+class TestSearchHyperparameters:
+
+    def test_grid_search(self, client):
+        response = client.post("/search-hyperparameters", json={
+            "model_name": "DecisionTreeClassifier",
+            "param_grid": {"max_depth": [1, 3, 5], "criterion": ["gini", "entropy"]},
+            "cv": 3,
+            "n_jobs": 1,
+        })
+
+        assert response.status_code == 200
+        result = response.json()
+        assert len(result["results"]) == 6
+        assert result["best_params"]["random_state"] == 0  # Paramètres de base fusionnés
+        scores = [r["mean_score"] for r in result["results"]]
+        assert scores == sorted(scores, reverse=True)
+        assert result["best_score"] == scores[0]
+
+    def test_repeated_search_is_memoized(self, client):
+        request = {
+            "model_name": "DecisionTreeClassifier",
+            "param_grid": {"max_depth": [2, 4]},
+            "cv": 4,
+            "n_jobs": 1,
+        }
+        first = client.post("/search-hyperparameters", json=request).json()
+
+        # Un candidat de plus : seuls ses plis sont évalués
+        request["param_grid"]["max_depth"].append(6)
+        with patch("src.services.search._fit_and_score", wraps=search._fit_and_score) as mock_fit:
+            second = client.post("/search-hyperparameters", json=request).json()
+
+        assert first["memo_hits"] == 0
+        assert second["memo_hits"] == 8
+        assert mock_fit.call_count == 4
+
+    def test_successive_halving(self, client):
+        response = client.post("/search-hyperparameters", json={
+            "model_name": "DecisionTreeClassifier",
+            "param_distributions": {"max_depth": {"low": 1, "high": 8, "type": "int"}, "min_samples_leaf": [1, 5, 10]},
+            "n_iter": 9,
+            "cv": 3,
+            "halving": True,
+            "min_resources": 12,
+            "n_jobs": 1,
+            "random_state": 1,
+        })
+
+        result = response.json()
+        assert [r["n_candidates"] for r in result["rounds"]][:2] == [len(result["results"]), 3]
+        assert result["rounds"][1]["resources"] == 36
+        assert result["results"][0]["resources"] == max(r["resources"] for r in result["results"])
+
+    def test_deadline_stops_the_search(self, client):
+        response = client.post("/search-hyperparameters", json={
+            "model_name": "DecisionTreeClassifier",
+            "param_grid": {"max_depth": list(range(1, 30))},
+            "max_seconds": 1e-9,
+            "n_jobs": 1,
+        })
+
+        assert response.json()["stopped_early"] is True
+
+    def test_unknown_model(self, client):
+        response = client.post("/search-hyperparameters", json={"model_name": "XGBoost", "param_grid": {"a": [1]}})
+
+        assert response.status_code == 404
+
+    def test_invalid_space(self, client):
+        response = client.post("/search-hyperparameters", json={
+            "model_name": "DecisionTreeClassifier",
+            "param_distributions": {"max_depth": {"high": 3}},
+        })
+
+        assert response.status_code == 422
+
+
+    @pytest.mark.parametrize("n_jobs", [0, -2, search.MAX_JOBS + 1])
+    def test_n_jobs_is_bounded(self, client, n_jobs):
+        response = client.post("/search-hyperparameters", json={
+            "model_name": "DecisionTreeClassifier",
+            "param_grid": {"max_depth": [1, 2]},
+            "n_jobs": n_jobs,
+        })
+
+        assert response.status_code == 422
+
+    def test_missing_dataset(self, client):
+        with patch("src.services.pipeline.split", side_effect=FileNotFoundError("iris.csv not found")):
+            response = client.post("/search-hyperparameters", json={
+                "model_name": "DecisionTreeClassifier",
+                "param_grid": {"max_depth": [1, 2]},
+            })
+
+        assert response.status_code == 404
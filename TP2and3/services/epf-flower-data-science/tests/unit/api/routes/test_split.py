@@ -1,28 +1,26 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+import pandas as pd
 from main import app  # Assurez-vous que c'est là où FastAPI est initialisé
 
 # Client de test pour simuler les appels à l'API
 client = TestClient(app)
 
 # Données simulées pour le test
-MOCK_PROCESSED_DATA = {
+MOCK_IRIS_DATA = {
     "data": [
-        {"feature1": 5.1, "feature2": 3.5, "feature3": 1.4, "feature4": 0.2, "Species": "Iris-setosa"},
-        {"feature1": 4.9, "feature2": 3.0, "feature3": 1.4, "feature4": 0.2, "Species": "Iris-setosa"},
-        {"feature1": 6.7, "feature2": 3.1, "feature3": 4.4, "feature4": 1.4, "Species": "Iris-versicolor"},
-        {"feature1": 6.3, "feature2": 2.9, "feature3": 5.6, "feature4": 1.8, "Species": "Iris-virginica"},
-        {"feature1": 5.8, "feature2": 2.7, "feature3": 5.1, "feature4": 1.9, "Species": "Iris-virginica"},
+        {"Id": 1, "feature1": 5.1, "feature2": 3.5, "feature3": 1.4, "feature4": 0.2, "Species": "Iris-setosa"},
+        {"Id": 2, "feature1": 4.9, "feature2": 3.0, "feature3": 1.4, "feature4": 0.2, "Species": "Iris-setosa"},
+        {"Id": 3, "feature1": 6.7, "feature2": 3.1, "feature3": 4.4, "feature4": 1.4, "Species": "Iris-versicolor"},
+        {"Id": 4, "feature1": 6.3, "feature2": 2.9, "feature3": 5.6, "feature4": 1.8, "Species": "Iris-virginica"},
+        {"Id": 5, "feature1": 5.8, "feature2": 2.7, "feature3": 5.1, "feature4": 1.9, "Species": "Iris-virginica"},
     ]
 }
 
 # Test pour le endpoint /split-data
-@patch("src.api.routes.process.process_data")  # Mock de la fonction process_data
-def test_split_data(mock_process_data):
-    # Configurer le mock pour renvoyer les données simulées
-    from fastapi.responses import JSONResponse
-    mock_process_data.return_value = JSONResponse(content=MOCK_PROCESSED_DATA)
+def test_split_data(write_iris_csv, artifact_dirs):
+    # Configurer le dataset avec les données simulées
+    write_iris_csv(pd.DataFrame(MOCK_IRIS_DATA["data"]).to_csv(index=False))
 
     # Appeler le endpoint via le client de test
     response = client.get("/split-data")
@@ -45,7 +43,7 @@ def test_split_data(mock_process_data):
     assert len(test_data["y_test"]) > 0
 
     # Vérifier que les tailles des ensembles respectent la division 80/20
-    total_samples = len(MOCK_PROCESSED_DATA["data"])
+    total_samples = len(MOCK_IRIS_DATA["data"])
     expected_train_size = int(total_samples * 0.8)
     expected_test_size = total_samples - expected_train_size
 
@@ -55,3 +53,19 @@ def test_split_data(mock_process_data):
     # Vérifier que les cibles correspondent à leurs caractéristiques
     assert len(train_data["X_train"]) == len(train_data["y_train"])
     assert len(test_data["X_test"]) == len(test_data["y_test"])
+
+    # Vérifier que chaque ligne contient les quatre caractéristiques
+    assert all(len(row) == 4 for row in train_data["X_train"] + test_data["X_test"])
+
+
+def test_split_data_not_modified(write_iris_csv, artifact_dirs):
+    iris_path = write_iris_csv(pd.DataFrame(MOCK_IRIS_DATA["data"]).to_csv(index=False))
+
+    etag = client.get("/split-data").headers["ETag"]
+    assert client.get("/split-data", headers={"If-None-Match": etag}).status_code == 304
+
+    # Un autre dataset donne un autre ETag
+    pd.DataFrame(MOCK_IRIS_DATA["data"][:4]).to_csv(iris_path, index=False)
+    response = client.get("/split-data", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,118 @@
+import threading
+import time
+import pytest
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.routes import train_jobs
+from src.services import jobs
+from src.services.training import TrainingResult
+
+# Créez une instance de FastAPI avec le router
+app = FastAPI()
+app.include_router(train_jobs.router)
+
+MOCK_MODEL_PARAMS = {
+    "GaussianNB": {"var_smoothing": 1e-9},
+    "DecisionTreeClassifier": {"max_depth": 3},
+}
+
+@pytest.fixture
+def client() -> TestClient:
+    """
+    Test client for integration tests
+    """
+    return TestClient(app)
+
+@pytest.fixture
+def release(monkeypatch):
+    """
+    Run the jobs in one thread, blocked until the returned event is set
+    """
+    event = threading.Event()
+
+    def fake_train(model_name, params):
+        event.wait(5)
+        return TrainingResult(model_name, f"/models/{model_name}.joblib", 0.01, 0.9, 1024)
+
+    manager = jobs.JobManager(
+        max_workers=1,
+        executor_factory=lambda n, initializer, initargs: ThreadPoolExecutor(n, initializer=initializer, initargs=initargs),
+    )
+    monkeypatch.setattr(jobs, "_manager", manager)
+    with patch("src.services.training.train", side_effect=fake_train), \
+            patch("src.api.routes.train_jobs.load_model_parameters", return_value=MOCK_MODEL_PARAMS):
+        yield event
+        event.set()
+        manager.shutdown()
+
+def wait_for(client, job_id, state):
+    for _ in range(100):
+        job = client.get(f"/train-jobs/{job_id}").json()
+        if job["state"] == state:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {state}: {job}")
+
+class TestTrainJobs:
+
+    def test_job_runs_and_reports_its_artifact(self, release, client):
+        response = client.post("/train-jobs", json={"model_name": "GaussianNB"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        wait_for(client, job_id, "running")
+        release.set()
+        job = wait_for(client, job_id, "succeeded")
+
+        assert job["model_path"] == "/models/GaussianNB.joblib"
+        assert job["test_accuracy"] == 0.9
+        assert job["run_seconds"] >= 0
+        assert job["parameters"] == MOCK_MODEL_PARAMS["GaussianNB"]
+
+    def test_identical_jobs_are_deduplicated(self, release, client):
+        first = client.post("/train-jobs", json={"model_name": "GaussianNB"}).json()["job_id"]
+        second = client.post("/train-jobs", json={"model_name": "DecisionTreeClassifier"}).json()["job_id"]
+        third = client.post("/train-jobs", json={"model_name": "DecisionTreeClassifier"}).json()["job_id"]
+
+        assert second != first
+        assert third == second
+        assert len(client.get("/train-jobs").json()["jobs"]) == 2
+
+    def test_pending_job_can_be_cancelled(self, release, client):
+        running = client.post("/train-jobs", json={"model_name": "GaussianNB"}).json()["job_id"]
+        pending = client.post("/train-jobs", json={"model_name": "DecisionTreeClassifier"}).json()["job_id"]
+        wait_for(client, running, "running")
+
+        assert client.delete(f"/train-jobs/{running}").status_code == 409
+        response = client.delete(f"/train-jobs/{pending}")
+
+        assert response.status_code == 200
+        assert response.json()["state"] == "cancelled"
+
+    def test_job_is_pending_until_its_worker_starts_it(self, monkeypatch, client):
+        class IdleExecutor(Executor):
+            # Accepte les jobs sans jamais les démarrer, comme la file d'appels d'un pool de processus
+            def submit(self, fn, *args, **kwargs):
+                return Future()
+
+        manager = jobs.JobManager(max_workers=1, executor_factory=lambda n, initializer, initargs: IdleExecutor())
+        monkeypatch.setattr(jobs, "_manager", manager)
+        with patch("src.api.routes.train_jobs.load_model_parameters", return_value=MOCK_MODEL_PARAMS):
+            job_id = client.post("/train-jobs", json={"model_name": "GaussianNB"}).json()["job_id"]
+
+        assert client.get(f"/train-jobs/{job_id}").json()["state"] == "pending"
+        manager._started.put((job_id, 123.0))
+        job = client.get(f"/train-jobs/{job_id}").json()
+        assert job["state"] == "running"
+        assert job["started_at"] == 123.0
+        assert client.delete(f"/train-jobs/{job_id}").status_code == 409
+
+    def test_unknown_model(self, release, client):
+        response = client.post("/train-jobs", json={"model_name": "SVC"})
+
+        assert response.status_code == 404
+
+    def test_unknown_job(self, release, client):
+        assert client.get("/train-jobs/nope").status_code == 404
@@ -1,29 +1,25 @@
 import os
+import numpy as np
 import pytest
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 from main import app  # Assurez-vous que c'est là où FastAPI est initialisé
+from src.services.pipeline import SplitDataset
+from src.services.training import MAX_WORKERS, train_all
+from tests.conftest import NEW_ROWS
 import joblib
 
 # Client de test pour simuler les appels à l'API
 client = TestClient(app)
 
 # Données simulées pour le test
-MOCK_SPLIT_DATA = {
-    "train_data": {
-        "X_train": [
-            {"feature1": 1.0, "feature2": 2.0},
-            {"feature1": 1.5, "feature2": 1.8},
-        ],
-        "y_train": [0, 1],
-    },
-    "test_data": {
-        "X_test": [
-            {"feature1": 1.1, "feature2": 2.1},
-        ],
-        "y_test": [0],
-    },
-}
+MOCK_SPLIT_DATA = SplitDataset(
+    X_train=np.array([[1.0, 2.0], [1.5, 1.8]]),
+    X_test=np.array([[1.1, 2.1]]),
+    y_train=np.array([0, 1]),
+    y_test=np.array([0]),
+    feature_names=["feature1", "feature2"],
+)
 
 MOCK_MODEL_PARAMS = {
     "RandomForestClassifier": {"n_estimators": 10, "max_depth": 3},
@@ -31,36 +27,141 @@ MOCK_MODEL_PARAMS = {
 }
 
 # Test pour le endpoint /train-model
-@patch("src.api.routes.split.split_data")  # Mock de la fonction split_data
-@patch("src.api.routes.train.load_model_parameters")  # Mock de la fonction load_model_parameters
-def test_train_model(mock_load_model_parameters, mock_split_data, tmpdir):
+@patch("src.services.pipeline.split")  # Mock des étapes load -> clean -> scale -> split
+@patch("src.api.routes.train_model.load_model_parameters")  # Mock de la fonction load_model_parameters
+def test_train_model(mock_load_model_parameters, mock_split, tmp_path, monkeypatch):
     # Configurer le mock pour les données de split
-    mock_split_data.return_value = MOCK_SPLIT_DATA
+    mock_split.return_value = MOCK_SPLIT_DATA
 
     # Configurer le mock pour les paramètres du modèle
     mock_load_model_parameters.return_value = MOCK_MODEL_PARAMS
 
-    # Créer un chemin temporaire pour sauvegarder les modèles
-    model_dir = tmpdir.mkdir("models")
-    with patch("os.makedirs") as mock_makedirs, patch("os.path.join", side_effect=lambda *args: os.path.join(model_dir, *args)):
+    # Sauvegarder les modèles dans un répertoire temporaire
+    monkeypatch.chdir(tmp_path)
+
+    # Appeler le endpoint avec un modèle spécifique
+    response = client.get("/train-model?model_name=RandomForestClassifier")
+    assert response.status_code == 200
+
+    # Vérifier la réponse JSON
+    response_data = response.json()
+    assert "message" in response_data
+    assert "model_path" in response_data
+
+    # Vérifier que le modèle est sauvegardé
+    model_save_path = response_data["model_path"]
+    assert os.path.exists(model_save_path)
+
+    # Charger le modèle sauvegardé pour validation
+    saved_model = joblib.load(model_save_path)
+    assert saved_model is not None
+    assert saved_model.__class__.__name__ == "RandomForestClassifier"
+
+
+@patch("src.api.routes.train_model.load_model_parameters")
+def test_train_model_unknown_parameters(mock_load_model_parameters):
+    mock_load_model_parameters.return_value = MOCK_MODEL_PARAMS
+
+    response = client.get("/train-model?model_name=GaussianNB")
+
+    assert response.status_code == 200
+    assert response.json() == {"error": "Model 'GaussianNB' parameters not found."}
+
+
+# Test pour le endpoint /train-models
+@patch("src.services.pipeline.split")
+@patch("src.services.training.load_model_parameters")
+def test_train_all_models(mock_load_model_parameters, mock_split, tmp_path, monkeypatch):
+    mock_split.return_value = MOCK_SPLIT_DATA
+    mock_load_model_parameters.return_value = {**MOCK_MODEL_PARAMS, "KNeighborsClassifier": {"n_neighbors": 50}}
+    monkeypatch.chdir(tmp_path)
+
+    # Exécuter les entraînements dans des threads pour le test
+    from concurrent.futures import ThreadPoolExecutor
+    with patch("src.services.training._process_pool", side_effect=lambda n: ThreadPoolExecutor(n)):
+        response = client.get("/train-models")
+
+    assert response.status_code == 200
+    results = response.json()["models"]
+    assert set(results) == {"RandomForestClassifier", "SVC", "KNeighborsClassifier"}
+    for name in ("RandomForestClassifier", "SVC"):
+        assert results[name]["artifact_bytes"] > 0
+        assert results[name]["fit_seconds"] >= 0
+        assert os.path.exists(results[name]["model_path"])
+    # Le modèle qui échoue est signalé sans faire échouer les autres
+    assert "error" in results["KNeighborsClassifier"]
+    assert response.json()["best_model"] in ("RandomForestClassifier", "SVC")
+
+
+@patch("src.services.pipeline.split")
+@patch("src.services.training.load_model_parameters")
+def test_train_all_models_deduplicates_and_caps_workers(mock_load_model_parameters, mock_split, tmp_path, monkeypatch):
+    mock_split.return_value = MOCK_SPLIT_DATA
+    mock_load_model_parameters.return_value = MOCK_MODEL_PARAMS
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("src.services.training.MAX_WORKERS", 2)
+    submitted, sizes = [], []
+
+    from concurrent.futures import ThreadPoolExecutor
 
-        # Configurer le mock pour éviter la création de répertoires
-        mock_makedirs.return_value = None
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, name, *args):
+            submitted.append(name)
+            return super().submit(fn, name, *args)
+
+    results = train_all(
+        ["SVC", "RandomForestClassifier", "SVC"],
+        max_workers=8,
+        executor_factory=lambda n: sizes.append(n) or RecordingExecutor(n),
+    )
+
+    # Chaque modèle n'est entraîné qu'une fois, dans l'ordre demandé, avec au plus MAX_WORKERS processus
+    assert submitted == ["SVC", "RandomForestClassifier"]
+    assert list(results) == ["SVC", "RandomForestClassifier"]
+    assert sizes == [2]
+
+
+def test_train_all_models_too_many_workers():
+    response = client.get(f"/train-models?max_workers={MAX_WORKERS + 1}")
+
+    assert response.status_code == 422
+
+
+@patch("src.services.training.load_model_parameters")
+def test_train_all_models_unknown_model(mock_load_model_parameters):
+    mock_load_model_parameters.return_value = MOCK_MODEL_PARAMS
+
+    response = client.get("/train-models?model_names=GaussianNB")
+
+    assert response.status_code == 404
+
+
+class TestOnlineTraining:
+    def test_train_then_update(self, online_trainer):
+        response = client.get("/train-model/online?model_name=SGDClassifier&batch_rows=32")
+        assert response.status_code == 200
+        assert response.json()["n_samples_seen"] == 60
+
+        response = client.post("/train-model/online/SGDClassifier/rows", json={"rows": NEW_ROWS})
 
-        # Appeler le endpoint avec un modèle spécifique
-        response = client.get("/train-model?model_name=RandomForestClassifier")
         assert response.status_code == 200
+        assert response.json()["rows"] == 2
+        assert client.get("/train-model/online/SGDClassifier").json()["n_samples_seen"] == 62
+        assert client.post("/predict?model_name=SGDClassifier.online", json=NEW_ROWS[0]).status_code == 200
+
+    def test_update_untrained_model(self, online_trainer):
+        response = client.post("/train-model/online/GaussianNB/rows", json={"rows": NEW_ROWS})
+
+        assert response.status_code == 404
+
+    def test_update_missing_label(self, online_trainer):
+        rows = [{k: v for k, v in NEW_ROWS[0].items() if k != "Species"}]
+
+        response = client.post("/train-model/online/GaussianNB/rows", json={"rows": rows})
 
-        # Vérifier la réponse JSON
-        response_data = response.json()
-        assert "message" in response_data
-        assert "model_path" in response_data
+        assert response.status_code == 422
 
-        # Vérifier que le modèle est sauvegardé
-        model_save_path = response_data["model_path"]
-        assert os.path.exists(model_save_path)
+    def test_train_unsupported_model(self, online_trainer):
+        response = client.get("/train-model/online?model_name=SVC")
 
-        # Charger le modèle sauvegardé pour validation
-        saved_model = joblib.load(model_save_path)
-        assert saved_model is not None
-        assert saved_model.__class__.__name__ == "RandomForestClassifier"
+        assert response.status_code == 422
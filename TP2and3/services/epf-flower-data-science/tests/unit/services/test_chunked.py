@@ -0,0 +1,102 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from sklearn.preprocessing import StandardScaler
+from src.services import chunked, pipeline, snapshot
+from tests.conftest import IRIS_CSV
+
+APPENDED_ROWS = (
+    "6,5.0,3.6,1.4,0.2,Iris-setosa\n"
+    "7,7.7,2.6,6.9,2.3,Iris-virginica\n"
+    "8,5.5,2.3,4.0,1.3,Iris-versicolor\n"
+)
+
+class TestChunkedPreprocessor:
+
+    @pytest.mark.parametrize("source", chunked.SOURCES)
+    def test_matches_the_in_memory_scale_stage(self, iris_path, source):
+        expected = pipeline.process(iris_path)
+
+        artifact = chunked.get_chunked_preprocessor().get(iris_path, source, block_rows=2)
+
+        assert isinstance(artifact.X_scaled, np.memmap)
+        np.testing.assert_allclose(artifact.X_scaled, expected.X)
+        np.testing.assert_allclose(artifact.scaler.var_, expected.scaler.var_)
+        assert artifact.categories[artifact.labels].tolist() == expected.y.tolist()
+
+    def test_unchanged_dataset_is_not_read_again(self, iris_path):
+        preprocessor = chunked.get_chunked_preprocessor()
+        preprocessor.get(iris_path, block_rows=2)
+
+        with patch("src.services.chunked.iter_csv_blocks") as mock_blocks:
+            preprocessor.get(iris_path, block_rows=2)
+
+        mock_blocks.assert_not_called()
+        assert preprocessor.stats() == {"hits": 1, "fits": 1, "updates": 0}
+
+    def test_appended_rows_only_update_the_statistics(self, iris_path):
+        preprocessor = chunked.get_chunked_preprocessor()
+        preprocessor.get(iris_path, block_rows=2)
+        with open(iris_path, "a") as f:
+            f.write(APPENDED_ROWS)
+
+        with patch("src.services.chunked.StandardScaler.partial_fit", autospec=True, side_effect=StandardScaler.partial_fit) as mock_fit:
+            artifact = preprocessor.get(iris_path, block_rows=2)
+
+        # Seules les 3 nouvelles lignes sont ajoutées aux statistiques
+        assert sum(len(call.args[1]) for call in mock_fit.call_args_list) == 3
+        assert preprocessor.stats()["updates"] == 1
+        full = StandardScaler().fit(pipeline.load_features(iris_path).X)
+        np.testing.assert_allclose(artifact.scaler.mean_, full.mean_)
+        np.testing.assert_allclose(artifact.scaler.var_, full.var_)
+        np.testing.assert_allclose(artifact.X_scaled, full.transform(pipeline.load_features(iris_path).X))
+
+    def test_rewritten_dataset_is_refitted(self, iris_path):
+        preprocessor = chunked.get_chunked_preprocessor()
+        preprocessor.get(iris_path, block_rows=2)
+        with open(iris_path, "w") as f:
+            f.write(IRIS_CSV.replace("5.1,3.5", "9.9,3.5"))
+
+        artifact = preprocessor.get(iris_path, block_rows=2)
+
+        assert preprocessor.stats()["fits"] == 2
+        assert artifact.meta["n_rows"] == 5
+        np.testing.assert_allclose(artifact.X_scaled, pipeline.process(iris_path).X)
+
+    def test_cached_artifact_is_not_loaded_again(self, iris_path):
+        preprocessor = chunked.get_chunked_preprocessor()
+        first = preprocessor.get(iris_path, block_rows=2)
+
+        with patch("src.services.chunked.joblib.load") as mock_load:
+            second = preprocessor.get(iris_path, block_rows=2)
+
+        mock_load.assert_not_called()
+        assert second is first
+
+    def test_snapshot_source_builds_the_snapshot_block_by_block(self, iris_path):
+        with patch("pandas.read_csv", wraps=pd.read_csv) as mock_read_csv:
+            chunked.get_chunked_preprocessor().get(iris_path, "snapshot", block_rows=2)
+
+        # Le CSV n'est jamais lu en entier : seulement l'en-tête ou des blocs
+        assert mock_read_csv.call_count > 0
+        assert all(call.kwargs.get("nrows") == 0 or call.kwargs.get("chunksize") == 2 for call in mock_read_csv.call_args_list)
+        assert snapshot.get_snapshot(iris_path).meta["n_rows"] == 5
+
+
+def test_concurrent_writes_of_the_same_artifact(tmp_path):
+    X, y = np.arange(20.0).reshape(5, 4), np.array(list("aabbc"))
+    scaler = StandardScaler().fit(X)
+
+    def blocks():
+        yield X[:2], y[:2]
+        # Un autre worker écrit le même artefact pendant ce temps
+        chunked.write_scaled([(X, y)], scaler, 5, ["a", "b", "c"], str(tmp_path), "tag")
+        yield X[2:], y[2:]
+
+    files = chunked.write_scaled(blocks(), scaler, 5, ["a", "b", "c"], str(tmp_path), "tag")
+
+    np.testing.assert_allclose(np.load(tmp_path / files["X_scaled"]), scaler.transform(X))
+    assert np.load(tmp_path / files["labels"]).tolist() == [0, 0, 1, 1, 2]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from src.services import compiled, models
+
+SPECIES = np.array(["Iris-setosa", "Iris-versicolor", "Iris-virginica"])
+MEANS = np.array([[5.0, 3.4, 1.5, 0.2], [5.9, 2.8, 4.3, 1.3], [6.6, 3.0, 5.6, 2.0]])
+STDS = np.array([[0.35, 0.38, 0.17, 0.1], [0.52, 0.31, 0.47, 0.2], [0.64, 0.32, 0.55, 0.27]])
+
+
+def iris_like(rows: int, seed: int):
+    """
+    Synthetic Iris-shaped features, rounded like the real ones, and their species
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(3, size=rows)
+    return np.round(rng.normal(MEANS[labels], STDS[labels]), 1), SPECIES[labels]
+
+
+def serving(model):
+    X, y = iris_like(600, seed=0)
+    scaler = StandardScaler().fit(X)
+    model.fit(scaler.transform(X), y)
+    return Pipeline([("scaler", scaler), ("model", model)])
+
+class TestCompiledTrees:
+
+    @pytest.mark.parametrize("model", [
+        DecisionTreeClassifier(random_state=0),
+        RandomForestClassifier(n_estimators=50, max_depth=5, random_state=0),
+        ExtraTreesClassifier(n_estimators=20, random_state=0),
+    ])
+    def test_parity_with_sklearn(self, model):
+        pipeline = serving(model)
+        engine = compiled.compile_model(pipeline)
+        X, y = iris_like(5000, seed=1)
+
+        np.testing.assert_allclose(engine.predict_proba(X), pipeline.predict_proba(X), atol=1e-12)
+        np.testing.assert_array_equal(engine.predict(X), pipeline.predict(X))
+        assert np.mean(engine.predict(X) == y) == pytest.approx(pipeline.score(X, y))
+
+    def test_model_without_scaler(self):
+        X, y = iris_like(300, seed=2)
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+
+        np.testing.assert_array_equal(compiled.compile_model(model).predict(X), model.predict(X))
+
+    def test_other_models_are_not_compiled(self):
+        assert compiled.compile_model(serving(LogisticRegression())) is None
+
+    def test_large_batches_are_left_to_sklearn(self, monkeypatch):
+        engine = compiled.compile_model(serving(RandomForestClassifier(n_estimators=10, random_state=0)))
+        monkeypatch.setattr(compiled, "MAX_WALKERS", 1000)
+
+        assert engine.suits(100)
+        assert not engine.suits(101)
+
+
+class TestCompiledExport:
+
+    @pytest.fixture
+    def registry(self, tmp_path) -> models.ModelRegistry:
+        return models.ModelRegistry(model_dir=str(tmp_path))
+
+    def test_export_is_served_until_the_artifact_changes(self, registry):
+        model = serving(RandomForestClassifier(n_estimators=10, random_state=0))
+        registry.publish("forest", model)
+        compiled.export("forest", model, registry)
+
+        engine = compiled.get_compiled("forest", registry)
+        assert isinstance(engine, compiled.CompiledTrees)
+        assert compiled.get_compiled("forest", registry) is engine
+
+        # L'artefact est remplacé sans nouvel export (ex. par un autre chemin de publication)
+        registry.publish("forest", serving(DecisionTreeClassifier(random_state=0)))
+        os.utime(registry.model_path("forest"), ns=(0, 1))
+        assert compiled.get_compiled("forest", registry) is None
+
+    def test_export_of_a_non_tree_model_removes_the_previous_one(self, registry):
+        forest = serving(RandomForestClassifier(n_estimators=5, random_state=0))
+        registry.publish("iris_model", forest)
+        compiled.export("iris_model", forest, registry)
+
+        linear = serving(LogisticRegression())
+        registry.publish("iris_model", linear)
+
+        assert compiled.export("iris_model", linear, registry) is None
+        assert not os.path.exists(compiled.compiled_path(registry, "iris_model"))
+        assert compiled.get_compiled("iris_model", registry) is None
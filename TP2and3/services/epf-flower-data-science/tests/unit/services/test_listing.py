@@ -0,0 +1,32 @@
+import pytest
+from datetime import datetime, timezone
+from src.services.listing import decode_cursor, encode_cursor, parse_filter
+
+
+class TestListing:
+
+    @pytest.mark.parametrize("expression, expected", [
+        ("role==admin", ("role", "==", "admin")),
+        ("n_estimators>=100", ("n_estimators", ">=", 100)),
+        ("active!=true", ("active", "!=", True)),
+        ('name<"b"', ("name", "<", "b")),
+    ])
+    def test_parse_filter(self, expression, expected):
+        assert parse_filter(expression) == expected
+
+    @pytest.mark.parametrize("expression", ["role", "==admin", "1abc>2"])
+    def test_parse_invalid_filter(self, expression):
+        with pytest.raises(ValueError):
+            parse_filter(expression)
+
+    def test_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor([30, "alice"])) == [30, "alice"]
+
+    def test_cursor_keeps_timestamps(self):
+        joined = datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+        assert decode_cursor(encode_cursor([joined, "alice"])) == [joined, "alice"]
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
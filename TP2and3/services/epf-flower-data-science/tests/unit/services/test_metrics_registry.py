@@ -0,0 +1,74 @@
+import os
+import pytest
+from src.services import metrics
+from src.services.metrics import Histogram, Registry
+
+
+class TestHistogram:
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Latence", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, "/a")
+
+        samples = {(name, labels.get("le")): value for name, labels, value in histogram.samples()}
+        assert samples[("latency_seconds_bucket", "0.1")] == 1
+        assert samples[("latency_seconds_bucket", "1")] == 3
+        assert samples[("latency_seconds_bucket", "+Inf")] == 4
+        assert samples[("latency_seconds_count", None)] == 4
+        assert samples[("latency_seconds_sum", None)] == pytest.approx(6.05)
+
+    def test_wrong_labels_are_rejected(self):
+        histogram = Histogram("latency_seconds", "Latence", ("route",))
+        with pytest.raises(ValueError):
+            histogram.observe(1.0, "/a", "GET")
+
+
+class TestRegistry:
+
+    def test_render_text_format(self):
+        registry = Registry()
+        gauge = registry.gauge("in_flight", "Requêtes en cours", ("route",))
+        gauge.inc("/hello/{name}")
+        registry.add_collector("ratio", "gauge", "Ratio", lambda: [("ratio", {"cache": 'a"b'}, 0.5)])
+
+        text = registry.render()
+        assert "# HELP in_flight Requêtes en cours\n# TYPE in_flight gauge\n" in text
+        assert 'in_flight{route="/hello/{name}"} 1\n' in text
+        assert 'ratio{cache="a\\"b"} 0.5\n' in text
+
+    def test_failing_collector_is_skipped(self):
+        registry = Registry()
+        registry.add_collector("broken", "gauge", "Cassé", lambda: 1 / 0)
+        registry.gauge("in_flight", "Requêtes en cours").inc()
+
+        text = registry.render()
+        assert "broken" not in text
+        assert "in_flight 1\n" in text
+
+    def test_duplicate_names_are_rejected(self):
+        registry = Registry()
+        registry.gauge("in_flight", "Requêtes en cours")
+        with pytest.raises(ValueError):
+            registry.histogram("in_flight", "Requêtes en cours")
+
+
+class TestStages:
+
+    def test_timer_records_the_stage(self):
+        before = metrics.STAGE_LATENCY.count("test_stage")
+        with metrics.timer("test_stage"):
+            pass
+
+        assert metrics.STAGE_LATENCY.count("test_stage") == before + 1
+
+    def test_cache_hit_ratio(self):
+        metrics.register_cache("test_cache", lambda: (3, 1))
+        metrics.register_cache("test_missing", lambda: None)
+
+        text = metrics.render()
+        # Chaque échantillon porte le label du processus
+        worker = f'worker="{os.getpid()}"'
+        assert f'cache_hit_ratio{{cache="test_cache",{worker}}} 0.75\n' in text
+        assert f'cache_hits_total{{cache="test_cache",{worker}}} 3\n' in text
+        assert "test_missing" not in text
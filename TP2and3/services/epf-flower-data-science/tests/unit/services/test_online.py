@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.services import models, online
+from tests.conftest import NEW_ROWS
+
+class TestOnlineTrainer:
+
+    @pytest.mark.parametrize("model_name", ["SGDClassifier", "GaussianNB", "MultinomialNB"])
+    def test_train_streams_minibatches_and_publishes(self, online_trainer, model_name):
+        result = online_trainer.train(model_name, {}, batch_rows=16, epochs=2)
+
+        assert result.rows == 120
+        assert result.batches == 8
+        assert result.checkpoints == 4
+        assert os.path.exists(online_trainer.checkpoint_path(model_name))
+        assert result.served_as == f"{model_name}.online"
+        served = models.get_model_registry().get(result.served_as)
+        assert served.predict([[5.1, 3.5, 1.4, 0.2], [7.2, 3.0, 6.0, 2.1]]).tolist() == ["Iris-setosa", "Iris-virginica"]
+
+    def test_model_without_partial_fit_is_rejected(self, online_trainer):
+        with pytest.raises(ValueError, match="partial_fit"):
+            online_trainer.train("RandomForestClassifier", {})
+
+    def test_update_only_fits_the_new_rows(self, online_trainer):
+        online_trainer.train("GaussianNB", {}, batch_rows=16)
+        X, y = online.labeled_rows(pd.DataFrame.from_records(NEW_ROWS))
+
+        # Un autre worker repart du checkpoint
+        other = online.OnlineTrainer(online_trainer.directory)
+        result = other.update("GaussianNB", X, y)
+
+        assert result.rows == 2
+        assert result.n_samples_seen == 62
+        assert online_trainer.stats("GaussianNB")["n_samples_seen"] == 62
+
+    def test_batch_trained_model_is_not_replaced(self, online_trainer):
+        registry = models.get_model_registry()
+        registry.publish("GaussianNB", "modèle entraîné par /train-model")
+
+        online_trainer.train("GaussianNB", {})
+        online_trainer.update("GaussianNB", *online.labeled_rows(pd.DataFrame.from_records(NEW_ROWS)))
+
+        # Le modèle servi sous le même nom reste celui de /train-model
+        assert registry.get("GaussianNB") == "modèle entraîné par /train-model"
+        assert registry.get("GaussianNB.online") != registry.get("GaussianNB")
+
+    def test_update_rejects_unknown_labels(self, online_trainer):
+        online_trainer.train("GaussianNB", {})
+
+        with pytest.raises(ValueError, match="Unknown labels"):
+            online_trainer.update("GaussianNB", np.ones((1, 4)), np.array(["Iris-unknown"]))
+
+
+class TestLabeledRows:
+    def test_features_follow_the_feature_columns(self):
+        # L'ordre des colonnes reçues ne change pas l'ordre des features
+        frame = pd.DataFrame.from_records(NEW_ROWS)[["Species", "PetalWidthCm", "SepalLengthCm", "PetalLengthCm", "SepalWidthCm"]]
+        X, y = online.labeled_rows(frame)
+
+        assert X.tolist() == [[5.0, 3.4, 1.5, 0.2], [7.4, 3.0, 6.1, 2.2]]
+        assert y.tolist() == ["Iris-setosa", "Iris-virginica"]
+
+    def test_missing_column_is_rejected(self):
+        with pytest.raises(ValueError, match="Missing columns"):
+            online.labeled_rows(pd.DataFrame.from_records(NEW_ROWS).drop(columns="Species"))
@@ -0,0 +1,224 @@
+import asyncio
+from src.services import parameters
+from src.services.parameters import CollectionCache
+
+
+class FakeDocument:
+    def __init__(self, id, data):
+        self.id = id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeWatch:
+    def __init__(self):
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+
+
+class FakeCollection:
+    """
+    Collection Firestore en mémoire qui compte les lectures
+    """
+    def __init__(self, documents):
+        self.documents = documents
+        self.streams = 0
+        self.callback = None
+        self.watch = FakeWatch()
+
+    async def stream(self):
+        self.streams += 1
+        for id, data in list(self.documents.items()):
+            yield FakeDocument(id, data)
+
+    def on_snapshot(self, callback):
+        self.callback = callback
+        return self.watch
+
+    def push_snapshot(self):
+        self.callback([FakeDocument(id, data) for id, data in self.documents.items()], [], None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(ttl_seconds=30):
+    collection = FakeCollection({"parameters": {"param_1": {"n_estimators": 100}}})
+    clock = FakeClock()
+    return collection, clock, CollectionCache(collection, ttl_seconds=ttl_seconds, clock=clock)
+
+
+class TestCollectionCache:
+
+    def test_reads_are_served_from_memory_within_ttl(self):
+        collection, clock, cache = make_cache()
+        first = asyncio.run(cache.get_all())
+        clock.now = 10
+        second = asyncio.run(cache.get_all())
+
+        assert first == second == {"parameters": {"param_1": {"n_estimators": 100}}}
+        assert collection.streams == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["age_seconds"] == 10
+
+    def test_collection_is_read_again_after_ttl(self):
+        collection, clock, cache = make_cache(ttl_seconds=30)
+        asyncio.run(cache.get_all())
+        collection.documents["other"] = {"criterion": "gini"}
+        clock.now = 31
+
+        assert "other" in asyncio.run(cache.get_all())
+        assert collection.streams == 2
+
+    def test_invalidate_forces_a_new_read(self):
+        collection, _, cache = make_cache()
+        asyncio.run(cache.get_all())
+        collection.documents["parameters"] = {"param_1": {"n_estimators": 200}}
+        cache.invalidate()
+
+        assert asyncio.run(cache.get_all())["parameters"]["param_1"]["n_estimators"] == 200
+        assert cache.stats()["invalidations"] == 1
+
+    def test_returned_copy_does_not_change_the_cache(self):
+        _, _, cache = make_cache()
+        asyncio.run(cache.get_all()).pop("parameters")
+
+        assert "parameters" in asyncio.run(cache.get_all())
+
+    def test_listener_keeps_the_cache_up_to_date(self):
+        collection, clock, cache = make_cache(ttl_seconds=0)
+        cache.start_listener(collection)
+        collection.push_snapshot()
+        collection.documents["other"] = {"criterion": "entropy"}
+        collection.push_snapshot()
+        clock.now = 1000
+
+        # Pas de lecture Firestore : le listener alimente le cache malgré le TTL
+        assert "other" in asyncio.run(cache.get_all())
+        assert collection.streams == 0
+        assert cache.stats()["snapshots"] == 2
+
+        cache.stop_listener()
+        assert collection.watch.unsubscribed
+        assert not cache.stats()["listening"]
+
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class FakeDocumentRef:
+    def __init__(self, store, collection, id):
+        self.store, self.collection, self.id = store, collection, id
+
+    async def get(self, transaction=None):
+        return FakeSnapshot(self.store.get((self.collection, self.id)))
+
+
+class FakeTransaction:
+    def __init__(self, store):
+        self.store = store
+
+    def set(self, doc_ref, data, merge=False):
+        key = (doc_ref.collection, doc_ref.id)
+        current = self.store.get(key, {}) if merge else {}
+        self.store[key] = {**current, **data}
+
+
+class FakeBulkWriter(FakeTransaction):
+    def __init__(self, store):
+        super().__init__(store)
+        self.closed = False
+
+    def delete(self, doc_ref):
+        self.store.pop((doc_ref.collection, doc_ref.id), None)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """
+    Client Firestore en mémoire : {(collection, id): données}
+    """
+    def __init__(self, store=None):
+        self.store = store or {}
+        self.writers = []
+
+    def collection(self, name):
+        client = self
+
+        class Collection:
+            def document(self, id):
+                return FakeDocumentRef(client.store, name, id)
+
+            def list_documents(self):
+                return [FakeDocumentRef(client.store, name, id) for c, id in list(client.store) if c == name]
+
+        return Collection()
+
+    def bulk_writer(self):
+        writer = FakeBulkWriter(self.store)
+        self.writers.append(writer)
+        return writer
+
+
+class TestWritePaths:
+
+    def test_next_parameter_key_skips_used_numbers(self):
+        assert parameters.next_parameter_key({}) == "param_1"
+        assert parameters.next_parameter_key({"param_1": {}, "param_3": {}, "other": {}}) == "param_4"
+
+    def test_append_writes_only_the_new_field(self):
+        store = {("parameters", "parameters"): {"param_1": {"n_estimators": 100}}}
+        doc_ref = FakeDocumentRef(store, "parameters", "parameters")
+        transaction = FakeTransaction(store)
+
+        key = asyncio.run(parameters._append_parameter_set(transaction, doc_ref, {"n_estimators": 200}))
+
+        assert key == "param_2"
+        assert store[("parameters", "parameters")] == {
+            "param_1": {"n_estimators": 100},
+            "param_2": {"n_estimators": 200},
+        }
+
+    def test_append_creates_the_document(self):
+        store = {}
+        doc_ref = FakeDocumentRef(store, "parameters", "parameters")
+
+        assert asyncio.run(parameters._append_parameter_set(FakeTransaction(store), doc_ref, {"criterion": "gini"})) == "param_1"
+
+    def test_import_documents_uses_one_bulk_writer(self):
+        client = FakeClient({("parameters", "a"): {"n_estimators": 1, "max_depth": 3}})
+
+        written = parameters.import_documents(
+            client, "parameters", {"a": {"n_estimators": 10}, "b": {"n_estimators": 20}}
+        )
+
+        assert written == 2
+        assert len(client.writers) == 1 and client.writers[0].closed
+        # merge=True conserve les autres champs
+        assert client.store[("parameters", "a")] == {"n_estimators": 10, "max_depth": 3}
+        assert client.store[("parameters", "b")] == {"n_estimators": 20}
+
+    def test_delete_collection_only_touches_that_collection(self):
+        client = FakeClient({("parameters", "a"): {}, ("parameters", "b"): {}, ("users", "u"): {}})
+
+        assert parameters.delete_collection(client, "parameters") == 2
+        assert list(client.store) == [("users", "u")]
+        assert client.writers[0].closed
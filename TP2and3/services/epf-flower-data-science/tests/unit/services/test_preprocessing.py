@@ -0,0 +1,45 @@
+import os
+import numpy as np
+from unittest.mock import patch
+from src.services import pipeline, preprocessing, snapshot
+
+class TestPreprocessingStore:
+
+    def test_scaler_is_fitted_once_per_dataset_version(self, iris_path):
+        first = pipeline.process(iris_path)
+        second = pipeline.process(iris_path)
+
+        assert second.scaler is first.scaler
+        assert preprocessing.get_preprocessing_store().stats()["fits"] == 1
+
+    def test_artifacts_are_reloaded_from_disk(self, iris_path):
+        first = pipeline.process(iris_path)
+        store = preprocessing.get_preprocessing_store()
+        other = preprocessing.PreprocessingStore(store.directory)
+
+        with patch("src.services.preprocessing.StandardScaler") as mock_scaler:
+            artifact = other.get(snapshot.get_snapshot(iris_path).sha256, None)
+
+        mock_scaler.assert_not_called()
+        assert isinstance(artifact.X_scaled, np.memmap)
+        np.testing.assert_allclose(artifact.X_scaled, first.X)
+        np.testing.assert_allclose(artifact.scaler.mean_, first.scaler.mean_)
+
+    def test_files_of_old_dataset_versions_are_pruned(self, iris_path, tmp_path):
+        store = preprocessing.PreprocessingStore(str(tmp_path / "pruned"), max_stored=1)
+        X = np.arange(20.0).reshape(5, 4)
+        store.get("old", X)
+
+        store.get("new", X + 1)
+
+        assert sorted(os.listdir(store.directory)) == ["scaled-new.npy", "scaler-new.joblib"]
+
+    def test_serving_model_applies_the_training_transform(self, iris_path):
+        from sklearn.neighbors import KNeighborsClassifier
+
+        dataset = pipeline.split(iris_path)
+        model = pipeline.serving_model(dataset, pipeline.fit_model(dataset, KNeighborsClassifier(n_neighbors=1)))
+
+        # Le modèle servi prend les caractéristiques brutes
+        raw = snapshot.get_snapshot(iris_path).features
+        assert model.predict(np.asarray(raw)).tolist() == snapshot.get_snapshot(iris_path).label_values().tolist()
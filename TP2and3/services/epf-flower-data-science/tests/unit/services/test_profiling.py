@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from src.services import profiling
+from src.services.profiling import ProfileSession, StackSampler, profiled, server_timing
+
+
+def busy_work():
+    total = 0
+    for i in range(200000):
+        total += i
+    return total
+
+
+def other_request_work():
+    return busy_work()
+
+
+class TestStackSampler:
+
+    def test_sampled_stacks_are_collapsed(self):
+        sampler = StackSampler()
+        sampler.add_thread(threading.get_ident())
+        sampler.sample()
+
+        stack, count = sampler.collapsed().strip().rsplit(" ", 1)
+        assert count == "1"
+        # La pile va de l'appelant le plus externe à la fonction en cours
+        frames = [frame.split(" ")[0] for frame in stack.split(";")]
+        assert frames[-2:] == ["test_sampled_stacks_are_collapsed", "sample"]
+
+
+class TestProfileSession:
+
+    def test_worker_threads_are_profiled(self):
+        session = ProfileSession("cprofile", "GET", "/test")
+
+        def endpoint():
+            # Un endpoint synchrone tourne dans un thread du pool
+            with session.profile_thread():
+                busy_work()
+
+        session.start()
+        worker = threading.Thread(target=endpoint)
+        worker.start()
+        worker.join()
+        session.stop()
+
+        functions = {name for _, _, name in session.stats().stats}
+        assert "busy_work" in functions
+
+    def test_event_loop_thread_is_not_profiled(self):
+        session = ProfileSession("cprofile", "GET", "/test")
+
+        def endpoint():
+            with session.profile_thread():
+                busy_work()
+
+        session.start()
+        worker = threading.Thread(target=endpoint)
+        worker.start()
+        # Le travail d'une autre requête sur le thread de la boucle reste hors du profil
+        other_request_work()
+        worker.join()
+        session.stop()
+
+        functions = {name for _, _, name in session.stats().stats}
+        assert "busy_work" in functions
+        assert "other_request_work" not in functions
+
+    def test_profiler_that_cannot_start_degrades_the_profile(self, monkeypatch):
+        class BusyProfile:
+            def enable(self):
+                raise ValueError("Another profiling tool is already active")
+
+        monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+        session = ProfileSession("cprofile", "GET", "/test")
+
+        with session.profile_thread():
+            busy_work()
+
+        assert session.stats() is None
+        assert session.notes == ["cProfile not started: Another profiling tool is already active"]
+
+    def test_async_endpoint_samples_only_its_coroutine(self):
+        session = ProfileSession("sample", "GET", "/test", sample_interval=0.001)
+
+        async def endpoint():
+            deadline = time.perf_counter() + 0.03
+            while time.perf_counter() < deadline:
+                busy_work()
+                # Rend la main à la boucle, qui exécute l'autre requête
+                await asyncio.sleep(0)
+
+        async def other_request():
+            deadline = time.perf_counter() + 0.03
+            while time.perf_counter() < deadline:
+                other_request_work()
+                await asyncio.sleep(0)
+
+        async def serve():
+            token = profiling._session.set(session)
+            try:
+                await asyncio.gather(profiled(endpoint)(), other_request())
+            finally:
+                profiling._session.reset(token)
+
+        session.start()
+        asyncio.run(serve())
+        session.stop()
+
+        collapsed = session.sampler.collapsed()
+        assert "busy_work" in collapsed
+        assert "other_request_work" not in collapsed
+        # Les piles partent de la coroutine de l'endpoint, sans la boucle
+        assert all(line.startswith("async_wrapper ") for line in collapsed.splitlines())
+
+    def test_profiled_endpoint_without_session(self):
+        # Sans profilage en cours, l'endpoint est appelé directement
+        wrapped = profiled(busy_work)
+        assert wrapped() == busy_work()
+        assert wrapped.__wrapped__ is busy_work
+        assert profiled(wrapped) is wrapped
+
+
+def test_server_timing():
+    header = server_timing([("fit", 0.010), ("predict", 0.002), ("fit", 0.005)], 0.020)
+    assert header == "fit;dur=15.000, predict;dur=2.000, total;dur=20.000"
@@ -0,0 +1,37 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from src.services import serialization
+
+
+class TestDumps:
+
+    def test_same_document_as_the_standard_library(self):
+        frame = pd.DataFrame({"SepalLengthCm": [5.1, 4.9], "Species": ["Iris-setosa", "Iris-virginica"]})
+        content = {"data": frame.to_dict(orient="records"), "n": 2}
+
+        assert json.loads(serialization.dumps({"data": frame, "n": 2})) == content
+
+    def test_numpy_arrays(self):
+        X = np.arange(12, dtype=np.float64).reshape(4, 3)
+        content = {
+            "X": X,
+            "columns": X[:, 1],  # Non contigu
+            "labels": np.array(["a", "b"]),  # dtype non supporté nativement
+            "count": np.int64(3),
+        }
+
+        assert json.loads(serialization.dumps(content)) == {
+            "X": X.tolist(),
+            "columns": [1.0, 4.0, 7.0, 10.0],
+            "labels": ["a", "b"],
+            "count": 3,
+        }
+
+    def test_nan_is_null(self):
+        assert serialization.dumps({"x": float("nan")}) == b'{"x":null}'
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            serialization.dumps({"x": object()})
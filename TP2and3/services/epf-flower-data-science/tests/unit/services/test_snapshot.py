@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from src.services import snapshot
+from tests.conftest import IRIS_CSV
+
+class TestSnapshot:
+
+    def test_snapshot_is_memory_mapped(self, iris_path):
+        dataset = snapshot.get_snapshot(iris_path)
+
+        assert isinstance(dataset.features, np.memmap)
+        assert dataset.features.dtype == np.float64
+        assert dataset.features.shape == (5, 4)
+        assert dataset.feature_names == ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+        assert dataset.labels.tolist() == [0, 0, 2, 2, 1]
+        assert dataset.label_values().tolist() == ["Iris-setosa"] * 2 + ["Iris-virginica"] * 2 + ["Iris-versicolor"]
+
+    def test_snapshot_round_trips_the_csv(self, iris_path):
+        frame = snapshot.get_snapshot(iris_path).to_frame()
+
+        pd.testing.assert_frame_equal(frame, pd.read_csv(iris_path), check_dtype=False)
+
+    def test_csv_is_parsed_once(self, iris_path):
+        with patch("pandas.read_csv", wraps=pd.read_csv) as mock_read_csv:
+            snapshot.get_snapshot(iris_path)
+            snapshot._snapshots.clear()  # Un nouveau worker relit le snapshot sur disque
+            snapshot.get_snapshot(iris_path)
+
+        assert mock_read_csv.call_count == 1
+
+    def test_snapshot_is_rebuilt_when_csv_changes(self, write_iris_csv):
+        # Sans la dernière ligne, la seule de l'espèce versicolor
+        iris_path = write_iris_csv(IRIS_CSV[:IRIS_CSV.rindex("5,")])
+        snapshot.get_snapshot(iris_path)
+        with open(iris_path, "a") as f:
+            f.write("5,6.7,3.1,4.4,1.4,Iris-versicolor\n")
+
+        dataset = snapshot.get_snapshot(iris_path)
+
+        assert dataset.features.shape == (5, 4)
+        assert dataset.meta["categories"] == ["Iris-setosa", "Iris-versicolor", "Iris-virginica"]
+        assert len([f for f in os.listdir(dataset.directory) if f.endswith(".npy")]) == 3
+
+    def test_touch_only_refreshes_metadata(self, iris_path):
+        first = snapshot.get_snapshot(iris_path)
+        stat = os.stat(iris_path)
+        os.utime(iris_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        with patch("src.services.snapshot.build_snapshot") as mock_build:
+            second = snapshot.get_snapshot(iris_path)
+
+        mock_build.assert_not_called()
+        assert second.meta["files"] == first.meta["files"]
+
+    def test_block_by_block_build_matches_the_whole_build(self, iris_path, tmp_path):
+        whole = snapshot.get_snapshot(iris_path)
+        other = tmp_path / "blocks.csv"
+        other.write_text(IRIS_CSV)
+
+        blocks = snapshot.get_snapshot(str(other), block_rows=2)
+
+        np.testing.assert_array_equal(blocks.features, whole.features)
+        np.testing.assert_array_equal(blocks.ids, whole.ids)
+        assert blocks.labels.tolist() == whole.labels.tolist()
+        assert {k: v for k, v in blocks.meta.items() if k != "source"} == {k: v for k, v in whole.meta.items() if k != "source"}
@@ -0,0 +1,87 @@
+import pytest
+from src.services.tokens import TokenCache
+
+
+class FakeVerifier:
+    """
+    Vérificateur de tokens qui compte les appels : "<uid>:<exp>" -> claims
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, token, app, check_revoked):
+        self.calls.append((token, check_revoked))
+        uid, exp = token.split(":")
+        if uid == "invalid":
+            raise ValueError("Invalid token")
+        return {"uid": uid, "exp": int(exp)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def verifier():
+    return FakeVerifier()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestTokenCache:
+
+    def test_token_is_verified_once_until_it_expires(self, verifier, clock):
+        cache = TokenCache(verifier=verifier, clock=clock)
+
+        assert cache.verify("alice:2000") == {"uid": "alice", "exp": 2000}
+        cache.verify("alice:2000")
+        assert len(verifier.calls) == 1
+
+        clock.now = 2000
+        cache.verify("alice:2000")
+        assert len(verifier.calls) == 2
+        assert cache.stats()["hits"] == 1
+
+    def test_invalid_tokens_are_not_cached(self, verifier, clock):
+        cache = TokenCache(verifier=verifier, clock=clock)
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                cache.verify("invalid:2000")
+        assert len(verifier.calls) == 2
+        assert cache.stats()["size"] == 0
+
+    def test_size_is_bounded(self, verifier, clock):
+        cache = TokenCache(max_size=2, verifier=verifier, clock=clock)
+        for uid in ("a", "b", "c"):
+            cache.verify(f"{uid}:2000")
+
+        assert cache.stats()["size"] == 2
+        cache.verify("a:2000")  # Le plus ancien a été évincé
+        assert len(verifier.calls) == 4
+
+    def test_revocation_is_checked_again_after_the_interval(self, verifier, clock):
+        cache = TokenCache(check_revoked=True, revocation_check_seconds=60, verifier=verifier, clock=clock)
+        cache.verify("alice:5000")
+        clock.now += 30
+        cache.verify("alice:5000")
+        clock.now += 31
+        cache.verify("alice:5000")
+
+        assert verifier.calls == [("alice:5000", True), ("alice:5000", True)]
+
+    def test_evict_user(self, verifier, clock):
+        cache = TokenCache(verifier=verifier, clock=clock)
+        cache.verify("alice:2000")
+        cache.verify("bob:2000")
+
+        assert cache.evict_user("alice") == 1
+        cache.verify("alice:2000")
+        assert len(verifier.calls) == 3